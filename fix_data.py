@@ -7,9 +7,20 @@ Fix BrightFlow data files:
 """
 
 import json
+import sys
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 import random
 
+from ledger import Ledger
+
+# Risk metrics engine shared with the ML pipeline templates, when NumPy/pandas are installed
+sys.path.insert(0, str(Path(__file__).resolve().parent / "ml-repo-templates"))
+try:
+    from risk_metrics import comparison_metrics
+except ImportError:
+    comparison_metrics = None
+
 def fix_transaction_balances():
     """Fix the transaction balances - currently all showing same value"""
     print("🔧 Fixing transaction balances...")
@@ -26,19 +37,16 @@ def fix_transaction_balances():
     # Sort by timestamp to ensure chronological order
     transactions.sort(key=lambda x: x['timestamp'])
 
-    running_balance = starting_balance
+    ledger = Ledger(starting_balance)
 
     for tx in transactions:
-        amount = float(tx['amount'])
-
-        # Apply transaction to balance
-        if tx['action'] == 'BUY':
-            running_balance -= abs(amount)
-        elif tx['action'] == 'SELL':
-            running_balance += abs(amount)
+        # Apply transaction to balance (BUY/SELL arithmetic on the absolute amount)
+        ledger.apply(tx['action'], tx['symbol'], tx.get('shares', 0), tx.get('price', 0), float(tx['amount']))
 
         # Update balance
-        tx['balance'] = round(running_balance, 2)
+        tx['balance'] = round(ledger.cash, 2)
+
+    running_balance = ledger.cash
 
     # Update current balance
     data['currentBalance'] = round(running_balance, 2)
@@ -112,6 +120,15 @@ def fix_performance_indices():
     # Store index metadata
     data['_indices'] = indices
 
+    # Risk metrics for BrightFlow against every index
+    if comparison_metrics is not None:
+        data['metrics'] = comparison_metrics(data['brightflow'], {key: data[key] for key in indices})
+        print(f"✅ Calculated risk metrics against {len(indices)} indices")
+    else:
+        # Plain python3 has no NumPy/pandas; drop metrics computed against the old indices
+        data.pop('metrics', None)
+        print("⚠️  NumPy/pandas not installed, skipping risk metrics")
+
     # Remove old indices that aren't needed
     for old_key in ['spy', 'vfiax', 'spdr']:
         if old_key in data:
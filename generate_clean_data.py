@@ -8,6 +8,8 @@ import json
 from datetime import datetime, timezone, timedelta
 import random
 
+from ledger import Ledger, sufficient_cash
+
 def generate_realistic_transactions(starting_balance=2100.00, num_transactions=50):
     """
     Generate realistic transactions with proper balance tracking.
@@ -33,9 +35,8 @@ def generate_realistic_transactions(starting_balance=2100.00, num_transactions=5
         'META': 520.18,
     }
 
-    # Track portfolio state
-    cash = starting_balance
-    positions = {}  # {symbol: shares}
+    # Track portfolio state; buys we can't afford are rejected
+    ledger = Ledger(starting_balance, rules=[sufficient_cash()], reject_violations=True)
     transactions = []
 
     # Start time (3 days ago)
@@ -50,7 +51,7 @@ def generate_realistic_transactions(starting_balance=2100.00, num_transactions=5
         price = stocks[symbol] * random.uniform(0.98, 1.02)  # Price variation
 
         # Decide action: 60% BUY, 40% SELL (if we own it)
-        if symbol in positions and positions[symbol] > 0 and random.random() < 0.4:
+        if ledger.position(symbol) > 0 and random.random() < 0.4:
             action = 'SELL'
         else:
             action = 'BUY'
@@ -58,8 +59,8 @@ def generate_realistic_transactions(starting_balance=2100.00, num_transactions=5
         # Calculate trade size
         if action == 'BUY':
             # Trade 1-3% of portfolio value
-            portfolio_value = cash + sum(positions.get(s, 0) * stocks[s] for s in stocks)
-            max_trade = min(cash * 0.95, portfolio_value * 0.03)  # Don't spend all cash
+            portfolio_value = ledger.value(stocks)
+            max_trade = min(ledger.cash * 0.95, portfolio_value * 0.03)  # Don't spend all cash
 
             if max_trade < 50:  # Skip if insufficient funds
                 continue
@@ -68,17 +69,14 @@ def generate_realistic_transactions(starting_balance=2100.00, num_transactions=5
             shares = round(dollar_amount / price, 4)
             actual_cost = shares * price
 
-            if actual_cost > cash:  # Double-check we can afford it
+            # Execute buy (double-checks we can afford it)
+            if not ledger.apply('BUY', symbol, shares, price):
                 continue
-
-            # Execute buy
-            cash -= actual_cost
-            positions[symbol] = positions.get(symbol, 0) + shares
             amount = actual_cost  # Positive for display, will be negative in JSON
 
         else:  # SELL
             # Sell 20-80% of position
-            current_shares = positions.get(symbol, 0)
+            current_shares = ledger.position(symbol)
             if current_shares < 0.01:  # Skip if we don't own enough
                 continue
 
@@ -86,13 +84,8 @@ def generate_realistic_transactions(starting_balance=2100.00, num_transactions=5
             shares = round(current_shares * sell_ratio, 4)
             proceeds = shares * price
 
-            # Execute sell
-            cash += proceeds
-            positions[symbol] -= shares
-
-            # Remove position if nearly zero
-            if positions[symbol] < 0.0001:
-                del positions[symbol]
+            # Execute sell (the position is removed if nearly zero)
+            ledger.apply('SELL', symbol, shares, price)
 
             amount = proceeds
 
@@ -104,24 +97,24 @@ def generate_realistic_transactions(starting_balance=2100.00, num_transactions=5
             'shares': round(shares, 4),
             'price': round(price, 2),
             'amount': round(amount, 2),
-            'balance': round(cash, 2)
+            'balance': round(ledger.cash, 2)
         }
         transactions.append(tx)
 
         # Log progress
         if i < 5 or i >= num_transactions - 5:
-            print(f"{i+1:3d}. {action:4s} {symbol:5s} {shares:8.4f} @ ${price:7.2f} = ${amount:8.2f} → Balance: ${cash:,.2f}")
+            print(f"{i+1:3d}. {action:4s} {symbol:5s} {shares:8.4f} @ ${price:7.2f} = ${amount:8.2f} → Balance: ${ledger.cash:,.2f}")
         elif i == 5:
             print("...")
 
     print(f"\n✅ Generated {len(transactions)} valid transactions")
-    print(f"📊 Final balance: ${cash:.2f}")
-    print(f"📦 Open positions: {len(positions)}")
+    print(f"📊 Final balance: ${ledger.cash:.2f}")
+    print(f"📦 Open positions: {len(ledger.positions())}")
 
     return {
         'lastUpdated': datetime.now(timezone.utc).isoformat(),
         'totalTransactions': len(transactions),
-        'currentBalance': round(cash, 2),
+        'currentBalance': round(ledger.cash, 2),
         'transactions': transactions
     }
 
@@ -2,10 +2,30 @@
 """
 Generate realistic performance data matching the transaction history
 """
+import asyncio
 import json
+import sys
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
 import yfinance as yf
 
+# Series helpers shared with the ML pipeline templates, when their dependencies are installed
+sys.path.insert(0, str(Path(__file__).resolve().parent / "ml-repo-templates"))
+try:
+    from performance_series import series_points
+except ImportError:
+    series_points = None
+try:
+    from calculate_performance_vs_benchmarks import fetch_closes_cached, load_price_server
+except ImportError:
+    load_price_server = None
+from ledger import STARTING_CASH, Ledger
+
+# Mark for a held symbol with no trade price yet
+DEFAULT_PRICE = 100.0
+
 def get_historical_prices(symbol, days_back=30):
     """Get historical closing prices"""
     try:
@@ -14,10 +34,117 @@ def get_historical_prices(symbol, days_back=30):
         start_date = end_date - timedelta(days=days_back + 5)
         data = ticker.history(start=start_date, end=end_date)
         if not data.empty:
-            return data['Close'].to_dict()
+            return data['Close']
     except:
         pass
-    return {}
+    return pd.Series(dtype=float)
+
+def normalize_to_100(prices, start_date):
+    """Points for a closing price series rebased to 100 at its first close on or after start_date"""
+    if series_points is not None:
+        return series_points(prices, base=100, start_date=start_date, decimals=2)
+
+    prices = prices.sort_index()
+    prices = prices[[date.date() >= start_date for date in prices.index]]
+    if prices.empty or not prices.iloc[0]:
+        return []
+
+    baseline = prices.iloc[0]
+    return [
+        {"date": date.strftime("%Y-%m-%d"), "value": round(float(price / baseline * 100), 2)}
+        for date, price in prices.items()
+    ]
+
+def replay_transactions(transactions, first_day, num_days):
+    """
+    Apply transactions in order through the ledger, O(1) each, snapshotting cash,
+    positions and last trade prices at the end of each trade day. Returns
+    (symbols, cash, shares, trade_prices) with one row per day; days without
+    trades carry the previous row.
+    """
+    ledger = Ledger(STARTING_CASH)
+    snapshots = {}
+    day = None
+
+    for txn in transactions:
+        txn_time = datetime.fromisoformat(txn["timestamp"].replace('Z', '+00:00'))
+        txn_day = (txn_time.date() - first_day).days
+
+        # Close out the previous trade day before applying the next day's first transaction
+        if txn_day != day:
+            if day is not None:
+                snapshots[day] = ledger.snapshot()
+            day = txn_day
+
+        ledger.apply_transaction(txn)
+
+    if day is not None:
+        snapshots[day] = ledger.snapshot()
+
+    # Symbols only ever get appended, so earlier snapshots are prefixes of the symbol table
+    symbols = ledger.symbols
+    cash_by_day = np.full(num_days, np.nan)
+    shares = np.full((num_days, len(symbols)), np.nan)
+    trade_prices = np.full((num_days, len(symbols)), np.nan)
+
+    for day, snapshot in snapshots.items():
+        width = len(snapshot["symbols"])
+        cash_by_day[day] = snapshot["cash"]
+        shares[day] = 0.0
+        shares[day, :width] = snapshot["shares"]
+        trade_prices[day, :width] = snapshot["prices"]
+
+    # Carry each trade day's state forward over the days without trades
+    cash_by_day = pd.Series(cash_by_day).ffill().fillna(STARTING_CASH).to_numpy()
+    shares = pd.DataFrame(shares).ffill().fillna(0.0).to_numpy()
+    trade_prices = pd.DataFrame(trade_prices).ffill().to_numpy()
+    return symbols, cash_by_day, shares, trade_prices
+
+def cached_closes(symbols, dates):
+    """
+    (days x symbols) daily closes from the MCP stock server's price cache, carried
+    over weekends and holidays; None when the price store isn't available
+    """
+    if load_price_server is None or not symbols:
+        return None
+    server = load_price_server()
+    if server is None:
+        return None
+
+    start = dates[0].strftime("%Y-%m-%d")
+    end = dates[-1].strftime("%Y-%m-%d")
+    try:
+        closes, errors = asyncio.run(fetch_closes_cached(server, symbols, start, end))
+    except Exception as e:
+        print(f"⚠️  Price cache unavailable ({str(e)}), valuing at trade prices")
+        return None
+
+    for symbol, error in errors.items():
+        print(f"⚠️  No cached closes for {symbol}: {error}")
+
+    frame = pd.DataFrame({symbol: closes[symbol] for symbol in symbols if symbol in closes and not closes[symbol].empty}, columns=symbols)
+    frame.index = pd.to_datetime(frame.index)
+    return frame.reindex(dates).ffill().to_numpy(dtype=float)
+
+def value_portfolio(transactions, first_day, last_day):
+    """
+    Daily portfolio values: cash plus the positions x prices product for every
+    day at once. Positions are marked to cached daily closes where available and
+    to the last trade price otherwise.
+    """
+    dates = pd.date_range(first_day, last_day, freq="D")
+    symbols, cash, shares, marks = replay_transactions(transactions, first_day, len(dates))
+
+    closes = cached_closes(symbols, dates)
+    if closes is not None:
+        marks = np.where(np.isnan(closes), marks, closes)
+    marks = np.where(np.isnan(marks), DEFAULT_PRICE, marks)
+
+    values = cash + (shares * marks).sum(axis=1)
+    return [
+        {"date": date, "value": value}
+        for date, value in zip(dates.strftime("%Y-%m-%d"), np.round(values, 2).tolist())
+    ]
 
 def generate_performance_data():
     """Generate performance data from transactions"""
@@ -34,55 +161,7 @@ def generate_performance_data():
     print(f"📊 Generating performance data from {first_date.date()} to {last_date.date()}")
 
     # Calculate portfolio value for each day
-    portfolio_history = []
-    current_date = first_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_date = last_date.replace(hour=23, minute=59, second=59)
-
-    cash = 2100.00
-    positions = {}
-
-    # Process transactions chronologically
-    txn_index = 0
-
-    while current_date <= end_date:
-        # Process all transactions for this day
-        while txn_index < len(transactions):
-            txn = transactions[txn_index]
-            txn_time = datetime.fromisoformat(txn["timestamp"].replace('Z', '+00:00'))
-
-            if txn_time.date() > current_date.date():
-                break
-
-            # Apply transaction
-            if txn["action"] == "BUY":
-                cash -= txn["amount"]
-                positions[txn["symbol"]] = positions.get(txn["symbol"], 0) + txn["shares"]
-            elif txn["action"] == "SELL":
-                cash += txn["amount"]
-                positions[txn["symbol"]] = positions.get(txn["symbol"], 0) - txn["shares"]
-                if positions[txn["symbol"]] <= 0.0001:
-                    positions.pop(txn["symbol"], None)
-
-            txn_index += 1
-
-        # Calculate portfolio value at end of day
-        # (Use transaction prices as proxy for EOD prices)
-        portfolio_value = cash
-        for symbol, shares in positions.items():
-            # Find most recent price for this symbol
-            recent_price = 100.0  # Default
-            for i in range(txn_index - 1, -1, -1):
-                if transactions[i]["symbol"] == symbol:
-                    recent_price = transactions[i]["price"]
-                    break
-            portfolio_value += shares * recent_price
-
-        portfolio_history.append({
-            "date": current_date.strftime("%Y-%m-%d"),
-            "value": round(portfolio_value, 2)
-        })
-
-        current_date += timedelta(days=1)
+    portfolio_history = value_portfolio(transactions, first_date.date(), last_date.date())
 
     print(f"✅ Generated {len(portfolio_history)} daily values")
 
@@ -95,35 +174,10 @@ def generate_performance_data():
     nasdaq_data = get_historical_prices("^IXIC", days_back)
     djia_data = get_historical_prices("^DJI", days_back)
 
-    # Normalize indices to start at 100
-    def normalize_to_100(price_dict, start_date):
-        if not price_dict:
-            return []
-
-        # Find first valid price on or after start_date
-        baseline = None
-        for date, price in sorted(price_dict.items()):
-            if date.date() >= start_date.date():
-                baseline = price
-                break
-
-        if not baseline:
-            return []
-
-        result = []
-        for date, price in sorted(price_dict.items()):
-            if date.date() >= start_date.date():
-                normalized = (price / baseline) * 100
-                result.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "value": round(normalized, 2)
-                })
-
-        return result
-
-    spy_normalized = normalize_to_100(spy_data, first_date)
-    nasdaq_normalized = normalize_to_100(nasdaq_data, first_date)
-    djia_normalized = normalize_to_100(djia_data, first_date)
+    # Normalize indices to start at 100 on the first trading day on or after first_date
+    spy_normalized = normalize_to_100(spy_data, first_date.date())
+    nasdaq_normalized = normalize_to_100(nasdaq_data, first_date.date())
+    djia_normalized = normalize_to_100(djia_data, first_date.date())
 
     # Build output
     output = {
@@ -11,10 +11,11 @@ import random
 from datetime import datetime, timedelta, timezone
 import yfinance as yf
 
+from ledger import STARTING_CASH, Ledger, owned_shares, sufficient_cash
+
 # Starting conditions - THIS IS ALL THE MONEY WE HAVE!
-STARTING_CASH = 2100.00
-cash = STARTING_CASH
-positions = {}
+# Trades we can't pay for, or shares we don't own, are rejected by the ledger
+ledger = Ledger(STARTING_CASH, rules=[sufficient_cash(), owned_shares()], reject_violations=True)
 transactions = []
 
 # Trading universe (popular stocks)
@@ -40,29 +41,16 @@ def get_current_price(symbol):
 
 def calculate_balance():
     """Calculate REAL balance: Cash + Stock Value"""
-    global cash, positions
-
-    stock_value = 0
-    for symbol, shares in positions.items():
-        price = get_current_price(symbol)
-        stock_value += shares * price
-
-    return cash + stock_value
+    return ledger.value({symbol: get_current_price(symbol) for symbol in ledger.positions()})
 
 def buy(symbol, shares, price, timestamp):
     """Buy stocks - ONLY if we have enough REAL cash"""
-    global cash, positions, transactions
-
     cost = shares * price
 
-    # VALIDATE: Do we have enough REAL money?
-    if cash < cost:
+    # VALIDATE and execute: the ledger rejects it if we don't have enough REAL money
+    if not ledger.apply("BUY", symbol, shares, price):
         return None  # Can't afford it
 
-    # Execute trade
-    cash -= cost
-    positions[symbol] = positions.get(symbol, 0) + shares
-
     # Record transaction
     txn = {
         "timestamp": timestamp.isoformat(),
@@ -80,23 +68,11 @@ def buy(symbol, shares, price, timestamp):
 
 def sell(symbol, shares, price, timestamp):
     """Sell stocks - ONLY if we own them"""
-    global cash, positions, transactions
-
-    owned = positions.get(symbol, 0)
-
-    # VALIDATE: Do we own enough shares?
-    if owned < shares:
-        return None  # Don't own enough
-
     proceeds = shares * price
 
-    # Execute trade
-    cash += proceeds
-    positions[symbol] -= shares
-
-    # Remove position if sold everything
-    if positions[symbol] <= 0.0001:
-        del positions[symbol]
+    # VALIDATE and execute: the ledger rejects it if we don't own enough shares
+    if not ledger.apply("SELL", symbol, shares, price):
+        return None  # Don't own enough
 
     # Record transaction
     txn = {
@@ -115,8 +91,6 @@ def sell(symbol, shares, price, timestamp):
 
 def generate_realistic_trades(num_trades=50, days_back=30):
     """Generate realistic trading history"""
-    global cash, positions
-
     print(f"\n💰 Starting with ${STARTING_CASH:.2f}\n")
 
     # Start date
@@ -132,6 +106,8 @@ def generate_realistic_trades(num_trades=50, days_back=30):
 
         # Random time increment (0.5 to 3 hours)
         current_date += timedelta(hours=random.uniform(0.5, 3))
+        cash = ledger.cash
+        positions = ledger.positions()
 
         # Decide: BUY or SELL?
         if len(positions) == 0 or (cash > 100 and random.random() < 0.6):
@@ -168,7 +144,7 @@ def generate_realistic_trades(num_trades=50, days_back=30):
         # Occasionally show progress
         if trade_count % 10 == 0 and trade_count > 0:
             print(f"\n📊 Progress: {trade_count}/{num_trades} trades | Balance: ${calculate_balance():.2f}")
-            print(f"   Cash: ${cash:.2f} | Positions: {len(positions)}\n")
+            print(f"   Cash: ${ledger.cash:.2f} | Positions: {len(ledger.positions())}\n")
 
     print(f"\n✅ Generated {trade_count} realistic trades")
     print(f"   Final balance: ${calculate_balance():.2f}")
@@ -180,8 +156,8 @@ def export_data():
         "lastUpdated": datetime.now(timezone.utc).isoformat(),
         "totalTransactions": len(transactions),
         "currentBalance": round(calculate_balance(), 2),
-        "cashBalance": round(cash, 2),
-        "stockValue": round(calculate_balance() - cash, 2),
+        "cashBalance": round(ledger.cash, 2),
+        "stockValue": round(calculate_balance() - ledger.cash, 2),
         "transactions": transactions
     }
 
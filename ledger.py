@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Event-sourced cash/positions ledger shared by the transaction validators and generators.
+
+Starting capital: $2,100 (real money). Every BUY/SELL is applied in O(1):
+positions and last trade prices live in compact per-symbol arrays indexed by a
+symbol table. Rule checks are pluggable callables run before each event; a
+violation is recorded and, if the ledger rejects violations, the event is skipped.
+
+TransactionStream reads a transactions.json incrementally so arbitrarily large
+histories can be replayed with only the ledger state in memory, and
+bulk_violations checks the cash and share rules for a whole history at once
+with cumulative sums. The ledger itself only needs the standard library;
+NumPy and pandas are imported by the bulk functions when they are called.
+"""
+import json
+from array import array
+from operator import itemgetter
+
+STARTING_CASH = 2100.00
+
+# Positions at or below this many shares are treated as closed
+DUST = 0.0001
+
+# Re-summing passes bulk_violations makes to settle dust resets before it
+# replays the symbols still changing through a Ledger instead
+MAX_RESET_PASSES = 4
+
+def sufficient_cash(tolerance=0.0):
+    """Rule: a BUY may not cost more than the cash on hand (plus tolerance)"""
+    def rule(ledger, event):
+        if event["action"] == "BUY" and ledger.cash < event["cost"] - tolerance:
+            return {**event, "type": "ILLEGAL_BUY", "cash": ledger.cash}
+        return None
+    return rule
+
+def owned_shares(tolerance=0.0):
+    """Rule: a SELL may not sell more shares than are held (plus tolerance)"""
+    def rule(ledger, event):
+        if event["action"] == "SELL":
+            owned = ledger.position(event["symbol"])
+            if owned < event["shares"] - tolerance:
+                return {**event, "type": "ILLEGAL_SELL", "owned": owned}
+        return None
+    return rule
+
+class Ledger:
+    """Cash and positions replayed from BUY/SELL events"""
+    __slots__ = ("starting_cash", "cash", "index", "symbols", "shares", "prices",
+                 "rules", "reject_violations", "on_violation", "violations", "events")
+
+    def __init__(self, starting_cash=STARTING_CASH, rules=(), reject_violations=False, on_violation=None):
+        """
+        rules are callables rule(ledger, event) returning a violation or None;
+        with reject_violations an event breaking any rule is not applied.
+        Violations are collected in self.violations, or passed to on_violation
+        as they happen instead.
+        """
+        self.starting_cash = starting_cash
+        self.cash = starting_cash
+        self.index = {}
+        self.symbols = []
+        self.shares = array("d")
+        self.prices = array("d")
+        self.rules = list(rules)
+        self.reject_violations = reject_violations
+        self.on_violation = on_violation
+        self.violations = []
+        self.events = 0
+
+    def slot(self, symbol):
+        """Array index of a symbol, adding it on first sight"""
+        i = self.index.get(symbol)
+        if i is None:
+            i = self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.shares.append(0.0)
+            self.prices.append(0.0)
+        return i
+
+    def position(self, symbol):
+        """Shares held of a symbol"""
+        i = self.index.get(symbol)
+        return self.shares[i] if i is not None else 0.0
+
+    def apply(self, action, symbol, shares, price, amount=None):
+        """
+        Apply one BUY/SELL. The cash moved is abs(amount) when given, else
+        shares x price. Returns False if a rule rejected the event.
+        """
+        cost = abs(amount) if amount is not None else shares * price
+        index = self.events
+        self.events += 1
+
+        if self.rules:
+            event = {"index": index, "action": action, "symbol": symbol, "shares": shares, "price": price, "cost": cost}
+            found = [v for v in (rule(self, event) for rule in self.rules) if v is not None]
+            if found:
+                if self.on_violation is None:
+                    self.violations.extend(found)
+                else:
+                    for violation in found:
+                        self.on_violation(violation)
+                if self.reject_violations:
+                    return False
+
+        i = self.slot(symbol)
+        if action == "BUY":
+            self.cash -= cost
+            self.shares[i] += shares
+        elif action == "SELL":
+            self.cash += cost
+            remaining = self.shares[i] - shares
+            # Remove if sold all
+            self.shares[i] = remaining if remaining > DUST else 0.0
+        self.prices[i] = price
+        return True
+
+    def apply_transaction(self, txn, use_amount=True):
+        """Apply a transactions.json record; cash from its amount, or shares x price"""
+        return self.apply(
+            txn.get("action", "").upper(), txn.get("symbol"), txn.get("shares", 0), txn.get("price", 0),
+            txn.get("amount") if use_amount else None
+        )
+
+    def positions(self):
+        """{symbol: shares} of the open positions"""
+        return {s: n for s, n in zip(self.symbols, self.shares) if n > 0}
+
+    def value(self, prices=None):
+        """Cash plus open positions marked at prices ({symbol: price}), else at the last trade price"""
+        prices = prices or {}
+        return self.cash + sum(n * prices.get(s, p) for s, n, p in zip(self.symbols, self.shares, self.prices) if n > 0)
+
+    def snapshot(self):
+        """Current state as plain lists: cash, symbols and per-symbol shares and last trade prices"""
+        return {
+            "cash": self.cash,
+            "symbols": list(self.symbols),
+            "shares": self.shares.tolist(),
+            "prices": self.prices.tolist()
+        }
+
+class TransactionStream:
+    """
+    Iterate the "transactions" array of a transactions.json one record at a time,
+    reading the file in chunks. The other top-level fields (lastUpdated,
+    currentBalance, ...) are collected into self.fields as they are passed, so
+    all of them are available once iteration finishes.
+    """
+
+    def __init__(self, path, chunk_size=1 << 16):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fields = {}
+        self.decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        with open(self.path) as f:
+            self.file = f
+            self.buffer = ""
+            self.pos = 0
+            self.eof = False
+
+            self.expect("{")
+            if self.peek() == "}":
+                return
+            while True:
+                key = self.value()
+                self.expect(":")
+                if key == "transactions":
+                    yield from self.array()
+                else:
+                    self.fields[key] = self.value()
+                if self.expect(",}") == "}":
+                    return
+
+    def array(self):
+        """Yield the elements of the array starting at the current position"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+    def read(self):
+        """Append the next chunk to the buffer, dropping what was already parsed"""
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError(f"{self.path}: unexpected end of file")
+            self.read()
+
+    def expect(self, allowed):
+        """Consume the next character, which must be one of allowed"""
+        char = self.peek()
+        if char not in allowed:
+            raise ValueError(f"{self.path}: expected one of {allowed!r}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the JSON value at the current position, reading more until it is complete"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number cut off by the end of the chunk ("21" of "2100.5") decodes
+                # too; it's only complete if what follows can follow a value
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in " \t\r\n,:]}"):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read()
+
+def segmented_accumulate(ufunc, values, starts):
+    """
+    ufunc.accumulate over values, restarting at every row flagged in starts.
+    Running totals are added in order exactly like a replay would (pandas'
+    grouped cumsum compensates rounding, so it can differ in the last bit).
+    Segments are laid out as padded rows, bucketed by length, and accumulated
+    along each row.
+    """
+    import numpy as np
+
+    segment = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    lengths = np.diff(np.append(first, len(values)))
+    offset = np.arange(len(values)) - first[segment]
+    buckets = np.ceil(np.log2(lengths)).astype(np.uint8)
+    row_buckets = buckets[segment]
+    by_bucket = np.split(np.argsort(row_buckets, kind="stable"), np.cumsum(np.bincount(row_buckets))[:-1])
+
+    sums = np.empty(len(values))
+    local = np.empty(len(first), dtype=int)
+    for bucket in np.flatnonzero(np.bincount(buckets)):
+        chosen = np.flatnonzero(buckets == bucket)
+        local[chosen] = np.arange(len(chosen))
+        rows = by_bucket[bucket]
+        at = (local[segment[rows]], offset[rows])
+        grid = np.zeros((len(chosen), 1 << bucket))
+        grid[at] = values[rows]
+        sums[rows] = ufunc.accumulate(grid, axis=1)[at]
+    return sums
+
+def transaction_columns(transactions):
+    """{action, symbol, shares, price} arrays for a list of transactions.json records"""
+    import numpy as np
+
+    return {
+        "action": np.array(list(map(itemgetter("action"), transactions)), dtype=object),
+        "symbol": np.array(list(map(itemgetter("symbol"), transactions)), dtype=object),
+        "shares": np.array(list(map(itemgetter("shares"), transactions)), dtype=float),
+        "price": np.array(list(map(itemgetter("price"), transactions)), dtype=float)
+    }
+
+def bulk_violations(columns, starting_cash=STARTING_CASH, cash_tolerance=0.0, share_tolerance=0.0):
+    """
+    Vectorized equivalent of replaying every transaction through a recording
+    Ledger with sufficient_cash(cash_tolerance) and owned_shares(share_tolerance),
+    given the history as transaction_columns (or a DataFrame with those columns).
+    Cash before each row is a cumulative sum of signed costs and shares held
+    before each row a per-symbol cumulative sum, added in replay order so both
+    match the ledger exactly.
+    Returns (violations, final cash, open positions) like the replay would.
+    """
+    import numpy as np
+    import pandas as pd
+
+    actions = np.asarray(columns["action"], dtype=object)
+    symbols = np.asarray(columns["symbol"], dtype=object)
+    shares = np.asarray(columns["shares"], dtype=float)
+    prices = np.asarray(columns["price"], dtype=float)
+    count = len(actions)
+    if not count:
+        return [], starting_cash, {}
+    cost = shares * prices
+    action_codes, action_names = pd.factorize(actions)
+    is_buy = (action_names == "BUY")[action_codes]
+    is_sell = (action_names == "SELL")[action_codes]
+
+    # Cash before each row
+    signed = np.where(is_buy, -cost, np.where(is_sell, cost, 0.0))
+    cash = np.cumsum(np.concatenate([[starting_cash], signed]))
+    cash_before = cash[:-1]
+
+    # Shares held after each row, worked out with the rows grouped by symbol
+    codes, names = pd.factorize(symbols)
+    order = np.argsort(codes.astype(np.min_scalar_type(len(names))), kind="stable")
+    grouped = codes[order]
+    delta = np.where(is_buy, shares, np.where(is_sell, -shares, 0.0))[order]
+    sells = is_sell[order]
+    first = np.concatenate([[True], grouped[1:] != grouped[:-1]])
+
+    # The ledger restarts a symbol at zero after any SELL leaving DUST or less.
+    # Which SELLs those are depends on the holdings, so start from a running
+    # minimum clamp and re-sum until they stop changing; each pass settles at
+    # least the next one. Chains of dust resets (BUY 1, SELL 0.99995, ...) can
+    # take a pass per reset, so after MAX_RESET_PASSES the symbols still
+    # changing are replayed through a Ledger instead
+    running = segmented_accumulate(np.add, delta, first)
+    clamped = running
+    if (running < 0).any():
+        clamped = running - np.minimum(segmented_accumulate(np.minimum, running, first), 0.0)
+    resets = sells & (clamped <= DUST)
+    for _ in range(MAX_RESET_PASSES):
+        starts = first.copy()
+        starts[1:] |= resets[:-1]
+        held = segmented_accumulate(np.add, delta, starts) if resets.any() else running
+        settled = sells & (held <= DUST)
+        if np.array_equal(settled, resets):
+            break
+        resets, previous = settled, resets
+    else:
+        # A symbol whose resets didn't move on the last pass is already exact
+        unsettled = np.isin(grouped, grouped[resets != previous])
+        rows = np.flatnonzero(unsettled)
+        replay = Ledger()
+        for row, action, code, amount in zip(rows.tolist(), actions[order[rows]].tolist(),
+                                             grouped[rows].tolist(), shares[order[rows]].tolist()):
+            replay.apply(action, code, amount, 0.0)
+            held[row] = replay.position(code)
+        resets = previous & ~unsettled
+    held[resets] = 0.0
+
+    held_before = np.empty(count)
+    held_before[order] = np.where(first, 0.0, np.concatenate([[0.0], held[:-1]]))
+
+    buy_violation = is_buy & (cash_before < cost - cash_tolerance)
+    sell_violation = is_sell & (held_before < shares - share_tolerance)
+
+    violations = []
+    for i in np.flatnonzero(buy_violation | sell_violation).tolist():
+        event = {"index": i, "action": actions[i], "symbol": symbols[i], "shares": float(shares[i]),
+                 "price": float(prices[i]), "cost": float(cost[i])}
+        if buy_violation[i]:
+            violations.append({**event, "type": "ILLEGAL_BUY", "cash": float(cash_before[i])})
+        else:
+            violations.append({**event, "type": "ILLEGAL_SELL", "owned": float(held_before[i])})
+
+    # Final holdings are each symbol's last row
+    last = np.concatenate([first[1:], [True]])
+    positions = {names[code]: float(amount) for code, amount in zip(grouped[last], held[last]) if amount > 0}
+
+    return violations, float(cash[-1]), positions
\ No newline at end of file
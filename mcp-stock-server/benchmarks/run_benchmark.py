@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the MCP Stock Prices Server.
+Starts local stub upstreams, points the data source adapters at them and drives
+StockPricesServer with concurrent workloads. Prints a JSON report with
+throughput, latency percentiles and upstream call counts for regression tracking.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+# Add the project root to the path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stub_upstreams import StubUpstreams
+
+SCENARIOS = ("current", "history", "batch", "mixed")
+
+# Adapters need a base URL in replay mode; the host is not part of the archive key
+REPLAY_BASE_URL = "http://replay.invalid"
+
+def make_universe(size: int) -> List[str]:
+    """Build a list of letter-only ticker symbols"""
+    tickers = []
+    for i in range(size):
+        name = ""
+        n = i
+        while True:
+            name = chr(ord("A") + n % 26) + name
+            n = n // 26 - 1
+            if n < 0:
+                break
+        tickers.append(f"T{name}")
+    return tickers
+
+def build_workload(scenario: str, universe: List[str], requests: int, batch_size: int,
+                   history_days: int, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Build the list of (tool, arguments) calls for a scenario"""
+    rng = random.Random(seed)
+    end = datetime.now()
+    
+    def current():
+        return "get_current_price", {"ticker": rng.choice(universe)}
+    
+    def history():
+        # Ranges end on a recent day and span up to history_days, like chart requests
+        range_end = end - timedelta(days=rng.randint(0, 5))
+        range_start = range_end - timedelta(days=rng.randint(20, history_days))
+        return "get_prices", {
+            "ticker": rng.choice(universe),
+            "start": range_start.strftime("%Y-%m-%d"),
+            "end": range_end.strftime("%Y-%m-%d"),
+            "adjusted": rng.random() < 0.8
+        }
+    
+    def batch():
+        return "get_prices_batch", {
+            "tickers": rng.sample(universe, min(batch_size, len(universe))),
+            "start": (end - timedelta(days=history_days)).strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d")
+        }
+    
+    if scenario == "current":
+        makers = [current]
+    elif scenario == "history":
+        makers = [history]
+    elif scenario == "batch":
+        makers = [batch]
+    else:
+        # Dashboard-heavy mix with occasional pipeline refreshes
+        makers = [current] * 6 + [history] * 3 + [batch]
+    
+    return [rng.choice(makers)() for _ in range(requests)]
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds"""
+    if not samples:
+        return {}
+    
+    ordered = sorted(samples)
+    
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+    
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "p99_ms": round(pick(99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+def count_errors(result: Dict[str, Any]) -> int:
+    if "error" in result:
+        return 1
+    return sum(1 for r in result.get("results", {}).values() if not r or "error" in r)
+
+def upstream_counts(upstreams) -> Dict[str, Dict[str, int]]:
+    """Calls per upstream; when replaying, the responses served from the archive"""
+    if upstreams is not None:
+        return upstreams.call_counts()
+    
+    from src.http_archive import get_archive
+    sources = get_archive().get_stats()["sources"]
+    return {name: {"calls": counts["replayed"] + counts["misses"], **counts} for name, counts in sources.items()}
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one benchmark scenario and return the report"""
+    behaviours = {}
+    if args.upstream_config:
+        behaviours = json.loads(Path(args.upstream_config).read_text())
+    else:
+        default = {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "throttle_per_minute": args.throttle_per_minute
+        }
+        behaviours = {name: dict(default) for name in ("stooq", "alphavantage", "yahoo")}
+    
+    # Replays are served from the archive, so the stubs aren't started
+    upstreams = None
+    if args.replay:
+        os.environ.update({
+            "MCP_STOCK_HTTP_REPLAY": args.replay,
+            "MCP_STOCK_REPLAY_SPEED": str(args.replay_speed),
+            "STOOQ_BASE_URL": REPLAY_BASE_URL,
+            "ALPHAVANTAGE_BASE_URL": REPLAY_BASE_URL,
+            "YAHOO_BASE_URL": REPLAY_BASE_URL
+        })
+    else:
+        if args.record:
+            os.environ["MCP_STOCK_HTTP_RECORD"] = args.record
+        upstreams = StubUpstreams(behaviours, seed=args.seed)
+        os.environ.update(await upstreams.start())
+    
+    from src.server import StockPricesServer
+    from src.http_archive import get_archive
+    
+    with tempfile.TemporaryDirectory(prefix="mcp-bench-") as cache_dir:
+        server = StockPricesServer(cache_dir=cache_dir)
+        for source in server.rate_limiter.limits:
+            server.rate_limiter.limits[source] = args.rate_limit
+        
+        universe = make_universe(args.universe)
+        workload = build_workload(args.scenario, universe, args.requests, args.batch_size,
+                                  args.history_days, args.seed)
+        
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies: Dict[str, List[float]] = {}
+        errors = 0
+        
+        async def call(tool: str, arguments: Dict[str, Any]):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                result = await server.handle_tool_call(tool, arguments)
+                latencies.setdefault(tool, []).append(time.perf_counter() - start)
+                errors += count_errors(result)
+        
+        # Warm-up pass so import and connection setup costs are excluded
+        for tool, arguments in workload[:args.warmup]:
+            await server.handle_tool_call(tool, arguments)
+        warm_counts = upstream_counts(upstreams)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*[call(tool, arguments) for tool, arguments in workload])
+        elapsed = time.perf_counter() - started
+        
+        stats = server.get_stats()
+        if upstreams is not None:
+            await upstreams.stop()
+    
+    all_samples = [s for samples in latencies.values() for s in samples]
+    upstream_calls = {
+        name: {key: counts[key] - warm_counts.get(name, {}).get(key, 0) for key in counts}
+        for name, counts in upstream_counts(upstreams).items()
+    }
+    archive = get_archive()
+    
+    return {
+        "benchmark": "mcp-stock-server",
+        "timestamp": datetime.now().isoformat(),
+        "scenario": args.scenario,
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "universe": args.universe,
+            "batch_size": args.batch_size,
+            "history_days": args.history_days,
+            "rate_limit_per_minute": args.rate_limit,
+            "seed": args.seed,
+            "upstreams": "replay" if args.replay else behaviours
+        },
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(workload) / elapsed, 3) if elapsed else 0.0,
+        "errors": errors,
+        "latency": percentiles(all_samples),
+        "latency_by_tool": {tool: percentiles(samples) for tool, samples in latencies.items()},
+        "upstream_calls": upstream_calls,
+        "upstream_calls_total": sum(c["calls"] for c in upstream_calls.values()),
+        "server": {
+            "sources": {name: {k: v for k, v in s.items() if k != "latency"} for name, s in stats["sources"].items()},
+            "cache": {k: v for k, v in stats["cache"].items() if k != "files"},
+            "rate_limiter": stats["rate_limiter"]
+        },
+        "http_archive": archive.get_stats() if archive else None
+    }
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline MCP stock server benchmark")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--universe", type=int, default=100, help="Number of distinct tickers")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--warmup", type=int, default=5, help="Requests to run before timing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate-limit", type=int, default=1_000_000,
+                        help="Calls per minute allowed per source by the server's rate limiter")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-per-minute", type=int, default=0)
+    parser.add_argument("--upstream-config", help="JSON file with per-source stub behaviour")
+    parser.add_argument("--record", help="Record upstream responses to this archive while running against the stubs")
+    parser.add_argument("--replay", help="Serve upstream responses from a recorded archive instead of the stubs")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Replay at recorded timing divided by this factor (0 = no delay)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Show server logging")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    
+    # Keep stdout clean for the JSON report
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+    
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, indent=2)
+    
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Local stub HTTP servers emulating the upstream data sources.
+Serves Stooq CSV, Alpha Vantage CSV and Yahoo chart API responses with
+deterministic synthetic bars and configurable latency, error and throttle
+behaviour, and counts every call so benchmarks can report upstream usage.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+@dataclass
+class StubBehaviour:
+    """How a stub upstream responds"""
+    latency_ms: float = 50.0        # Mean response latency
+    jitter_ms: float = 20.0         # Uniform +/- jitter around the mean
+    error_rate: float = 0.0         # Fraction of calls answered with HTTP 500
+    throttle_per_minute: int = 0    # Calls allowed per rolling minute (0 = unlimited)
+    
+    @classmethod
+    def from_dict(cls, config: Optional[dict]) -> "StubBehaviour":
+        return cls(**(config or {}))
+
+@dataclass
+class StubStats:
+    """Counters for one stub upstream"""
+    calls: int = 0
+    errors: int = 0
+    throttled: int = 0
+    recent: List[float] = field(default_factory=list)
+
+@lru_cache(maxsize=None)
+def _history(ticker: str) -> tuple:
+    """Deterministic daily OHLCV bars (business days only) from 2015 to today"""
+    seed = int.from_bytes(hashlib.md5(ticker.encode()).digest()[:4], "big")
+    rng = random.Random(seed)
+    price = 20 + rng.random() * 480
+    
+    bars = []
+    day = datetime(2015, 1, 1)
+    end = datetime.now()
+    while day <= end:
+        if day.weekday() < 5:
+            open_price = price
+            price = max(1.0, price * (1 + rng.gauss(0.0004, 0.015)))
+            bars.append({
+                "date": day,
+                "open": round(open_price, 4),
+                "high": round(max(open_price, price) * (1 + abs(rng.gauss(0, 0.004))), 4),
+                "low": round(min(open_price, price) * (1 - abs(rng.gauss(0, 0.004))), 4),
+                "close": round(price, 4),
+                "volume": int(rng.uniform(1e5, 5e7))
+            })
+        day += timedelta(days=1)
+    
+    return tuple(bars)
+
+def synthetic_bars(ticker: str, start: datetime, end: datetime) -> List[dict]:
+    """Bars for a ticker between two dates; any range yields the same prices"""
+    return [b for b in _history(ticker.upper()) if start <= b["date"] <= end]
+
+# Regular session in UTC (09:30-16:00 US/Eastern, ignoring daylight saving)
+SESSION_OPEN_UTC = timedelta(hours=14, minutes=30)
+SESSION_MINUTES = 390
+
+@lru_cache(maxsize=4096)
+def _minute_bars(ticker: str, day: datetime) -> tuple:
+    """Deterministic minute bars walking from a daily bar's open to its close"""
+    daily = [b for b in _history(ticker) if b["date"] == day]
+    if not daily:
+        return ()
+    
+    bar = daily[0]
+    seed = int.from_bytes(hashlib.md5(f"{ticker}{day:%Y%m%d}".encode()).digest()[:4], "big")
+    rng = random.Random(seed)
+    
+    # Random walk pinned to the daily open and close (a discrete Brownian bridge)
+    walk = [0.0]
+    for _ in range(SESSION_MINUTES):
+        walk.append(walk[-1] + rng.gauss(0, 0.0008))
+    drift = (bar["close"] / bar["open"] - 1) - walk[-1]
+    prices = [bar["open"] * (1 + w + drift * i / SESSION_MINUTES) for i, w in enumerate(walk)]
+    
+    start = day.replace(tzinfo=timezone.utc) + SESSION_OPEN_UTC
+    minutes = []
+    for i in range(SESSION_MINUTES):
+        open_price, close_price = prices[i], prices[i + 1]
+        minutes.append({
+            "time": start + timedelta(minutes=i),
+            "open": round(open_price, 4),
+            "high": round(max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.0003))), 4),
+            "low": round(min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.0003))), 4),
+            "close": round(close_price, 4),
+            "volume": max(1, int(bar["volume"] / SESSION_MINUTES * rng.uniform(0.3, 1.7)))
+        })
+    
+    return tuple(minutes)
+
+def synthetic_intraday(ticker: str, start: datetime, end: datetime, step_minutes: int) -> List[dict]:
+    """Intraday bars of step_minutes between two UTC times, aggregated from minute bars"""
+    bars = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    while day <= end.replace(tzinfo=None):
+        minutes = _minute_bars(ticker.upper(), day)
+        for i in range(0, len(minutes), step_minutes):
+            chunk = minutes[i:i + step_minutes]
+            if start <= chunk[0]["time"] < end:
+                bars.append({
+                    "time": chunk[0]["time"],
+                    "open": chunk[0]["open"],
+                    "high": max(m["high"] for m in chunk),
+                    "low": min(m["low"] for m in chunk),
+                    "close": chunk[-1]["close"],
+                    "volume": sum(m["volume"] for m in chunk)
+                })
+        day += timedelta(days=1)
+    return bars
+
+class StubUpstream(ABC):
+    """Base stub: applies latency/error/throttle behaviour around a handler"""
+    
+    name = "stub"
+    
+    def __init__(self, behaviour: StubBehaviour, seed: int = 0):
+        self.behaviour = behaviour
+        self.stats = StubStats()
+        self.rng = random.Random(seed)
+        self.runner: Optional[web.AppRunner] = None
+        self.port = 0
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+    
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.stats.calls += 1
+        
+        delay = self.behaviour.latency_ms + self.rng.uniform(-1, 1) * self.behaviour.jitter_ms
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        
+        if self.behaviour.throttle_per_minute:
+            now = time.monotonic()
+            self.stats.recent = [t for t in self.stats.recent if t > now - 60]
+            if len(self.stats.recent) >= self.behaviour.throttle_per_minute:
+                self.stats.throttled += 1
+                return self.throttled_response()
+            self.stats.recent.append(now)
+        
+        if self.rng.random() < self.behaviour.error_rate:
+            self.stats.errors += 1
+            return web.Response(status=500, text="stub error")
+        
+        return self.respond(request)
+    
+    def throttled_response(self) -> web.Response:
+        return web.Response(status=429, text="Too Many Requests")
+    
+    @abstractmethod
+    def respond(self, request: web.Request) -> web.Response:
+        """Successful response for a request"""
+        pass
+
+class StooqStub(StubUpstream):
+    """Emulates https://stooq.com/q/d/l/ daily CSV downloads"""
+    
+    name = "stooq"
+    
+    def throttled_response(self) -> web.Response:
+        return web.Response(text="Exceeded the daily hits limit")
+    
+    def respond(self, request: web.Request) -> web.Response:
+        ticker = request.query.get("s", "").upper()
+        start = datetime.strptime(request.query.get("d1", "20150101"), "%Y%m%d")
+        end = datetime.strptime(request.query.get("d2", "20150101"), "%Y%m%d")
+        
+        bars = synthetic_bars(ticker, start, end)
+        if not bars:
+            return web.Response(text="No data")
+        
+        lines = ["Date,Open,High,Low,Close,Volume"]
+        lines.extend(
+            f"{b['date']:%Y-%m-%d},{b['open']},{b['high']},{b['low']},{b['close']},{b['volume']}"
+            for b in bars
+        )
+        return web.Response(text="\n".join(lines) + "\n", content_type="text/csv")
+
+class AlphaVantageStub(StubUpstream):
+    """Emulates the Alpha Vantage TIME_SERIES_DAILY[_ADJUSTED] and TIME_SERIES_INTRADAY CSV endpoints"""
+    
+    name = "alphavantage"
+    
+    def throttled_response(self) -> web.Response:
+        return web.Response(text='{"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."}')
+    
+    def respond(self, request: web.Request) -> web.Response:
+        ticker = request.query.get("symbol", "").upper()
+        
+        if request.query.get("function") == "TIME_SERIES_INTRADAY":
+            return self.respond_intraday(ticker, request)
+        
+        adjusted = request.query.get("function") == "TIME_SERIES_DAILY_ADJUSTED"
+        
+        # outputsize=full returns the whole history, newest first
+        bars = synthetic_bars(ticker, datetime(2015, 1, 1), datetime.now())
+        if adjusted:
+            lines = ["timestamp,open,high,low,close,adjusted_close,volume,dividend_amount,split_coefficient"]
+            lines.extend(
+                f"{b['date']:%Y-%m-%d},{b['open']},{b['high']},{b['low']},{b['close']},{b['close']},{b['volume']},0.0000,1.0"
+                for b in reversed(bars)
+            )
+        else:
+            lines = ["timestamp,open,high,low,close,volume"]
+            lines.extend(
+                f"{b['date']:%Y-%m-%d},{b['open']},{b['high']},{b['low']},{b['close']},{b['volume']}"
+                for b in reversed(bars)
+            )
+        return web.Response(text="\n".join(lines) + "\n", content_type="text/csv")
+    
+    def respond_intraday(self, ticker: str, request: web.Request) -> web.Response:
+        # One calendar month per call, exchange-local timestamps, newest first
+        step = int(request.query.get("interval", "60min").rstrip("min"))
+        month = datetime.strptime(request.query.get("month", datetime.now().strftime("%Y-%m")), "%Y-%m")
+        start = month.replace(tzinfo=timezone.utc)
+        end = (month + timedelta(days=32)).replace(day=1, tzinfo=timezone.utc)
+        
+        eastern = ZoneInfo("America/New_York")
+        lines = ["timestamp,open,high,low,close,volume"]
+        lines.extend(
+            f"{b['time'].astimezone(eastern):%Y-%m-%d %H:%M:%S},{b['open']},{b['high']},{b['low']},{b['close']},{b['volume']}"
+            for b in reversed(synthetic_intraday(ticker, start, end, step))
+        )
+        return web.Response(text="\n".join(lines) + "\n", content_type="text/csv")
+
+class YahooStub(StubUpstream):
+    """Emulates the Yahoo Finance v8 chart API"""
+    
+    name = "yahoo"
+    
+    def respond(self, request: web.Request) -> web.Response:
+        ticker = request.path.rstrip("/").split("/")[-1].upper()
+        start = datetime.fromtimestamp(int(request.query.get("period1", "0")), tz=timezone.utc).replace(tzinfo=None)
+        end = datetime.fromtimestamp(int(request.query.get("period2", "0")), tz=timezone.utc).replace(tzinfo=None)
+        
+        interval = request.query.get("interval", "1d")
+        if interval != "1d":
+            return self.respond_intraday(ticker, start, end, interval)
+        
+        bars = synthetic_bars(ticker, start, end)
+        payload = {
+            "chart": {
+                "result": [{
+                    "meta": {"symbol": ticker, "currency": "USD"},
+                    "timestamp": [int(b["date"].replace(tzinfo=timezone.utc).timestamp()) for b in bars],
+                    "indicators": {
+                        "quote": [{
+                            "open": [b["open"] for b in bars],
+                            "high": [b["high"] for b in bars],
+                            "low": [b["low"] for b in bars],
+                            "close": [b["close"] for b in bars],
+                            "volume": [b["volume"] for b in bars]
+                        }],
+                        "adjclose": [{"adjclose": [b["close"] for b in bars]}]
+                    }
+                }] if bars else None,
+                "error": None
+            }
+        }
+        return web.Response(text=json.dumps(payload), content_type="application/json")
+    
+    def respond_intraday(self, ticker: str, start: datetime, end: datetime, interval: str) -> web.Response:
+        step = {"1m": 1, "5m": 5, "60m": 60}.get(interval, 60)
+        bars = synthetic_intraday(ticker, start.replace(tzinfo=timezone.utc), end.replace(tzinfo=timezone.utc), step)
+        payload = {
+            "chart": {
+                "result": [{
+                    "meta": {"symbol": ticker, "currency": "USD", "dataGranularity": interval},
+                    "timestamp": [int(b["time"].timestamp()) for b in bars],
+                    "indicators": {
+                        "quote": [{
+                            "open": [b["open"] for b in bars],
+                            "high": [b["high"] for b in bars],
+                            "low": [b["low"] for b in bars],
+                            "close": [b["close"] for b in bars],
+                            "volume": [b["volume"] for b in bars]
+                        }]
+                    }
+                }] if bars else None,
+                "error": None
+            }
+        }
+        return web.Response(text=json.dumps(payload), content_type="application/json")
+
+class StubUpstreams:
+    """Starts all three stubs and exposes their base URLs and counters"""
+    
+    ENV_VARS = {
+        "stooq": "STOOQ_BASE_URL",
+        "alphavantage": "ALPHAVANTAGE_BASE_URL",
+        "yahoo": "YAHOO_BASE_URL"
+    }
+    
+    def __init__(self, behaviours: Optional[Dict[str, dict]] = None, seed: int = 0):
+        behaviours = behaviours or {}
+        self.stubs = {
+            stub_cls.name: stub_cls(StubBehaviour.from_dict(behaviours.get(stub_cls.name)), seed=seed + i)
+            for i, stub_cls in enumerate((StooqStub, AlphaVantageStub, YahooStub))
+        }
+    
+    async def start(self) -> Dict[str, str]:
+        """Start the stubs and return the environment pointing adapters at them"""
+        await asyncio.gather(*[stub.start() for stub in self.stubs.values()])
+        return {self.ENV_VARS[name]: stub.base_url for name, stub in self.stubs.items()}
+    
+    async def stop(self):
+        await asyncio.gather(*[stub.stop() for stub in self.stubs.values()])
+    
+    def call_counts(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "calls": stub.stats.calls,
+                "errors": stub.stats.errors,
+                "throttled": stub.stats.throttled
+            }
+            for name, stub in self.stubs.items()
+        }
+
+if __name__ == "__main__":
+    # Run the stubs standalone, e.g. to point a manually started server at them
+    async def serve():
+        upstreams = StubUpstreams()
+        env = await upstreams.start()
+        for key, value in env.items():
+            print(f"export {key}={value}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await upstreams.stop()
+    
+    asyncio.run(serve())
\ No newline at end of file
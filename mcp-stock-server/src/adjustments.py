@@ -0,0 +1,145 @@
+"""
+Corporate action adjustment engine.
+The cache stores raw (unadjusted) OHLCV bars plus a per-ticker table of splits
+and dividends; adjusted series are computed from them on read, vectorized.
+Bars from sources that only publish adjusted bars (Stooq) are flagged by their
+source and left as they are.
+"""
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+ACTION_COLUMNS = ['date', 'dividend', 'split']
+
+# Sources whose bars already reflect every split and dividend
+ADJUSTED_SOURCES = ['Stooq']
+
+def add_changes(df: pd.DataFrame) -> pd.DataFrame:
+    """Calculate change and change_percent from consecutive closes"""
+    if len(df) > 1:
+        df['change'] = df['close'].diff()
+        df['change_percent'] = (df['close'].pct_change() * 100)
+    else:
+        df['change'] = 0
+        df['change_percent'] = 0
+    return df
+
+def already_adjusted(bars: pd.DataFrame) -> np.ndarray:
+    """Per-bar flag: the bar came from a source that only publishes adjusted bars"""
+    if 'source' not in bars.columns:
+        return np.zeros(len(bars), dtype=bool)
+    return bars['source'].isin(ADJUSTED_SOURCES).to_numpy()
+
+def extract_actions(df: pd.DataFrame) -> pd.DataFrame:
+    """Pull the corporate action rows out of a standardized frame"""
+    if df is None or df.empty or 'dividend' not in df.columns:
+        return pd.DataFrame(columns=ACTION_COLUMNS)
+    
+    dividend = df['dividend'].fillna(0.0).astype(float)
+    split = df['split'].fillna(1.0).astype(float).replace(0.0, 1.0)
+    mask = (dividend > 0) | (split != 1.0)
+    
+    return pd.DataFrame({
+        'date': df.loc[mask, 'date'].values,
+        'dividend': dividend[mask].values,
+        'split': split[mask].values
+    })
+
+def merge_actions(existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Union two action tables, preferring the newer row for a date"""
+    frames = [f for f in (existing, new) if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=ACTION_COLUMNS)
+    
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined.drop_duplicates(subset=['date'], keep='last')
+    return combined.sort_values('date').reset_index(drop=True)[ACTION_COLUMNS]
+
+def adjustment_factors(dates: np.ndarray, close: np.ndarray, actions: pd.DataFrame):
+    """
+    Backward adjustment factors for each bar.
+    
+    Returns (price_factor, split_factor): multiply raw prices by price_factor to
+    get split- and dividend-adjusted prices, and divide raw volume by
+    split_factor. An action on date D affects every bar strictly before D.
+    """
+    n = len(dates)
+    price_factor = np.ones(n)
+    split_factor = np.ones(n)
+    
+    if n == 0 or actions is None or actions.empty:
+        return price_factor, split_factor
+    
+    action_dates = actions['date'].to_numpy()
+    splits = actions['split'].to_numpy(dtype=float)
+    dividends = actions['dividend'].to_numpy(dtype=float)
+    
+    # Number of bars before each action; those bars are the ones it adjusts
+    position = np.searchsorted(dates, action_dates, side='left')
+    
+    # Dividend ratio uses the last raw close before the ex-date, restated per post-split share
+    prev_close = np.where(position > 0, close[np.maximum(position - 1, 0)], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dividend_ratio = np.where(
+            (dividends > 0) & (prev_close > 0),
+            1.0 - dividends * splits / prev_close,
+            1.0
+        )
+    split_ratio = 1.0 / splits
+    
+    # Accumulate each action at its position, then take the product of all
+    # actions after each bar with a reversed cumulative product
+    price_events = np.ones(n + 1)
+    split_events = np.ones(n + 1)
+    np.multiply.at(price_events, position, dividend_ratio * split_ratio)
+    np.multiply.at(split_events, position, split_ratio)
+    
+    price_factor = np.cumprod(price_events[::-1])[::-1][1:]
+    split_factor = np.cumprod(split_events[::-1])[::-1][1:]
+    
+    return price_factor, split_factor
+
+def apply_adjustments(bars: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of raw bars with split- and dividend-adjusted prices.
+    Bars that are already adjusted keep their prices, so actions a later
+    fetch brings in are not applied to them a second time.
+    """
+    if bars is None or bars.empty:
+        return bars
+    
+    bars = bars.sort_values('date').reset_index(drop=True)
+    price_factor, split_factor = adjustment_factors(
+        bars['date'].to_numpy(),
+        bars['close'].to_numpy(dtype=float),
+        actions
+    )
+    done = already_adjusted(bars)
+    price_factor[done] = 1.0
+    split_factor[done] = 1.0
+    
+    adjusted = bars.copy()
+    adjusted[PRICE_COLUMNS] = bars[PRICE_COLUMNS].to_numpy(dtype=float) * price_factor[:, None]
+    adjusted['volume'] = bars['volume'].to_numpy(dtype=float) / split_factor
+    return adjusted
+
+def unapply_splits(bars: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+    """Turn split-adjusted bars (as Yahoo reports them) back into raw bars"""
+    if bars is None or bars.empty or actions is None or actions.empty:
+        return bars
+    
+    split_actions = actions.assign(dividend=0.0)
+    _, split_factor = adjustment_factors(
+        bars['date'].to_numpy(),
+        bars['close'].to_numpy(dtype=float),
+        split_actions
+    )
+    
+    raw = bars.copy()
+    raw[PRICE_COLUMNS] = bars[PRICE_COLUMNS].to_numpy(dtype=float) / split_factor[:, None]
+    raw['volume'] = bars['volume'].to_numpy(dtype=float) * split_factor
+    if 'dividend' in raw.columns:
+        # Yahoo restates dividends per post-split share as well
+        raw['dividend'] = bars['dividend'].to_numpy(dtype=float) / split_factor
+    return raw
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""
+Resumable bulk backfill jobs.
+A job splits its tickers' date range into (ticker, calendar year) units and
+loads them through the server's daily cache path at background priority, so
+rate budgets are shared fairly with interactive calls. Jobs are persisted to
+{cache_dir}/jobs/{job_id}.json and checkpointed as units complete; queued and
+running jobs are picked up again after a restart and skip finished units.
+Units lost between checkpoints are cheap to redo, since their ranges are
+already in the coverage manifest and are served from the cache.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.rate_limiter import priority_class
+
+logger = logging.getLogger(__name__)
+
+# Units loaded concurrently within a job; the rate limiter paces the actual fetches
+UNIT_CONCURRENCY = 4
+
+# Attempts per unit before it is recorded as failed
+MAX_ATTEMPTS = 3
+
+# Per-run bookkeeping that isn't persisted
+RUN_FIELDS = ("run_started", "run_units", "attempts", "saved", "notified")
+
+# Minimum seconds between checkpoints and between progress notifications
+CHECKPOINT_SECONDS = 1.0
+PROGRESS_SECONDS = 2.0
+
+def unit_ranges(start_date: str, end_date: str) -> List[List[str]]:
+    """Split a date range at calendar year boundaries"""
+    ranges = []
+    for year in range(int(start_date[:4]), int(end_date[:4]) + 1):
+        ranges.append([max(start_date, f"{year}-01-01"), min(end_date, f"{year}-12-31")])
+    return ranges
+
+def validate_backfill_arguments(arguments: Dict[str, Any]) -> Optional[str]:
+    """Return an error message for invalid start_backfill arguments"""
+    if not [t for t in arguments.get("tickers", []) if t]:
+        return "At least one ticker is required"
+    if not arguments.get("start"):
+        return "Start date is required"
+    
+    try:
+        start = datetime.strptime(arguments["start"], '%Y-%m-%d')
+        end = datetime.strptime(arguments.get("end") or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+    except ValueError:
+        return "Dates must be YYYY-MM-DD"
+    if start > end:
+        return "Start date must not be after end date"
+    return None
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job: progress, ETA and failures, without the unit list"""
+    total = len(job["units"])
+    done = len(job["done"])
+    failed = len(job["failed"])
+    remaining = total - done - failed
+    
+    # ETA from this run's pace; units already done before a restart don't count
+    eta = None
+    run_units = job.get("run_units", 0)
+    if job["status"] == "running" and run_units and remaining:
+        eta = round(remaining * (time.time() - job["run_started"]) / run_units, 1)
+    
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "tickers": job["tickers"],
+        "start": job["start"],
+        "end": job["end"],
+        "created": job["created"],
+        "finished": job.get("finished"),
+        "units_total": total,
+        "units_done": done,
+        "units_failed": failed,
+        "percent": round(100.0 * (done + failed) / total, 1) if total else 100.0,
+        "eta_seconds": eta,
+        "failures": {
+            f"{job['units'][int(i)][0]} {job['units'][int(i)][1]}..{job['units'][int(i)][2]}": error
+            for i, error in job["failed"].items()
+        }
+    }
+
+def merge_statuses(statuses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine one job's status from several shards"""
+    states = {s["status"] for s in statuses}
+    for state in ("running", "queued", "cancelled"):
+        if state in states:
+            break
+    else:
+        state = "completed"
+    
+    total = sum(s["units_total"] for s in statuses)
+    finished = sum(s["units_done"] + s["units_failed"] for s in statuses)
+    etas = [s["eta_seconds"] for s in statuses if s["eta_seconds"] is not None]
+    
+    return {
+        **statuses[0],
+        "status": state,
+        "tickers": [t for s in statuses for t in s["tickers"]],
+        "finished": None if state in ("running", "queued") else max(s["finished"] or 0 for s in statuses),
+        "units_total": total,
+        "units_done": sum(s["units_done"] for s in statuses),
+        "units_failed": sum(s["units_failed"] for s in statuses),
+        "percent": round(100.0 * finished / total, 1) if total else 100.0,
+        "eta_seconds": max(etas) if etas else None,
+        "failures": {k: v for s in statuses for k, v in s["failures"].items()}
+    }
+
+def progress_notification(token: Any, status: Dict[str, Any]) -> Dict[str, Any]:
+    """MCP notifications/progress message for a job status"""
+    finished = status["units_done"] + status["units_failed"]
+    message = f"{status['status']}: {finished}/{status['units_total']} units"
+    if status["eta_seconds"] is not None:
+        message += f", ETA {status['eta_seconds']:.0f}s"
+    
+    return {
+        "jsonrpc": "2.0",
+        "method": "notifications/progress",
+        "params": {
+            "progressToken": token,
+            "progress": finished,
+            "total": status["units_total"],
+            "message": message
+        }
+    }
+
+class BackfillJobs:
+    """Persisted FIFO queue of backfill jobs, run one at a time"""
+    
+    def __init__(self, jobs_dir: Path, run_unit: Callable[[str, str, str], Awaitable[Optional[str]]],
+                 prepare: Optional[Callable[[], Awaitable[None]]] = None,
+                 notify: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        run_unit(ticker, start, end) loads one unit and returns None on success or
+        an error message. prepare() runs once before the first unit; notify()
+        sends a progress notification message.
+        """
+        self.jobs_dir = Path(jobs_dir)
+        self.run_unit = run_unit
+        self.prepare = prepare
+        self.notify = notify
+        
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.pending: deque = deque()
+        self.progress_tokens: Dict[str, Any] = {}
+        self.runner: Optional[asyncio.Task] = None
+        self.current: Optional[asyncio.Task] = None
+        self.loaded = False
+    
+    def load(self):
+        """Read persisted jobs and queue the unfinished ones in creation order"""
+        if self.loaded:
+            return
+        self.loaded = True
+        
+        if not self.jobs_dir.exists():
+            return
+        
+        for path in self.jobs_dir.glob("*.json"):
+            try:
+                job = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable job file {path.name}: {str(e)}")
+                continue
+            self.jobs[job["id"]] = job
+        
+        resumed = sorted((j for j in self.jobs.values() if j["status"] in ("queued", "running")),
+                         key=lambda j: j["created"])
+        for job in resumed:
+            job["status"] = "queued"
+            self.pending.append(job["id"])
+        
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} backfill jobs")
+    
+    def save(self, job: Dict[str, Any]):
+        """Write a job's checkpoint atomically"""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        path = self.jobs_dir / f"{job['id']}.json"
+        tmp = path.with_suffix(".tmp")
+        persisted = {k: v for k, v in job.items() if k not in RUN_FIELDS}
+        tmp.write_text(json.dumps(persisted))
+        tmp.replace(path)
+        job["saved"] = time.time()
+    
+    def start(self):
+        """Start the runner if there is queued work"""
+        if self.pending and (self.runner is None or self.runner.done()):
+            self.runner = asyncio.create_task(self.run())
+    
+    def submit(self, tickers: List[str], start_date: str, end_date: str, job_id: Optional[str] = None,
+               progress_token: Any = None) -> Dict[str, Any]:
+        """Create, persist and queue a job"""
+        self.load()
+        
+        job_id = job_id or uuid.uuid4().hex[:12]
+        if job_id in self.jobs:
+            return {"error": f"Job {job_id} already exists"}
+        
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "tickers": tickers,
+            "start": start_date,
+            "end": end_date,
+            "created": time.time(),
+            "finished": None,
+            "units": [[ticker, s, e] for ticker in tickers for s, e in unit_ranges(start_date, end_date)],
+            "done": [],
+            "failed": {}
+        }
+        self.jobs[job_id] = job
+        self.save(job)
+        
+        if progress_token is not None:
+            self.progress_tokens[job_id] = progress_token
+        self.pending.append(job_id)
+        self.start()
+        return job_status(job)
+    
+    def status(self, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """One job's status, or every job's"""
+        self.load()
+        
+        if job_id is None:
+            return {"jobs": [job_status(j) for j in sorted(self.jobs.values(), key=lambda j: j["created"])]}
+        if job_id not in self.jobs:
+            return {"error": f"Unknown job: {job_id}"}
+        return job_status(self.jobs[job_id])
+    
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Stop a queued or running job; finished units stay in the cache"""
+        self.load()
+        
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"error": f"Unknown job: {job_id}"}
+        if job["status"] in ("queued", "running"):
+            if job["status"] == "running" and self.current is not None:
+                self.current.cancel()
+            if job_id in self.pending:
+                self.pending.remove(job_id)
+            job["status"] = "cancelled"
+            job["finished"] = time.time()
+            self.save(job)
+            self.report(job, force=True)
+        return job_status(job)
+    
+    def report(self, job: Dict[str, Any], force: bool = False):
+        """Send a progress notification if the job has a token and one is due"""
+        token = self.progress_tokens.get(job["id"])
+        if token is None or self.notify is None:
+            return
+        if not force and time.time() - job.get("notified", 0.0) < PROGRESS_SECONDS:
+            return
+        
+        job["notified"] = time.time()
+        self.notify(progress_notification(token, job_status(job)))
+    
+    async def run(self):
+        """Run queued jobs one after another"""
+        with priority_class("background"):
+            if self.prepare is not None:
+                await self.prepare()
+            
+            while self.pending:
+                job = self.jobs[self.pending.popleft()]
+                self.current = asyncio.create_task(self.run_job(job))
+                try:
+                    await self.current
+                except asyncio.CancelledError:
+                    # Only the job was cancelled (cancel_job); keep serving the queue
+                    if asyncio.current_task().cancelling():
+                        raise
+                except Exception as e:
+                    logger.error(f"Backfill job {job['id']} stopped: {str(e)}")
+                finally:
+                    self.current = None
+    
+    async def run_job(self, job: Dict[str, Any]):
+        """Load a job's remaining units, checkpointing as they finish"""
+        finished = set(job["done"]) | {int(i) for i in job["failed"]}
+        queue = deque(i for i in range(len(job["units"])) if i not in finished)
+        
+        job["status"] = "running"
+        job["run_started"] = time.time()
+        job["run_units"] = 0
+        job["attempts"] = {}
+        self.save(job)
+        logger.info(f"Backfill job {job['id']}: {len(queue)} of {len(job['units'])} units to load")
+        
+        async def worker():
+            while queue:
+                index = queue.popleft()
+                ticker, start_date, end_date = job["units"][index]
+                try:
+                    error = await self.run_unit(ticker, start_date, end_date)
+                except Exception as e:
+                    error = str(e)
+                
+                if error is None:
+                    job["done"].append(index)
+                    job["run_units"] += 1
+                else:
+                    attempts = job["attempts"][index] = job["attempts"].get(index, 0) + 1
+                    if attempts < MAX_ATTEMPTS:
+                        queue.append(index)
+                        continue
+                    job["failed"][str(index)] = error
+                    job["run_units"] += 1
+                
+                if time.time() - job.get("saved", 0.0) >= CHECKPOINT_SECONDS:
+                    self.save(job)
+                self.report(job)
+        
+        await asyncio.gather(*[worker() for _ in range(UNIT_CONCURRENCY)])
+        
+        job["status"] = "completed"
+        job["finished"] = time.time()
+        self.save(job)
+        self.report(job, force=True)
+        logger.info(f"Backfill job {job['id']} completed: {len(job['done'])} units loaded, {len(job['failed'])} failed")
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Disk budget for the price cache.
+Tracks the size and last access of each cache partition (a ticker's daily bars
+and actions, or a ticker's intraday bars for one interval) and picks the least
+recently used partitions to evict when the cache grows past its budget.
+Pinned tickers are never evicted. Access times are kept in memory and saved to
+{cache_dir}/access.json, since filesystem atimes are often disabled.
+"""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACCESS_FILE = "access.json"
+
+# Evict down to this fraction of the budget so eviction doesn't run on every write
+LOW_WATERMARK = 0.9
+
+# ("daily", TICKER) or ("intraday", interval, TICKER)
+Partition = Tuple[str, ...]
+
+def partition_name(partition: Partition) -> str:
+    return "/".join(partition)
+
+def parse_partition(name: str) -> Partition:
+    return tuple(name.split("/"))
+
+class CacheBudget:
+    """Per-partition sizes and access times, and LRU eviction candidates"""
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = 0, pinned: Optional[Iterable[str]] = None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.pinned = {t.upper() for t in pinned or [] if t}
+        
+        self.sizes: Dict[Partition, int] = {}
+        self.accessed: Dict[Partition, float] = {}
+        self.scanned = False
+        self.dirty = False
+        
+        # Counters for the metrics surface
+        self.evictions = 0
+        self.evicted_bytes = 0
+        
+        self.load_access_times()
+    
+    def files(self, partition: Partition) -> List[Path]:
+        """Files on disk that belong to a partition"""
+        if partition[0] == "daily":
+            ticker = partition[1]
+            paths = [self.cache_dir / f"{ticker}.parquet", self.cache_dir / f"{ticker}.actions.parquet"]
+            return [p for p in paths if p.exists()]
+        
+        _, interval, ticker = partition
+        directory = self.cache_dir / "intraday" / interval / ticker
+        return list(directory.glob("*.parquet")) if directory.exists() else []
+    
+    def measure(self, partition: Partition) -> int:
+        total = 0
+        for path in self.files(partition):
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+    
+    def scan(self):
+        """Measure every partition on disk; ones never seen get their newest file's mtime as access time"""
+        partitions = {
+            ("daily", path.name[:-len(".parquet")].removesuffix(".actions"))
+            for path in self.cache_dir.glob("*.parquet")
+        }
+        partitions |= {
+            ("intraday", directory.parent.name, directory.name)
+            for directory in self.cache_dir.glob("intraday/*/*") if directory.is_dir()
+        }
+        
+        self.sizes = {}
+        for partition in partitions:
+            files = self.files(partition)
+            if not files:
+                continue
+            self.sizes[partition] = sum(f.stat().st_size for f in files)
+            if partition not in self.accessed:
+                self.accessed[partition] = max(f.stat().st_mtime for f in files)
+        
+        self.accessed = {p: t for p, t in self.accessed.items() if p in self.sizes}
+        self.scanned = True
+        logger.info(f"Cache budget: {len(self.sizes)} partitions, {self.total_bytes() / (1024 * 1024):.1f} MB")
+    
+    def touch(self, partition: Partition):
+        """Record an access"""
+        self.accessed[partition] = time.time()
+        self.dirty = True
+    
+    def record(self, partition: Partition):
+        """Re-measure a partition after a write"""
+        if self.scanned:
+            self.sizes[partition] = self.measure(partition)
+        self.touch(partition)
+    
+    def forget(self, partition: Partition, evicted: bool = False):
+        """Stop tracking a partition whose files were removed"""
+        size = self.sizes.pop(partition, 0)
+        self.accessed.pop(partition, None)
+        self.dirty = True
+        if evicted:
+            self.evictions += 1
+            self.evicted_bytes += size
+    
+    def reset(self):
+        """Forget everything after the whole cache was cleared"""
+        self.sizes.clear()
+        self.accessed.clear()
+        self.dirty = True
+    
+    def total_bytes(self) -> int:
+        return sum(self.sizes.values())
+    
+    def over_budget(self) -> bool:
+        return self.max_bytes > 0 and self.scanned and self.total_bytes() > self.max_bytes
+    
+    def victims(self) -> List[Partition]:
+        """Least recently used unpinned partitions to evict to get below the low watermark"""
+        if not self.over_budget():
+            return []
+        
+        excess = self.total_bytes() - int(self.max_bytes * LOW_WATERMARK)
+        chosen = []
+        for partition in sorted(self.sizes, key=lambda p: self.accessed.get(p, 0.0)):
+            if excess <= 0:
+                break
+            if partition[-1] in self.pinned:
+                continue
+            chosen.append(partition)
+            excess -= self.sizes[partition]
+        
+        if excess > 0:
+            logger.warning("Cache is over budget with only pinned partitions left")
+        return chosen
+    
+    def load_access_times(self):
+        path = self.cache_dir / ACCESS_FILE
+        try:
+            with open(path) as f:
+                self.accessed = {parse_partition(name): t for name, t in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {path}: {str(e)}")
+    
+    def save_access_times(self):
+        """Persist access times if they changed"""
+        if not self.dirty:
+            return
+        
+        path = self.cache_dir / ACCESS_FILE
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({partition_name(p): t for p, t in self.accessed.items()}))
+        tmp.replace(path)
+        self.dirty = False
+    
+    def get_stats(self) -> dict:
+        """Get budget statistics"""
+        return {
+            "max_bytes": self.max_bytes,
+            "tracked_bytes": self.total_bytes(),
+            "partitions": len(self.sizes),
+            "pinned": sorted(self.pinned),
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes
+        }
@@ -0,0 +1,212 @@
+"""
+Coverage manifest for the daily cache (manifest.sqlite in the cache directory).
+Records, per ticker, the date ranges that have been fetched, row and action
+counts, file sizes, the last refresh and the source. Coverage checks, gap
+planning and cache stats are lookups in an in-memory mirror of the manifest
+instead of opening Parquet files. Adjusted prices are derived from the same raw
+bars on read, so one entry serves both adjustment modes.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker TEXT PRIMARY KEY,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    actions INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    refreshed REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    PRIMARY KEY (ticker, start_date)
+);
+"""
+
+ENTRY_FIELDS = ['first_date', 'last_date', 'rows', 'actions', 'bytes', 'refreshed', 'source']
+
+# A closed date range, both ends YYYY-MM-DD
+Interval = Tuple[str, str]
+
+def next_day(date: str) -> str:
+    return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def previous_day(date: str) -> str:
+    return (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """Union of date ranges; ranges that touch (end + 1 day = start) are joined"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= next_day(merged[-1][1]):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_intervals(start_date: str, end_date: str, covered: List[Interval]) -> List[Interval]:
+    """Parts of [start_date, end_date] not in the (merged, sorted) covered ranges"""
+    gaps = []
+    cursor = start_date
+    for start, end in covered:
+        if end < cursor:
+            continue
+        if start > end_date:
+            break
+        if start > cursor:
+            gaps.append((cursor, previous_day(start)))
+        cursor = max(cursor, next_day(end))
+        if cursor > end_date:
+            return gaps
+    if cursor <= end_date:
+        gaps.append((cursor, end_date))
+    return gaps
+
+class CacheIndex:
+    """SQLite-backed manifest with an in-memory mirror for lookups"""
+    
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / MANIFEST_FILE
+        
+        # Written from the event loop and from the compactor thread
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.coverage: Dict[str, List[Interval]] = {}
+        self.load()
+    
+    def load(self):
+        """Read the manifest into memory, rebuilding it from the files if it is missing entries"""
+        for row in self.db.execute(f"SELECT ticker, {', '.join(ENTRY_FIELDS)} FROM tickers"):
+            self.entries[row[0]] = dict(zip(ENTRY_FIELDS, row[1:]))
+        for ticker, start, end in self.db.execute("SELECT ticker, start_date, end_date FROM coverage ORDER BY start_date"):
+            self.coverage.setdefault(ticker, []).append((start, end))
+        
+        unindexed = [
+            path for path in self.cache_dir.glob("*.parquet")
+            if not path.name.endswith(".actions.parquet") and path.stem not in self.entries
+        ]
+        if unindexed:
+            self.rebuild(unindexed)
+    
+    def rebuild(self, paths: List[Path]):
+        """Index cache files written before the manifest existed, reading only their date/source columns"""
+        for path in paths:
+            try:
+                table = pq.read_table(path, columns=['date', 'source'])
+                if table.num_rows == 0:
+                    continue
+                dates = pc.min_max(table.column('date'))
+                actions_path = path.with_name(f"{path.stem}.actions.parquet")
+                actions = pq.ParquetFile(actions_path).metadata.num_rows if actions_path.exists() else 0
+                sizes = path.stat().st_size + (actions_path.stat().st_size if actions_path.exists() else 0)
+                first, last = dates['min'].as_py(), dates['max'].as_py()
+                
+                # Older files only tell us their first and last bar
+                self.put(path.stem, {
+                    'first_date': first,
+                    'last_date': last,
+                    'rows': table.num_rows,
+                    'actions': actions,
+                    'bytes': sizes,
+                    'refreshed': path.stat().st_mtime,
+                    'source': table.column('source')[-1].as_py() or ''
+                }, [(first, last)])
+            except Exception as e:
+                logger.warning(f"Could not index {path.name}: {str(e)}")
+        
+        logger.info(f"Indexed {len(paths)} cache files into {self.path.name}")
+    
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(ticker.upper())
+    
+    def is_fresh(self, ticker: str, expiry_hours: float) -> bool:
+        entry = self.entries.get(ticker.upper())
+        return entry is not None and time.time() - entry['refreshed'] <= expiry_hours * 3600
+    
+    def extend(self, ticker: str, fetched: List[Interval]):
+        """Mark ranges covered without a write (e.g. holidays that returned no bars)"""
+        entry = self.entries.get(ticker.upper())
+        if entry is not None:
+            self.put(ticker, entry, fetched)
+    
+    def gaps(self, ticker: str, start_date: str, end_date: str, trusted_through: Optional[str] = None) -> List[Interval]:
+        """Ranges within [start_date, end_date] that have not been fetched (or not since trusted_through)"""
+        covered = self.coverage.get(ticker.upper(), [])
+        if trusted_through is not None:
+            covered = [(start, min(end, trusted_through)) for start, end in covered if start <= trusted_through]
+        return subtract_intervals(start_date, end_date, covered)
+    
+    def put(self, ticker: str, entry: Dict[str, Any], fetched: List[Interval]):
+        """Record a ticker's files after a write, adding the ranges just fetched"""
+        ticker = ticker.upper()
+        
+        with self.lock:
+            # Read and replace the coverage in one step; the compactor thread writes under the lock too
+            coverage = merge_intervals(self.coverage.get(ticker, []) + fetched)
+            self.db.execute("BEGIN")
+            self.db.execute(
+                "INSERT OR REPLACE INTO tickers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticker, *[entry[field] for field in ENTRY_FIELDS])
+            )
+            self.db.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
+            self.db.executemany("INSERT INTO coverage VALUES (?, ?, ?)", [(ticker, s, e) for s, e in coverage])
+            self.db.execute("COMMIT")
+            
+            self.entries[ticker] = entry
+            self.coverage[ticker] = coverage
+    
+    def update_bytes(self, ticker: str, size: int):
+        """Record a new file size after compaction"""
+        ticker = ticker.upper()
+        with self.lock:
+            if ticker in self.entries:
+                self.entries[ticker]['bytes'] = size
+                self.db.execute("UPDATE tickers SET bytes = ? WHERE ticker = ?", (size, ticker))
+    
+    def remove(self, ticker: Optional[str] = None):
+        """Drop one ticker, or everything"""
+        with self.lock:
+            if ticker is None:
+                self.db.execute("DELETE FROM tickers")
+                self.db.execute("DELETE FROM coverage")
+                self.entries.clear()
+                self.coverage.clear()
+                return
+            
+            ticker = ticker.upper()
+            self.db.execute("DELETE FROM tickers WHERE ticker = ?", (ticker,))
+            self.db.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
+            self.entries.pop(ticker, None)
+            self.coverage.pop(ticker, None)
+    
+    def get_stats(self) -> dict:
+        """Totals over all indexed tickers"""
+        return {
+            "tickers": len(self.entries),
+            "rows": sum(e['rows'] for e in self.entries.values()),
+            "bytes": sum(e['bytes'] for e in self.entries.values())
+        }
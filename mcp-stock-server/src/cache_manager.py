@@ -3,18 +3,49 @@ Cache manager for storing stock price data using Parquet format.
 """
 
 import pandas as pd
+import pyarrow.parquet as pq
+import asyncio
 import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
+
+from src.adjustments import add_changes, apply_adjustments, extract_actions, merge_actions
+from src.cache_budget import CacheBudget, Partition
+from src.cache_index import CacheIndex, Interval
+from src.covariance import CovarianceEngine
+from src.indicators import IndicatorEngine
+from src.intraday_store import IntradayStore
+from src.resampling import ResampleMemo
 
 logger = logging.getLogger(__name__)
 
+# Raw bar columns kept on disk; adjusted prices are derived on read
+BAR_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'source']
+
+# Columns returned to tool callers
+VIEW_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'change', 'change_percent', 'ticker', 'source']
+
+# Days of slack when recording fetched coverage (weekends and market holidays):
+# a fetch whose bars start or end further than this inside the range only covers its bars
+COVERAGE_SLACK_DAYS = 4
+
+# Relative close change on an overlapping date that counts as a restatement rather than rounding
+RESTATE_TOLERANCE = 1e-4
+
+# Files are only recompressed once they haven't been written for this long
+COMPACT_MIN_AGE_SECONDS = 3600
+
+# Files rewritten per maintenance pass, to keep each pass short
+COMPACT_BATCH = 50
+
 class CacheManager:
     """Manages caching of stock price data using Parquet files"""
     
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 0, pinned: Optional[Iterable[str]] = None):
         if cache_dir is None:
             cache_dir = Path(__file__).parent.parent / "data" / "prices"
         
@@ -24,91 +55,444 @@ class CacheManager:
         # Cache expiry time (1 day for historical data)
         self.cache_expiry_hours = 24
         
+        # Counters for the metrics surface
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        
+        # Coverage manifest, so range checks and stats don't open Parquet files
+        self.index = CacheIndex(self.cache_dir)
+        
+        # Intraday bars live in their own compact per ticker-day store
+        self.intraday = IntradayStore(self.cache_dir)
+        
+        # Resampled aggregates and indicator state, invalidated as bars are saved
+        self.resampled = ResampleMemo()
+        self.indicators = IndicatorEngine()
+        self.covariance = CovarianceEngine()
+        
+        # Disk budget with LRU eviction; max_bytes=0 means unlimited
+        self.budget = CacheBudget(self.cache_dir, max_bytes, pinned)
+        
+        # Daily files are rewritten by the compactor in a worker thread
+        self.write_lock = threading.Lock()
+        self.compactions = 0
+        self.compacted_bytes_saved = 0
+        
+        # Histories dropped because a refresh restated them
+        self.restatements = 0
+        
     def get_cache_file_path(self, ticker: str) -> Path:
-        """Get the cache file path for a ticker"""
+        """Get the cache file path for a ticker's raw bars"""
         return self.cache_dir / f"{ticker.upper()}.parquet"
     
-    async def get_cached_data(self, ticker: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
-        """Retrieve cached data if available and not expired"""
+    def get_actions_file_path(self, ticker: str) -> Path:
+        """Get the cache file path for a ticker's corporate actions"""
+        return self.cache_dir / f"{ticker.upper()}.actions.parquet"
+    
+    def _read_parquet(self, path: Path) -> Optional[pd.DataFrame]:
+        if not path.exists():
+            return None
+        df = pd.read_parquet(path)
+        self.bytes_read += path.stat().st_size
+        return df
+    
+    def missing_ranges(self, ticker: str, start_date: str, end_date: str) -> List[Interval]:
+        """
+        Parts of a date range that still have to be fetched, from the manifest.
+        Once a ticker's cache has expired, only bars older than its last refresh
+        (less the slack) are trusted, so a refresh fetches just the recent tail;
+        save_data drops the older bars if that tail shows they were restated.
+        Gaps without a weekday are skipped.
+        """
+        end_date = min(end_date, datetime.now().strftime('%Y-%m-%d'))
+        if start_date > end_date:
+            return []
+        
+        entry = self.index.get(ticker)
+        if entry is None:
+            return [(start_date, end_date)]
+        
+        trusted_through = None
+        if not self.index.is_fresh(ticker, self.cache_expiry_hours):
+            refreshed = datetime.fromtimestamp(entry['refreshed']) - timedelta(days=COVERAGE_SLACK_DAYS)
+            trusted_through = refreshed.strftime('%Y-%m-%d')
+        
+        gaps = self.index.gaps(ticker, start_date, end_date, trusted_through)
+        return [(start, end) for start, end in gaps if len(pd.bdate_range(start, end))]
+    
+    def covers(self, ticker: str, start_date: str, end_date: str) -> bool:
+        """Check whether fresh cached bars span a date range"""
+        return not self.missing_ranges(ticker, start_date, end_date)
+    
+    def mark_empty_gap(self, ticker: str, start_date: str, end_date: str):
+        """
+        Record a short gap that sources answered without bars for (a holiday, or
+        today before the first bar) as covered, so it isn't fetched again on every request.
+        The cache expiry brings the recent tail back into play.
+        """
+        span = datetime.strptime(end_date, '%Y-%m-%d') - datetime.strptime(start_date, '%Y-%m-%d')
+        if span <= timedelta(days=COVERAGE_SLACK_DAYS):
+            self.index.extend(ticker, [(start_date, end_date)])
+    
+    def fetched_interval(self, bars: pd.DataFrame, start_date: str, end_date: str) -> Interval:
+        """
+        The part of a requested range a fetch actually covered.
+        Bars starting or ending within the slack count for the whole range; otherwise
+        (short source history, lagging source) only up to the bars themselves.
+        """
+        slack = timedelta(days=COVERAGE_SLACK_DAYS)
+        end_date = min(end_date, datetime.now().strftime('%Y-%m-%d'))
+        first, last = bars['date'].min(), bars['date'].max()
+        
+        if first > (datetime.strptime(start_date, '%Y-%m-%d') + slack).strftime('%Y-%m-%d'):
+            start_date = first
+        if last < (datetime.strptime(end_date, '%Y-%m-%d') - slack).strftime('%Y-%m-%d'):
+            end_date = last
+        return start_date, end_date
+    
+    def build_view(self, ticker: str, bars: pd.DataFrame, actions: Optional[pd.DataFrame],
+                   start_date: str, end_date: str, adjusted: bool = True) -> pd.DataFrame:
+        """Build the standardized response frame for a range from raw bars and actions"""
+        # Adjust over the full history: later actions move earlier prices
+        series = apply_adjustments(bars, actions) if adjusted else bars.sort_values('date')
+        
+        mask = (series['date'] >= start_date) & (series['date'] <= end_date)
+        view = add_changes(series.loc[mask].reset_index(drop=True))
+        view['ticker'] = ticker.upper()
+        
+        return view[VIEW_COLUMNS]
+    
+    def _load_fresh(self, ticker: str, start_date: str, end_date: str) -> Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+        """Load raw bars and actions if they cover the range and are not expired"""
+        if not self.covers(ticker, start_date, end_date):
+            return None
+        
+        loaded = self.read_bars(ticker)
+        if loaded is None:
+            # Removed behind the manifest's back
+            self.index.remove(ticker)
+        return loaded
+    
+    def read_bars(self, ticker: str) -> Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+        """Load a ticker's raw bars and actions regardless of coverage"""
+        cache_file = self.get_cache_file_path(ticker)
+        if not cache_file.exists():
+            return None
+        
+        self.budget.touch(("daily", ticker.upper()))
+        return self._read_parquet(cache_file), self._read_parquet(self.get_actions_file_path(ticker))
+    
+    def get_version(self, ticker: str) -> Optional[Tuple[float, int, str]]:
+        """Cheap version stamp (last refresh, rows, last date) of a ticker's bars, or None if missing or expired"""
+        if not self.index.is_fresh(ticker, self.cache_expiry_hours):
+            return None
+        entry = self.index.get(ticker)
+        return entry['refreshed'], entry['rows'], entry['last_date']
+    
+    async def get_cached_bars(self, ticker: str, start_date: str, end_date: str) -> Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+        """Retrieve a ticker's full raw bars and actions if they cover the range"""
         try:
-            cache_file = self.get_cache_file_path(ticker)
-            
-            if not cache_file.exists():
-                return None
-            
-            # Check file age
-            file_age = datetime.now() - datetime.fromtimestamp(cache_file.stat().st_mtime)
-            if file_age > timedelta(hours=self.cache_expiry_hours):
-                logger.info(f"Cache expired for {ticker}")
+            loaded = self._load_fresh(ticker, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"Error reading cache for {ticker}: {str(e)}")
+            loaded = None
+        
+        if loaded is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return loaded
+    
+    async def get_cached_data(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
+        """Retrieve cached data if it covers the range and is not expired"""
+        try:
+            loaded = self._load_fresh(ticker, start_date, end_date)
+            if loaded is None:
+                self.misses += 1
                 return None
             
-            # Load cached data
-            df = pd.read_parquet(cache_file)
-            
-            # Filter by date range
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+            bars, actions = loaded
+            view = self.build_view(ticker, bars, actions, start_date, end_date, adjusted)
             
-            df['date_dt'] = pd.to_datetime(df['date'])
-            filtered_df = df[(df['date_dt'] >= start_dt) & (df['date_dt'] <= end_dt)]
-            
-            if filtered_df.empty:
+            if view.empty:
+                self.misses += 1
                 return None
             
-            # Remove temporary date column
-            filtered_df = filtered_df.drop('date_dt', axis=1)
-            
-            logger.info(f"Cache hit for {ticker}: {len(filtered_df)} records")
-            return filtered_df
+            self.hits += 1
+            logger.info(f"Cache hit for {ticker}: {len(view)} records ({'adjusted' if adjusted else 'raw'})")
+            return view
             
         except Exception as e:
             logger.warning(f"Error reading cache for {ticker}: {str(e)}")
+            self.misses += 1
             return None
     
-    async def save_data(self, ticker: str, data: pd.DataFrame):
-        """Save data to cache"""
+    async def save_data(self, ticker: str, data: pd.DataFrame,
+                        fetched: Optional[Interval] = None) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """
+        Save raw bars and corporate actions to cache, recording the requested
+        range `fetched` (default: the bars' own span) as covered in the manifest.
+        Returns the merged (bars, actions) so callers can build views without re-reading.
+        """
+        if data is None or data.empty:
+            return None, None
+        
+        bars = data[[c for c in BAR_COLUMNS if c in data.columns]]
+        actions = extract_actions(data)
+        
         try:
-            if data is None or data.empty:
-                return
-            
             cache_file = self.get_cache_file_path(ticker)
+            actions_file = self.get_actions_file_path(ticker)
             
             # Load existing data if available
-            existing_data = None
-            if cache_file.exists():
-                try:
-                    existing_data = pd.read_parquet(cache_file)
-                except Exception as e:
-                    logger.warning(f"Error loading existing cache for {ticker}: {str(e)}")
+            existing_bars = None
+            existing_actions = None
+            try:
+                existing_bars = self._read_parquet(cache_file)
+                existing_actions = self._read_parquet(actions_file)
+            except Exception as e:
+                logger.warning(f"Error loading existing cache for {ticker}: {str(e)}")
+            
+            # Start over from the new bars; the older ranges become gaps and are refetched
+            if self.restated(existing_bars, bars, existing_actions, actions):
+                logger.info(f"Cached history for {ticker} was restated upstream, refetching it")
+                self.restatements += 1
+                self.index.remove(ticker)
+                existing_bars = None
+                existing_actions = None
             
             # Merge with existing data
-            if existing_data is not None and not existing_data.empty:
+            if existing_bars is not None and not existing_bars.empty:
                 # Combine data and remove duplicates
-                combined_data = pd.concat([existing_data, data], ignore_index=True)
-                combined_data = combined_data.drop_duplicates(subset=['date'], keep='last')
-                combined_data = combined_data.sort_values('date')
+                existing_bars = existing_bars[[c for c in BAR_COLUMNS if c in existing_bars.columns]]
+                combined_bars = pd.concat([existing_bars, bars], ignore_index=True)
+                combined_bars = combined_bars.drop_duplicates(subset=['date'], keep='last')
+                combined_bars = combined_bars.sort_values('date').reset_index(drop=True)
             else:
-                combined_data = data.sort_values('date')
+                combined_bars = bars.sort_values('date').reset_index(drop=True)
+            
+            combined_actions = merge_actions(existing_actions, actions)
+            self.invalidate_derived(ticker, existing_bars, bars, existing_actions, combined_actions)
             
             # Save to parquet
-            combined_data.to_parquet(cache_file, index=False)
-            logger.info(f"Cached {len(combined_data)} records for {ticker}")
+            with self.write_lock:
+                combined_bars.to_parquet(cache_file, index=False)
+                self.bytes_written += cache_file.stat().st_size
+                if not combined_actions.empty:
+                    combined_actions.to_parquet(actions_file, index=False)
+                    self.bytes_written += actions_file.stat().st_size
+                elif actions_file.exists():
+                    actions_file.unlink()
+            
+            start_date, end_date = fetched or (bars['date'].min(), bars['date'].max())
+            self.index.put(ticker, {
+                'first_date': combined_bars['date'].iloc[0],
+                'last_date': combined_bars['date'].iloc[-1],
+                'rows': len(combined_bars),
+                'actions': len(combined_actions),
+                'bytes': cache_file.stat().st_size + (actions_file.stat().st_size if actions_file.exists() else 0),
+                'refreshed': time.time(),
+                'source': str(combined_bars['source'].iloc[-1]) if 'source' in combined_bars.columns else ''
+            }, [self.fetched_interval(bars, start_date, end_date)])
+            
+            self.budget.record(("daily", ticker.upper()))
+            self.enforce_budget()
+            
+            logger.info(f"Cached {len(combined_bars)} records and {len(combined_actions)} actions for {ticker}")
+            return combined_bars, combined_actions
             
         except Exception as e:
             logger.error(f"Error saving cache for {ticker}: {str(e)}")
+            return bars.sort_values('date').reset_index(drop=True), actions
+    
+    def restated(self, existing_bars: Optional[pd.DataFrame], bars: pd.DataFrame,
+                 existing_actions: Optional[pd.DataFrame], actions: pd.DataFrame) -> bool:
+        """
+        Whether newly fetched bars restate the cached history: a split or dividend
+        not seen before in a fetch reaching past the cached bars, or closes that
+        moved on overlapping dates. Stooq only publishes bars already adjusted,
+        with no actions, so its restatements show up as the latter.
+        """
+        if existing_bars is None or existing_bars.empty:
+            return False
+        
+        if bars['date'].max() > existing_bars['date'].max() and not actions.empty:
+            known = set(existing_actions['date']) if existing_actions is not None else set()
+            if not set(actions['date']) <= known:
+                return True
+        
+        overlap = bars[['date', 'close']].merge(existing_bars[['date', 'close']], on='date', suffixes=('', '_old'))
+        moved = (overlap['close'] - overlap['close_old']).abs() > RESTATE_TOLERANCE * overlap['close_old'].abs()
+        return bool(moved.any())
+    
+    def invalidate_derived(self, ticker: str, existing_bars: Optional[pd.DataFrame], bars: pd.DataFrame,
+                           existing_actions: Optional[pd.DataFrame], combined_actions: pd.DataFrame):
+        """Mark resampled aggregates, indicator and covariance state stale from the first new or changed bar"""
+        if existing_bars is None or existing_bars.empty:
+            self.resampled.invalidate(ticker, '1d')
+            self.indicators.invalidate(ticker)
+            self.covariance.invalidate(ticker)
+            return
+        
+        compare = ['date', 'open', 'high', 'low', 'close', 'volume']
+        merged = bars[compare].merge(existing_bars[compare], on='date', how='left', suffixes=('', '_old'))
+        changed = merged['close_old'].isna()
+        for col in compare[1:]:
+            changed |= merged[col] != merged[f'{col}_old']
+        
+        # A new split or dividend moves every earlier adjusted price
+        previous_actions = merge_actions(existing_actions, None)
+        if combined_actions.to_numpy().tolist() != previous_actions.to_numpy().tolist():
+            self.resampled.invalidate(ticker, '1d', adjusted=True)
+            self.indicators.invalidate(ticker, adjusted=True)
+            self.covariance.invalidate(ticker, adjusted=True)
+        
+        if changed.any():
+            since = merged.loc[changed, 'date'].min()
+            self.resampled.invalidate(ticker, '1d', since=since)
+            self.indicators.invalidate(ticker, since=since)
+            self.covariance.invalidate(ticker, since=since)
+    
+    def save_intraday(self, ticker: str, interval: str, bars: Optional[pd.DataFrame], days: list):
+        """Save intraday bars and mark resampled aggregates stale from the first fetched day"""
+        self.intraday.save(ticker, interval, bars, days)
+        if bars is not None and not bars.empty:
+            self.resampled.invalidate(ticker, interval, since=int(bars['timestamp'].min()))
+        
+        self.budget.record(("intraday", interval, ticker.upper()))
+        self.enforce_budget()
+    
+    def load_intraday(self, ticker: str, interval: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Load stored intraday bars for a date range, recording the access"""
+        self.budget.touch(("intraday", interval, ticker.upper()))
+        return self.intraday.load(ticker, interval, start_date, end_date)
+    
+    def enforce_budget(self) -> List[Partition]:
+        """Evict least recently used partitions while the cache is over its disk budget"""
+        if not self.budget.max_bytes:
+            return []
+        if not self.budget.scanned:
+            self.budget.scan()
+        
+        victims = self.budget.victims()
+        for partition in victims:
+            self.evict(partition)
+        return victims
+    
+    def evict(self, partition: Partition):
+        """Remove one partition's files and any state derived from them"""
+        if partition[0] == "daily":
+            ticker = partition[1]
+            with self.write_lock:
+                for cache_file in (self.get_cache_file_path(ticker), self.get_actions_file_path(ticker)):
+                    cache_file.unlink(missing_ok=True)
+            self.index.remove(ticker)
+            self.resampled.invalidate(ticker, '1d')
+            self.indicators.invalidate(ticker)
+            self.covariance.invalidate(ticker)
+        else:
+            _, interval, ticker = partition
+            self.intraday.clear(ticker, interval)
+            self.resampled.invalidate(ticker, interval)
+        
+        self.budget.forget(partition, evicted=True)
+        logger.info(f"Evicted {'/'.join(partition)} from the cache")
+    
+    def needs_recompression(self, path: Path) -> bool:
+        """Whether a daily file was written by the fast writer (not one zstd row group)"""
+        metadata = pq.ParquetFile(path).metadata
+        if metadata.num_row_groups == 0:
+            return False
+        return metadata.num_row_groups > 1 or metadata.row_group(0).column(0).compression != 'ZSTD'
+    
+    def recompress(self, path: Path) -> int:
+        """Rewrite a daily file with zstd, keeping its mtime (cache expiry); returns bytes saved"""
+        with self.write_lock:
+            file_stat = path.stat()
+            table = pq.read_table(path)
+            tmp = path.with_suffix('.tmp')
+            pq.write_table(table, tmp, compression='zstd', compression_level=9)
+            os.utime(tmp, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+            tmp.replace(path)
+            
+            ticker = path.name[:-len(".parquet")].removesuffix(".actions")
+            self.index.update_bytes(ticker, self.budget.measure(("daily", ticker)))
+            return file_stat.st_size - path.stat().st_size
+    
+    def compact(self, limit: int = COMPACT_BATCH) -> int:
+        """
+        Recompress cold daily files and merge past months of intraday day files,
+        up to `limit` rewrites; returns the bytes saved. Safe to run in a worker thread.
+        """
+        saved = 0
+        rewrites = 0
+        cutoff = time.time() - COMPACT_MIN_AGE_SECONDS
+        
+        for path in sorted(self.cache_dir.glob("*.parquet")):
+            if rewrites >= limit:
+                break
+            try:
+                if path.stat().st_mtime > cutoff or not self.needs_recompression(path):
+                    continue
+                saved += self.recompress(path)
+                rewrites += 1
+            except (OSError, ValueError) as e:
+                # Evicted or rewritten underneath us; the next pass picks it up again
+                logger.debug(f"Skipping compaction of {path.name}: {str(e)}")
+        
+        for directory in sorted(self.intraday.root.glob("*/*")):
+            interval, ticker = directory.parent.name, directory.name
+            for month in self.intraday.compactable_months(ticker, interval):
+                if rewrites >= limit:
+                    break
+                try:
+                    saved += self.intraday.compact_month(ticker, interval, month)
+                    rewrites += 1
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Skipping compaction of {interval}/{ticker}/{month}: {str(e)}")
+        
+        if rewrites:
+            self.compactions += rewrites
+            self.compacted_bytes_saved += saved
+            logger.info(f"Compacted {rewrites} cache files, saved {saved / 1024:.1f} KB")
+        return saved
+    
+    async def run_maintenance(self):
+        """One background pass: enforce the budget, compact in a worker thread, persist access times"""
+        self.enforce_budget()
+        saved = await asyncio.get_running_loop().run_in_executor(None, self.compact)
+        if saved and self.budget.scanned:
+            self.budget.scan()
+        self.budget.save_access_times()
     
     def clear_cache(self, ticker: Optional[str] = None):
         """Clear cache for a specific ticker or all tickers"""
         try:
             if ticker:
-                cache_file = self.get_cache_file_path(ticker)
-                if cache_file.exists():
-                    cache_file.unlink()
-                    logger.info(f"Cleared cache for {ticker}")
+                for cache_file in (self.get_cache_file_path(ticker), self.get_actions_file_path(ticker)):
+                    if cache_file.exists():
+                        cache_file.unlink()
+                self.intraday.clear(ticker)
+                self.index.remove(ticker)
+                for interval in ('1d', '1h', '5m', '1m'):
+                    self.resampled.invalidate(ticker, interval)
+                self.indicators.invalidate(ticker)
+                self.covariance.invalidate(ticker)
+                for partition in [p for p in self.budget.sizes if p[-1] == ticker.upper()]:
+                    self.budget.forget(partition)
+                logger.info(f"Cleared cache for {ticker}")
             else:
                 # Clear all cache files
                 for cache_file in self.cache_dir.glob("*.parquet"):
                     cache_file.unlink()
+                self.intraday.clear()
+                self.index.remove()
+                self.resampled = ResampleMemo(self.resampled.max_entries)
+                self.indicators = IndicatorEngine(self.indicators.max_tickers)
+                self.covariance = CovarianceEngine(self.covariance.max_states)
+                self.budget.reset()
                 logger.info("Cleared all cache")
                 
         except Exception as e:
@@ -117,14 +501,31 @@ class CacheManager:
     def get_cache_stats(self) -> dict:
         """Get statistics about the cache"""
         try:
-            cache_files = list(self.cache_dir.glob("*.parquet"))
-            total_size = sum(f.stat().st_size for f in cache_files)
+            # Daily totals come from the manifest rather than statting every file
+            entries = self.index.entries
+            total_size = sum(e['bytes'] for e in entries.values())
+            lookups = self.hits + self.misses
             
             return {
-                "total_files": len(cache_files),
+                "total_files": len(entries) + sum(1 for e in entries.values() if e['actions']),
+                "total_bytes": total_size,
                 "total_size_mb": total_size / (1024 * 1024),
                 "cache_dir": str(self.cache_dir),
-                "files": [f.stem for f in cache_files]
+                "files": sorted(entries),
+                "rows": sum(e['rows'] for e in entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes_read": self.bytes_read,
+                "bytes_written": self.bytes_written,
+                "intraday": self.intraday.get_stats(),
+                "resampled": self.resampled.get_stats(),
+                "indicators": self.indicators.get_stats(),
+                "covariance": self.covariance.get_stats(),
+                "budget": self.budget.get_stats(),
+                "compactions": self.compactions,
+                "compacted_bytes_saved": self.compacted_bytes_saved,
+                "restatements": self.restatements
             }
             
         except Exception as e:
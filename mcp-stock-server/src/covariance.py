@@ -0,0 +1,279 @@
+"""
+Pairwise covariance and correlation of daily returns across many tickers.
+The engine keeps running sums per ticker pair (count, sum, sum of squares,
+cross products) for a rolling window or with exponential decay, so returns
+appended to the cache are folded in with an O(N^2) update per day instead of
+recomputing the matrix from the whole history.
+"""
+
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COVARIANCE_OUTPUTS = ("correlation", "covariance", "both")
+
+# Rolling sums are rebuilt from the window after this many add/remove steps to bound drift
+REBUILD_EVERY = 500
+
+def aligned_returns(series: Dict[str, pd.Series], tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily returns of close series (indexed by YYYY-MM-DD) aligned on the union of
+    dates; returns (dates, dates x tickers matrix) with NaN where a ticker has no bar.
+    Each return is taken against the ticker's own previous bar.
+    """
+    returns = {
+        ticker: series[ticker].sort_index().pct_change().iloc[1:]
+        for ticker in tickers if ticker in series
+    }
+    frame = pd.DataFrame({ticker: returns.get(ticker, pd.Series(dtype=float)) for ticker in tickers})
+    frame = frame.sort_index()
+    return frame.index.to_numpy(), frame.to_numpy(dtype=float)
+
+def pair_sums(returns: np.ndarray, weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Pairwise sums over rows (optionally weighted), counting a row for a pair only
+    when both tickers have a value: n, sx (sum of x), sxx (sum of x^2), sxy.
+    sx[i, j] and sxx[i, j] are over the rows ticker j is present too.
+    """
+    present = ~np.isnan(returns)
+    x = np.where(present, returns, 0.0)
+    weighted = present.astype(float)
+    if weights is not None:
+        weighted = weighted * weights[:, None]
+    
+    return {
+        "n": weighted.T @ present,
+        "sx": (x * weighted).T @ present,
+        "sxx": (x * x * weighted).T @ present,
+        "sxy": (x * weighted).T @ x
+    }
+
+def add_row(sums: Dict[str, np.ndarray], row: np.ndarray, sign: float = 1.0):
+    """Fold one day of returns into the pair sums in place (sign=-1 removes it)"""
+    present = ~np.isnan(row)
+    x = np.where(present, row, 0.0)
+    mask = present.astype(float)
+    
+    sums["n"] += sign * np.outer(mask, mask)
+    sums["sx"] += sign * np.outer(x, mask)
+    sums["sxx"] += sign * np.outer(x * x, mask)
+    sums["sxy"] += sign * np.outer(x, x)
+
+def decay_sums(sums: Dict[str, np.ndarray], decay: float):
+    """Scale the pair sums by the decay factor in place"""
+    for values in sums.values():
+        values *= decay
+
+def matrices(sums: Dict[str, np.ndarray], min_periods: int, sample: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Covariance and correlation from pair sums; pairs with fewer than min_periods
+    shared observations are NaN. sample=True uses the n - 1 denominator.
+    """
+    n, sx, sxx, sxy = sums["n"], sums["sx"], sums["sxx"], sums["sxy"]
+    sy, syy = sx.T, sxx.T
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centered = sxy - sx * sy / n
+        covariance = centered / (n - 1) if sample else centered / n
+        spread = np.maximum(sxx - sx * sx / n, 0.0) * np.maximum(syy - sy * sy / n, 0.0)
+        correlation = np.clip(centered / np.sqrt(spread), -1.0, 1.0)
+    
+    # Rows are counted exactly for rolling windows but are decayed weights for EW sums
+    too_few = sums["count"] < min_periods
+    covariance[too_few] = np.nan
+    correlation[too_few] = np.nan
+    np.fill_diagonal(correlation, np.where(np.diag(too_few), np.nan, 1.0))
+    return covariance, correlation
+
+def encode_matrix(values: np.ndarray) -> List[List[Optional[float]]]:
+    """Nested lists rounded for output, with null for NaN"""
+    rounded = np.round(values, 8)
+    return [[None if np.isnan(v) else float(v) for v in row] for row in rounded]
+
+def covariance_params(arguments: Dict[str, Any]) -> Tuple[str, float]:
+    """(method, window or halflife) for get_covariance arguments"""
+    method = arguments.get("method", "rolling")
+    if method == "ewm":
+        return method, float(arguments.get("halflife", 30))
+    return method, int(arguments.get("window", 60))
+
+def validate_covariance_arguments(arguments: Dict[str, Any]) -> Optional[str]:
+    """Return an error message for invalid get_covariance arguments"""
+    if not [t for t in arguments.get("tickers", []) if t]:
+        return "At least one ticker is required"
+    if arguments.get("method", "rolling") not in ("rolling", "ewm"):
+        return f"Unsupported method: {arguments.get('method')}"
+    if arguments.get("output", "correlation") not in COVARIANCE_OUTPUTS:
+        return f"Unsupported output: {arguments.get('output')}"
+    
+    try:
+        method, param = covariance_params(arguments)
+    except (TypeError, ValueError):
+        return "window and halflife must be numbers"
+    if (method == "rolling" and param < 2) or param <= 0:
+        return "window must be at least 2 and halflife positive"
+    return None
+
+def covariance_response(state: Dict[str, Any], key_tickers: List[str], tickers: List[str],
+                        arguments: Dict[str, Any], errors: Dict[str, str]) -> Dict[str, Any]:
+    """Build a get_covariance result in the requested ticker order; tickers without data get null rows"""
+    method, param = covariance_params(arguments)
+    output = arguments.get("output", "correlation")
+    min_periods = int(arguments.get("min_periods", 20))
+    
+    covariance, correlation = matrices(state["sums"], min_periods, sample=method != "ewm")
+    
+    position = {ticker: i for i, ticker in enumerate(key_tickers)}
+    index = np.array([position.get(ticker, -1) for ticker in tickers])
+    missing = index < 0
+    
+    def reorder(values: np.ndarray) -> np.ndarray:
+        # Index -1 picks an arbitrary row; those rows and columns are blanked
+        out = values[np.ix_(index, index)]
+        out[missing, :] = np.nan
+        out[:, missing] = np.nan
+        return out
+    
+    result = {
+        "success": True,
+        "tickers": tickers,
+        "method": method,
+        ("halflife" if method == "ewm" else "window"): param,
+        "min_periods": min_periods,
+        "as_of": state["last_date"]
+    }
+    if output in ("covariance", "both"):
+        result["covariance"] = encode_matrix(reorder(covariance))
+    if output in ("correlation", "both"):
+        result["correlation"] = encode_matrix(reorder(correlation))
+    if errors:
+        result["errors"] = errors
+    return result
+
+class CovarianceEngine:
+    """
+    Running pair sums keyed by (tickers, adjusted, method, window or halflife).
+    Rolling states keep the window's rows so the oldest day can be subtracted;
+    EW states only decay and add.
+    """
+    
+    def __init__(self, max_states: int = 64):
+        self.max_states = max_states
+        self.states: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        
+        # Counters for the metrics surface
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+    
+    @staticmethod
+    def make_key(tickers: List[str], adjusted: bool, method: str, param: float) -> Tuple:
+        return (tuple(sorted(tickers)), adjusted, method, param)
+    
+    def invalidate(self, ticker: str, since: Optional[str] = None, adjusted: Optional[bool] = None):
+        """Drop states that include returns for ticker from `since` onward (None drops them outright)"""
+        for key in [k for k in self.states if ticker.upper() in k[0]]:
+            if adjusted is not None and key[1] != adjusted:
+                continue
+            if since is None or self.states[key]["last_date"] >= since:
+                del self.states[key]
+    
+    def peek(self, key: Tuple, versions: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """State if it was built from exactly these cache file versions"""
+        state = self.states.get(key)
+        if state is None or None in versions.values() or state["versions"] != versions:
+            return None
+        
+        self.states.move_to_end(key)
+        self.hits += 1
+        return state
+    
+    def update(self, key: Tuple, dates: np.ndarray, returns: np.ndarray, versions: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Bring a state up to date with aligned returns (columns in key ticker order)
+        and return it. Only days after the state's last date are folded in.
+        """
+        state = self.states.get(key)
+        
+        if state is not None and len(dates) and dates[-1] >= state["last_date"]:
+            new = dates > state["last_date"]
+            for row in returns[new]:
+                self.fold(state, row)
+            
+            if new.any():
+                state["last_date"] = dates[-1]
+                self.incremental += 1
+            else:
+                self.hits += 1
+            state["versions"] = versions
+            self.states.move_to_end(key)
+            return state
+        
+        state = self.build(key, dates, returns)
+        state["versions"] = versions
+        self.states[key] = state
+        self.full += 1
+        
+        while len(self.states) > self.max_states:
+            self.states.popitem(last=False)
+        
+        return state
+    
+    def build(self, key: Tuple, dates: np.ndarray, returns: np.ndarray) -> Dict[str, Any]:
+        """Pair sums over the full history in one pass of matrix products"""
+        _, _, method, param = key
+        state = {"method": method, "param": param, "last_date": dates[-1] if len(dates) else "", "steps": 0}
+        
+        if method == "ewm":
+            state["decay"] = 0.5 ** (1.0 / param)
+            weights = state["decay"] ** np.arange(len(dates) - 1, -1, -1, dtype=float)
+            state["sums"] = pair_sums(returns, weights)
+            state["sums"]["count"] = pair_sums(returns)["n"]
+        else:
+            window = returns[-int(param):]
+            state["window"] = deque(window, maxlen=int(param))
+            state["sums"] = pair_sums(window)
+            state["sums"]["count"] = state["sums"]["n"]
+        
+        return state
+    
+    def fold(self, state: Dict[str, Any], row: np.ndarray):
+        """Add one day of returns to a state in O(N^2)"""
+        sums = state["sums"]
+        
+        if state["method"] == "ewm":
+            count = sums.pop("count")
+            decay_sums(sums, state["decay"])
+            add_row(sums, row)
+            present = (~np.isnan(row)).astype(float)
+            sums["count"] = count + np.outer(present, present)
+            return
+        
+        # count is the same array as n here, so it follows the add/remove
+        window = state["window"]
+        if len(window) == window.maxlen:
+            add_row(sums, window[0], sign=-1.0)
+        window.append(row)
+        add_row(sums, row)
+        
+        # Add/remove steps accumulate rounding error; rebuild from the window now and then
+        state["steps"] += 1
+        if state["steps"] >= REBUILD_EVERY:
+            sums.clear()
+            sums.update(pair_sums(np.array(window)))
+            sums["count"] = sums["n"]
+            state["steps"] = 0
+    
+    def get_stats(self) -> dict:
+        """Get engine statistics"""
+        return {
+            "states": len(self.states),
+            "hits": self.hits,
+            "incremental_updates": self.incremental,
+            "full_computes": self.full
+        }
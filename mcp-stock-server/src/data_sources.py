@@ -4,27 +4,89 @@ Each adapter implements the same interface but fetches from different sources.
 """
 
 import asyncio
+import json
+import os
+import time
 import aiohttp
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Tuple
 import logging
 from abc import ABC, abstractmethod
 
+from src.adjustments import add_changes, unapply_splits
+from src.http_archive import get_archive
+
 logger = logging.getLogger(__name__)
 
+# Columns every adapter returns; dividend and split describe corporate actions on that date
+STANDARD_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'dividend', 'split',
+                    'change', 'change_percent', 'ticker', 'source']
+
+# Intraday bars are keyed by epoch seconds (UTC) instead of a date string
+INTRADAY_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'ticker', 'source']
+
 class DataSourceAdapter(ABC):
     """Base class for all data source adapters"""
     
+    # Key used for rate limiting and metrics
+    name = "unknown"
+    
+    # Whether fetch_intraday is implemented
+    supports_intraday = False
+    
     def __init__(self, rate_limiter):
         self.rate_limiter = rate_limiter
     
     @abstractmethod
     async def fetch_data(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
-        """Fetch stock data for the given parameters"""
+        """
+        Fetch stock data for the given parameters. Returns an empty frame when the
+        source answered without bars for the range, and None when the fetch failed
+        (error status, throttling, timeout), so the two can be told apart.
+        """
         pass
     
+    def no_bars(self) -> pd.DataFrame:
+        """Empty standardized frame: the source answered, but had no bars"""
+        return pd.DataFrame(columns=STANDARD_COLUMNS)
+    
+    async def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> Optional[pd.DataFrame]:
+        """Fetch intraday bars (1m/5m/1h) for whole days; None if the source has none"""
+        return None
+    
+    async def http_get(self, session: aiohttp.ClientSession, url: str) -> Tuple[int, str]:
+        """
+        GET a URL and return (status, body). Responses are saved to or served from
+        the HTTP archive when record/replay is configured.
+        """
+        archive = get_archive()
+        if archive is not None and archive.replaying:
+            return await archive.replay(self.name, "GET", url)
+        
+        started = time.perf_counter()
+        async with session.get(url) as response:
+            status = response.status
+            body = await response.text()
+        
+        if archive is not None:
+            archive.record(self.name, "GET", url, status, body, time.perf_counter() - started)
+        return status, body
+    
+    def standardize_intraday(self, df: pd.DataFrame, ticker: str, source_name: str) -> pd.DataFrame:
+        """Standardize intraday bars; the timestamp column must be timezone-aware"""
+        if df is None or df.empty:
+            return df
+        
+        df = df.rename(columns={'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'})
+        df = df.dropna(subset=['open', 'high', 'low', 'close'])
+        df['timestamp'] = (pd.to_datetime(df['timestamp'], utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+        df['volume'] = df['volume'].fillna(0).astype('int64')
+        df['ticker'] = ticker
+        df['source'] = source_name
+        
+        return df.sort_values('timestamp').reset_index(drop=True)[INTRADAY_COLUMNS]
+    
     def standardize_dataframe(self, df: pd.DataFrame, ticker: str, source_name: str) -> pd.DataFrame:
         """Standardize dataframe format across all sources"""
         if df is None or df.empty:
@@ -41,9 +103,17 @@ class DataSourceAdapter(ABC):
             'Low': 'low',
             'Close': 'close',
             'Adj Close': 'close',
-            'Volume': 'volume'
+            'Volume': 'volume',
+            'Dividends': 'dividend',
+            'Stock Splits': 'split',
+            'dividend_amount': 'dividend',
+            'split_coefficient': 'split'
         }
         
+        # Prefer the raw Close when both are present; adjustment happens from the actions
+        if 'Close' in df.columns and 'Adj Close' in df.columns:
+            df = df.drop(columns=['Adj Close'])
+        
         df = df.rename(columns=column_mapping)
         
         # Add missing columns
@@ -51,30 +121,40 @@ class DataSourceAdapter(ABC):
             if col not in df.columns:
                 df[col] = 0
         
+        # No actions reported means no dividend and a 1:1 split (yfinance uses 0 for none)
+        df['dividend'] = df['dividend'].fillna(0.0).astype(float) if 'dividend' in df.columns else 0.0
+        df['split'] = df['split'].fillna(1.0).astype(float).replace(0.0, 1.0) if 'split' in df.columns else 1.0
+        
         # Add metadata
         df['ticker'] = ticker
         df['source'] = source_name
         
         # Calculate change and change_percent
-        if len(df) > 1:
-            df['change'] = df['close'].diff()
-            df['change_percent'] = (df['close'].pct_change() * 100)
-        else:
-            df['change'] = 0
-            df['change_percent'] = 0
+        df = add_changes(df)
         
         # Ensure date is string format
         if 'date' in df.columns:
             df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
         
-        return df[['date', 'open', 'high', 'low', 'close', 'volume', 'change', 'change_percent', 'ticker', 'source']]
+        return df[STANDARD_COLUMNS]
 
 class StooqAdapter(DataSourceAdapter):
-    """Adapter for Stooq data (CSV format, free)"""
+    """
+    Adapter for Stooq data (CSV format, free).
+    Stooq only publishes adjusted bars without the actions behind them, so they
+    are returned as-is for both adjusted and raw requests. It has no intraday
+    download, so intraday requests fall through to the other sources.
+    """
+    
+    name = "stooq"
+    
+    def __init__(self, rate_limiter):
+        super().__init__(rate_limiter)
+        self.base_url = os.environ.get("STOOQ_BASE_URL", "https://stooq.com")
     
     async def fetch_data(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
         """Fetch data from Stooq"""
-        await self.rate_limiter.wait_if_needed('stooq')
+        await self.rate_limiter.wait_if_needed(self.name)
         
         try:
             # Convert dates
@@ -82,25 +162,33 @@ class StooqAdapter(DataSourceAdapter):
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
             
             # Stooq URL format
-            url = f"https://stooq.com/q/d/l/?s={ticker.lower()}&d1={start_dt.strftime('%Y%m%d')}&d2={end_dt.strftime('%Y%m%d')}&i=d"
+            url = f"{self.base_url}/q/d/l/?s={ticker.lower()}&d1={start_dt.strftime('%Y%m%d')}&d2={end_dt.strftime('%Y%m%d')}&i=d"
             
             async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        
-                        # Parse CSV
-                        from io import StringIO
-                        df = pd.read_csv(StringIO(content))
-                        
-                        if df.empty or len(df) == 0:
-                            return None
-                        
-                        return self.standardize_dataframe(df, ticker, 'Stooq')
-                    else:
-                        logger.warning(f"Stooq returned status {response.status}")
-                        return None
-                        
+                status, content = await self.http_get(session, url)
+            
+            if status == 200:
+                # Stooq answers with a plain-text notice once the daily quota is used up
+                if "Exceeded the daily hits limit" in content:
+                    self.rate_limiter.record_throttle(self.name)
+                    return None
+                
+                # Parse CSV
+                from io import StringIO
+                df = pd.read_csv(StringIO(content))
+                
+                # Stooq answers "No data" for a range without bars
+                if df.empty:
+                    return self.no_bars()
+                
+                return self.standardize_dataframe(df, ticker, 'Stooq')
+            elif status == 429:
+                self.rate_limiter.record_throttle(self.name)
+                return None
+            else:
+                logger.warning(f"Stooq returned status {status}")
+                return None
+                
         except Exception as e:
             logger.error(f"Stooq adapter error: {str(e)}")
             return None
@@ -108,87 +196,352 @@ class StooqAdapter(DataSourceAdapter):
 class AlphaVantageAdapter(DataSourceAdapter):
     """Adapter for Alpha Vantage API (free tier available)"""
     
+    name = "alphavantage"
+    supports_intraday = True
+    
     def __init__(self, rate_limiter):
         super().__init__(rate_limiter)
-        self.api_key = "demo"  # Use demo key for now
+        self.api_key = os.environ.get("ALPHAVANTAGE_API_KEY", "demo")
+        self.base_url = os.environ.get("ALPHAVANTAGE_BASE_URL", "https://www.alphavantage.co")
         
     async def fetch_data(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
         """Fetch data from Alpha Vantage"""
-        await self.rate_limiter.wait_if_needed('alphavantage')
+        await self.rate_limiter.wait_if_needed(self.name)
         
         try:
             # Alpha Vantage URL
-            function = "TIME_SERIES_DAILY_ADJUSTED" if adjusted else "TIME_SERIES_DAILY"
-            url = f"https://www.alphavantage.co/query?function={function}&symbol={ticker}&apikey={self.api_key}&outputsize=full&datatype=csv"
+            # The adjusted series is the only one that reports dividends and splits
+            url = f"{self.base_url}/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={ticker}&apikey={self.api_key}&outputsize=full&datatype=csv"
             
             async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        
-                        # Check for API limit message
-                        if "Thank you for using Alpha Vantage" in content or "API call frequency" in content:
-                            logger.warning("Alpha Vantage API limit reached")
-                            return None
-                        
-                        # Parse CSV
-                        from io import StringIO
-                        df = pd.read_csv(StringIO(content))
-                        
-                        if df.empty:
-                            return None
-                        
-                        # Filter by date range
-                        df['timestamp'] = pd.to_datetime(df['timestamp'])
-                        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-                        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-                        
-                        df = df[(df['timestamp'] >= start_dt) & (df['timestamp'] <= end_dt)]
-                        
-                        if df.empty:
-                            return None
-                        
-                        # Rename timestamp to date
-                        df = df.rename(columns={'timestamp': 'date'})
-                        
-                        return self.standardize_dataframe(df, ticker, 'Alpha Vantage')
-                    else:
-                        logger.warning(f"Alpha Vantage returned status {response.status}")
-                        return None
-                        
+                status, content = await self.http_get(session, url)
+            
+            if status == 200:
+                # Check for API limit message
+                if "Thank you for using Alpha Vantage" in content or "API call frequency" in content:
+                    logger.warning("Alpha Vantage API limit reached")
+                    self.rate_limiter.record_throttle(self.name)
+                    return None
+                
+                # Parse CSV
+                from io import StringIO
+                df = pd.read_csv(StringIO(content))
+                
+                if df.empty:
+                    return None
+                
+                # Filter by date range
+                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+                end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+                
+                df = df[(df['timestamp'] >= start_dt) & (df['timestamp'] <= end_dt)]
+                
+                if df.empty:
+                    return self.no_bars()
+                
+                # Rename timestamp to date; rows come newest first
+                df = df.rename(columns={'timestamp': 'date'}).sort_values('date')
+                
+                if adjusted and 'adjusted_close' in df.columns:
+                    df['close'] = df['adjusted_close']
+                df = df.drop(columns=['adjusted_close'], errors='ignore')
+                
+                return self.standardize_dataframe(df, ticker, 'Alpha Vantage')
+            elif status == 429:
+                self.rate_limiter.record_throttle(self.name)
+                return None
+            else:
+                logger.warning(f"Alpha Vantage returned status {status}")
+                return None
+                
         except Exception as e:
             logger.error(f"Alpha Vantage adapter error: {str(e)}")
             return None
-
-class YahooFinanceAdapter(DataSourceAdapter):
-    """Adapter for Yahoo Finance using yfinance library"""
     
-    async def fetch_data(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
-        """Fetch data from Yahoo Finance"""
-        await self.rate_limiter.wait_if_needed('yahoo')
+    async def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> Optional[pd.DataFrame]:
+        """Fetch intraday bars from Alpha Vantage, one request per calendar month"""
+        av_interval = {"1m": "1min", "5m": "5min", "1h": "60min"}[interval]
+        months = pd.period_range(start_date, end_date, freq='M').strftime('%Y-%m')
+        frames = []
         
         try:
-            # Use yfinance in an executor to avoid blocking
-            loop = asyncio.get_event_loop()
+            async with aiohttp.ClientSession() as session:
+                for month in months:
+                    await self.rate_limiter.wait_if_needed(self.name)
+                    
+                    url = (f"{self.base_url}/query?function=TIME_SERIES_INTRADAY&symbol={ticker}"
+                           f"&interval={av_interval}&month={month}&extended_hours=false"
+                           f"&apikey={self.api_key}&outputsize=full&datatype=csv")
+                    
+                    status, content = await self.http_get(session, url)
+                    if status == 429:
+                        self.rate_limiter.record_throttle(self.name)
+                        return None
+                    if status != 200:
+                        logger.warning(f"Alpha Vantage returned status {status}")
+                        return None
+                    
+                    if "Thank you for using Alpha Vantage" in content or "API call frequency" in content:
+                        logger.warning("Alpha Vantage API limit reached")
+                        self.rate_limiter.record_throttle(self.name)
+                        return None
+                    
+                    from io import StringIO
+                    df = pd.read_csv(StringIO(content))
+                    if 'timestamp' in df.columns and not df.empty:
+                        frames.append(df)
+            
+            if not frames:
+                return None
+            
+            df = pd.concat(frames, ignore_index=True)
+            
+            # Alpha Vantage reports exchange-local (US/Eastern) times
+            df['timestamp'] = pd.to_datetime(df['timestamp']).dt.tz_localize('America/New_York')
+            day = df['timestamp'].dt.tz_convert('UTC').dt.strftime('%Y-%m-%d')
+            df = df[(day >= start_date) & (day <= end_date)]
             
-            def fetch_yahoo_data():
-                stock = yf.Ticker(ticker)
-                return stock.history(start=start_date, end=end_date)
+            if df.empty:
+                return None
+            
+            return self.standardize_intraday(df, ticker, 'Alpha Vantage')
             
-            df = await loop.run_in_executor(None, fetch_yahoo_data)
+        except Exception as e:
+            logger.error(f"Alpha Vantage intraday error: {str(e)}")
+            return None
+
+class YahooFinanceAdapter(DataSourceAdapter):
+    """
+    Adapter for Yahoo Finance using yfinance library.
+    Yahoo's Close is already split-adjusted, so raw requests undo the splits.
+    """
+    
+    name = "yahoo"
+    supports_intraday = True
+    
+    # Yahoo's names for the supported intraday intervals
+    CHART_INTERVALS = {"1m": "1m", "5m": "5m", "1h": "60m"}
+    
+    def __init__(self, rate_limiter):
+        super().__init__(rate_limiter)
+        # When set, query the chart API directly instead of going through yfinance
+        self.base_url = os.environ.get("YAHOO_BASE_URL")
+        
+        # yfinance traffic can't be recorded, so recording and replaying both go
+        # through the chart API; a replay then asks for what was recorded
+        if self.base_url is None and get_archive() is not None:
+            self.base_url = "https://query1.finance.yahoo.com"
+    
+    async def fetch_chart(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
+        """Fetch daily bars and corporate actions from a Yahoo chart API endpoint; an empty frame if it has none"""
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        
+        url = (f"{self.base_url}/v8/finance/chart/{ticker}"
+               f"?period1={int(start_dt.timestamp())}&period2={int(end_dt.timestamp())}"
+               f"&interval=1d&events=div%2Csplits")
+        
+        async with aiohttp.ClientSession() as session:
+            status, content = await self.http_get(session, url)
+        
+        if status == 429:
+            self.rate_limiter.record_throttle(self.name)
+            return None
+        if status != 200:
+            logger.warning(f"Yahoo chart API returned status {status}")
+            return None
+        payload = json.loads(content)
+        
+        results = (payload.get('chart') or {}).get('result') or []
+        if not results or not results[0].get('timestamp'):
+            return pd.DataFrame()
+        
+        result = results[0]
+        quote = result['indicators']['quote'][0]
+        df = pd.DataFrame({
+            'Date': pd.to_datetime(result['timestamp'], unit='s').strftime('%Y-%m-%d'),
+            'Open': quote['open'],
+            'High': quote['high'],
+            'Low': quote['low'],
+            'Close': quote['close'],
+            'Volume': quote['volume']
+        })
+        
+        adjclose = result['indicators'].get('adjclose')
+        if adjusted and adjclose:
+            df['Close'] = adjclose[0]['adjclose']
+        
+        # Events are keyed by timestamp; line them up with the bars by date
+        events = result.get('events') or {}
+        dividends = {
+            pd.to_datetime(e['date'], unit='s').strftime('%Y-%m-%d'): e['amount']
+            for e in (events.get('dividends') or {}).values()
+        }
+        df['Dividends'] = df['Date'].map(dividends).fillna(0.0)
+        df['Stock Splits'] = df['Date'].map(self.chart_splits(events)).fillna(1.0)
+        
+        return df
+    
+    @staticmethod
+    def chart_splits(events: dict) -> Dict[str, float]:
+        """{date: ratio} for the split events of a chart API result"""
+        return {
+            pd.to_datetime(e['date'], unit='s').strftime('%Y-%m-%d'): e['numerator'] / e['denominator']
+            for e in (events.get('splits') or {}).values()
+        }
+    
+    async def fetch_chart_splits(self, ticker: str) -> Optional[pd.Series]:
+        """
+        Every split in a ticker's history from the chart API, as ratios indexed by
+        date. Chart closes reflect all splits to date, not only those inside the
+        requested range, so raw bars have to be un-split with the full history.
+        """
+        await self.rate_limiter.wait_if_needed(self.name)
+        
+        url = f"{self.base_url}/v8/finance/chart/{ticker}?range=max&interval=3mo&events=split"
+        async with aiohttp.ClientSession() as session:
+            status, content = await self.http_get(session, url)
+        
+        if status == 429:
+            self.rate_limiter.record_throttle(self.name)
+            return None
+        if status != 200:
+            logger.warning(f"Yahoo chart API returned status {status} for the split history")
+            return None
+        
+        results = (json.loads(content).get('chart') or {}).get('result') or []
+        events = (results[0].get('events') or {}) if results else {}
+        return pd.Series(self.chart_splits(events), dtype=float)
+    
+    async def fetch_chart_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> Optional[pd.DataFrame]:
+        """Fetch intraday bars from a Yahoo chart API endpoint"""
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1)
+        
+        url = (f"{self.base_url}/v8/finance/chart/{ticker}"
+               f"?period1={int(start_dt.timestamp())}&period2={int(end_dt.timestamp())}"
+               f"&interval={self.CHART_INTERVALS[interval]}")
+        
+        async with aiohttp.ClientSession() as session:
+            status, content = await self.http_get(session, url)
+        
+        if status == 429:
+            self.rate_limiter.record_throttle(self.name)
+            return None
+        if status != 200:
+            logger.warning(f"Yahoo chart API returned status {status}")
+            return None
+        payload = json.loads(content)
+        
+        results = (payload.get('chart') or {}).get('result') or []
+        if not results or not results[0].get('timestamp'):
+            return None
+        
+        result = results[0]
+        quote = result['indicators']['quote'][0]
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(result['timestamp'], unit='s', utc=True),
+            'open': quote['open'],
+            'high': quote['high'],
+            'low': quote['low'],
+            'close': quote['close'],
+            'volume': quote['volume']
+        })
+    
+    async def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> Optional[pd.DataFrame]:
+        """Fetch intraday bars from Yahoo Finance (1m history only reaches back about 30 days)"""
+        await self.rate_limiter.wait_if_needed(self.name)
+        
+        try:
+            if self.base_url:
+                df = await self.fetch_chart_intraday(ticker, start_date, end_date, interval)
+            else:
+                loop = asyncio.get_event_loop()
+                end_exclusive = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+                
+                def fetch_yahoo_intraday():
+                    import yfinance as yf
+                    history = yf.Ticker(ticker).history(
+                        start=start_date, end=end_exclusive,
+                        interval=self.CHART_INTERVALS[interval], auto_adjust=False, actions=False
+                    )
+                    return history.rename_axis('timestamp').reset_index()
+                
+                df = await loop.run_in_executor(None, fetch_yahoo_intraday)
             
             if df is None or df.empty:
                 return None
             
-            # Reset index to get date as column
-            df = df.reset_index()
+            return self.standardize_intraday(df, ticker, 'Yahoo Finance')
             
-            # Use adjusted close if requested
-            if adjusted and 'Adj Close' in df.columns:
-                df['Close'] = df['Adj Close']
+        except Exception as e:
+            if "Too Many Requests" in str(e) or "Rate limited" in str(e):
+                self.rate_limiter.record_throttle(self.name)
+            logger.error(f"Yahoo Finance intraday error: {str(e)}")
+            return None
+    
+    async def fetch_data(self, ticker: str, start_date: str, end_date: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
+        """Fetch data from Yahoo Finance"""
+        await self.rate_limiter.wait_if_needed(self.name)
+        
+        try:
+            split_history = None
+            
+            if self.base_url:
+                df = await self.fetch_chart(ticker, start_date, end_date, adjusted)
+                if df is None:
+                    return None
+                if df.empty:
+                    return self.no_bars()
+                
+                # Without the later splits a range before a split would be cached still split-adjusted
+                if not adjusted:
+                    split_history = await self.fetch_chart_splits(ticker)
+                    if split_history is None:
+                        return None
+            else:
+                # Use yfinance in an executor to avoid blocking
+                loop = asyncio.get_event_loop()
+                
+                def fetch_yahoo_data():
+                    # yfinance is slow to import and only needed once Yahoo is reached
+                    import yfinance as yf
+                    stock = yf.Ticker(ticker)
+                    history = stock.history(start=start_date, end=end_date, auto_adjust=False, actions=True)
+                    # Closes reflect every split to date, not just those in range
+                    return history, (None if adjusted else stock.splits)
+                
+                df, split_history = await loop.run_in_executor(None, fetch_yahoo_data)
+                
+                # yfinance also returns an empty frame when the request failed, so it can't count as no data
+                if df is None or df.empty:
+                    return None
+                
+                # Reset index to get date as column
+                df = df.reset_index()
+                
+                # Use adjusted close if requested
+                if adjusted and 'Adj Close' in df.columns:
+                    df['Close'] = df['Adj Close']
             
-            return self.standardize_dataframe(df, ticker, 'Yahoo Finance')
+            df = self.standardize_dataframe(df, ticker, 'Yahoo Finance')
+            
+            if not adjusted:
+                if split_history is not None and len(split_history) > 0:
+                    splits = pd.DataFrame({
+                        'date': pd.to_datetime(split_history.index).strftime('%Y-%m-%d'),
+                        'dividend': 0.0,
+                        'split': split_history.to_numpy(dtype=float)
+                    })
+                else:
+                    splits = df.loc[df['split'] != 1.0, ['date', 'dividend', 'split']].assign(dividend=0.0)
+                df = add_changes(unapply_splits(df, splits))
+            
+            return df
             
         except Exception as e:
+            if "Too Many Requests" in str(e) or "Rate limited" in str(e):
+                self.rate_limiter.record_throttle(self.name)
             logger.error(f"Yahoo Finance adapter error: {str(e)}")
             return None
\ No newline at end of file
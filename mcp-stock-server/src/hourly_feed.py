@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Hourly market feed for the dashboard (data/hourly_market_data.json).
+Hourly bars for the traded tickers come from the intraday store, so volume is
+real share volume; trade counts come from transactions.json.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add the project root to the path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = project_root.parent / "data"
+
+def hour_of(timestamp: str) -> str:
+    """Floor an ISO timestamp to the start of its UTC hour"""
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.replace(minute=0, second=0, microsecond=0).isoformat()
+
+def build_hourly_feed(bars: List[Dict[str, Any]], trades: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aggregate intraday bar records (any interval) into hourly feed entries.
+    avgPrice is the volume-weighted typical price across tickers for the hour;
+    hours with trades but no bars (outside the session) use the mean trade price.
+    """
+    trade_counts = Counter()
+    trade_prices: Dict[str, List[float]] = {}
+    for trade in trades:
+        hour = hour_of(trade['timestamp'])
+        trade_counts[hour] += 1
+        trade_prices.setdefault(hour, []).append(trade.get('price', 0.0))
+    
+    hours: Dict[str, Dict[str, float]] = {hour: {"volume": 0, "notional": 0.0} for hour in trade_counts}
+    
+    for bar in bars:
+        hour = hours.setdefault(hour_of(bar['timestamp']), {"volume": 0, "notional": 0.0})
+        typical = (bar['high'] + bar['low'] + bar['close']) / 3
+        hour["volume"] += bar['volume']
+        hour["notional"] += typical * bar['volume']
+    
+    return [
+        {
+            "timestamp": hour,
+            "tradeCount": trade_counts.get(hour, 0),
+            "avgPrice": round(totals["notional"] / totals["volume"], 4) if totals["volume"]
+                        else round(sum(trade_prices[hour]) / len(trade_prices[hour]), 4),
+            "volume": int(totals["volume"])
+        }
+        for hour, totals in sorted(hours.items())
+    ]
+
+async def export_hourly_feed(server, transactions_path: Path, output_path: Path,
+                             start_date: str, end_date: str, tickers: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Fill the intraday store for the traded tickers and write the hourly feed"""
+    with open(transactions_path) as f:
+        trades = json.load(f).get('transactions', [])
+    
+    # Only trades inside the window count towards the feed
+    trades = [t for t in trades if t.get('timestamp') and start_date <= hour_of(t['timestamp'])[:10] <= end_date]
+    if not tickers:
+        tickers = sorted({t['symbol'] for t in trades if t.get('symbol')})
+    
+    results = await asyncio.gather(*[
+        server.handle_tool_call("get_prices", {
+            "ticker": ticker, "start": start_date, "end": end_date, "interval": "1h"
+        })
+        for ticker in tickers
+    ])
+    
+    bars = []
+    for ticker, result in zip(tickers, results):
+        if "error" in result:
+            logger.warning(f"No hourly bars for {ticker}: {result['error']}")
+            continue
+        bars.extend(result['data'])
+    
+    feed = {
+        "lastUpdated": datetime.now().isoformat(),
+        "data": build_hourly_feed(bars, trades)
+    }
+    
+    # Write atomically so the dashboard never reads a partial file
+    tmp = output_path.with_suffix(output_path.suffix + ".tmp")
+    tmp.write_text(json.dumps(feed, indent=2))
+    tmp.replace(output_path)
+    
+    logger.info(f"Wrote {len(feed['data'])} hourly entries for {len(tickers)} tickers to {output_path}")
+    return feed
+
+def parse_args(argv=None) -> argparse.Namespace:
+    today = datetime.now(timezone.utc).date()
+    parser = argparse.ArgumentParser(description="Build hourly_market_data.json from intraday bars")
+    parser.add_argument("--transactions", default=str(DATA_DIR / "transactions.json"))
+    parser.add_argument("--output", default=str(DATA_DIR / "hourly_market_data.json"))
+    parser.add_argument("--end", default=today.isoformat(), help="Last day to include (UTC)")
+    parser.add_argument("--days", type=int, default=5, help="Calendar days to include, ending at --end")
+    parser.add_argument("--tickers", nargs="*", help="Tickers to include (default: traded symbols)")
+    parser.add_argument("--cache-dir", help="Cache directory (default: data/prices)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    
+    from src.server import StockPricesServer
+    
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    start_date = (end - timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+    server = StockPricesServer(cache_dir=args.cache_dir)
+    
+    asyncio.run(export_hourly_feed(
+        server, Path(args.transactions), Path(args.output), start_date, args.end, args.tickers
+    ))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
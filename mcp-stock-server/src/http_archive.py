@@ -0,0 +1,188 @@
+"""
+Record/replay archive for upstream HTTP traffic.
+In record mode every response the adapters receive is appended, with its status
+and elapsed time, to a JSON-lines archive. In replay mode the adapters are
+served from the archive instead of the network, optionally waiting the recorded
+time (scaled by a speed factor), so a production run can be reproduced offline
+and different server versions compared on the same real-world traffic.
+
+Configured with MCP_STOCK_HTTP_RECORD=path or MCP_STOCK_HTTP_REPLAY=path, and
+MCP_STOCK_REPLAY_SPEED (1 = recorded timing, 10 = ten times faster, 0 = no wait).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that differ between environments but not between responses
+IGNORED_PARAMS = {"apikey"}
+
+# Start/end parameters of date-ranged requests (Stooq d1/d2, Yahoo period1/period2)
+RANGE_PARAMS = (("d1", "d2"), ("period1", "period2"))
+
+def archive_key(source: str, method: str, url: str) -> str:
+    """
+    Key a request by source, method, path and query. Scheme, host and credentials
+    are dropped so a recording replays against any base URL and API key.
+    """
+    parts = urlsplit(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS])
+    return f"{source} {method} {parts.path}?{query}"
+
+def range_key(key: str) -> Optional[Tuple[str, int, int]]:
+    """
+    Split a key for a date-ranged request into (key without the range, start, end);
+    None for other requests. Both range formats (YYYYMMDD, epoch seconds) order as integers.
+    """
+    path, _, query = key.partition("?")
+    params = parse_qsl(query, keep_blank_values=True)
+    values = dict(params)
+    for start, end in RANGE_PARAMS:
+        if start in values and end in values:
+            rest = urlencode([(k, v) for k, v in params if k not in (start, end)])
+            return f"{path}?{rest}", int(values[start]), int(values[end])
+    return None
+
+class HttpArchive:
+    """JSON-lines archive of upstream responses, in record or replay mode"""
+    
+    def __init__(self, path: Path, mode: str, speed: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported archive mode: {mode}")
+        
+        self.path = Path(path)
+        self.mode = mode
+        self.speed = speed
+        self.lock = threading.Lock()
+        
+        # Responses per key in recorded order; replay hands them out in turn
+        self.responses: Dict[str, Deque[dict]] = {}
+        
+        # Recorded ranges of date-ranged requests: key without range -> [(start, end, key)]
+        self.ranges: Dict[str, List[Tuple[int, int, str]]] = {}
+        
+        # Counters per source
+        self.counts: Dict[str, Dict[str, int]] = {}
+        
+        if mode == "replay":
+            self.load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+    
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+    
+    def count(self, source: str, key: str):
+        counts = self.counts.setdefault(source, {"recorded": 0, "replayed": 0, "misses": 0})
+        counts[key] += 1
+    
+    def load(self):
+        """Read a recorded archive into memory"""
+        entries = 0
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["key"] not in self.responses:
+                    ranged = range_key(entry["key"])
+                    if ranged is not None:
+                        self.ranges.setdefault(ranged[0], []).append((ranged[1], ranged[2], entry["key"]))
+                self.responses.setdefault(entry["key"], deque()).append(entry)
+                entries += 1
+        
+        logger.info(f"Replaying {entries} recorded responses from {self.path}")
+    
+    def record(self, source: str, method: str, url: str, status: int, body: str, elapsed: float):
+        """Append one response to the archive"""
+        entry = {
+            "key": archive_key(source, method, url),
+            "source": source,
+            "status": status,
+            "elapsed": round(elapsed, 6),
+            "recorded": time.time(),
+            "body": body
+        }
+        
+        # One write per line in append mode, so shard workers can share the archive
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+            self.count(source, "recorded")
+    
+    async def replay(self, source: str, method: str, url: str) -> Tuple[int, str]:
+        """
+        Serve the next recorded response for a request, after its recorded time
+        divided by the speed factor. Repeated requests get the recorded responses
+        in order and then keep getting the last one. A date range that wasn't
+        recorded exactly is served the narrowest recorded range covering it, since
+        gap planning splits ranges differently depending on request order; anything
+        else unrecorded gets a 404.
+        """
+        key = archive_key(source, method, url)
+        queue = self.responses.get(key) or self.responses.get(self.covering(key))
+        
+        if not queue:
+            logger.warning(f"No recorded response for {key}")
+            self.count(source, "misses")
+            return 404, ""
+        
+        entry = queue.popleft() if len(queue) > 1 else queue[0]
+        self.count(source, "replayed")
+        
+        if self.speed > 0 and entry["elapsed"] > 0:
+            await asyncio.sleep(entry["elapsed"] / self.speed)
+        return entry["status"], entry["body"]
+    
+    def covering(self, key: str) -> Optional[str]:
+        """Key of the narrowest recorded successful response whose date range covers this request's"""
+        ranged = range_key(key)
+        if ranged is None:
+            return None
+        
+        base, start, end = ranged
+        candidates = [
+            (recorded_end - recorded_start, recorded_key)
+            for recorded_start, recorded_end, recorded_key in self.ranges.get(base, [])
+            if recorded_start <= start and recorded_end >= end and self.responses[recorded_key][-1]["status"] == 200
+        ]
+        return min(candidates)[1] if candidates else None
+    
+    def get_stats(self) -> dict:
+        """Get archive statistics"""
+        return {
+            "mode": self.mode,
+            "path": str(self.path),
+            "speed": self.speed,
+            "sources": {source: dict(counts) for source, counts in self.counts.items()}
+        }
+
+_archive: Optional[HttpArchive] = None
+_configured = False
+
+def get_archive() -> Optional[HttpArchive]:
+    """The archive configured by the environment, or None for live traffic"""
+    global _archive, _configured
+    if not _configured:
+        record = os.environ.get("MCP_STOCK_HTTP_RECORD")
+        replay = os.environ.get("MCP_STOCK_HTTP_REPLAY")
+        speed = float(os.environ.get("MCP_STOCK_REPLAY_SPEED", "1"))
+        
+        if replay:
+            _archive = HttpArchive(Path(replay), "replay", speed)
+        elif record:
+            _archive = HttpArchive(Path(record), "record")
+        _configured = True
+    
+    return _archive
\ No newline at end of file
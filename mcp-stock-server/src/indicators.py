@@ -0,0 +1,287 @@
+"""
+Technical indicators (SMA, EMA, RSI, ATR, Bollinger Bands) over daily bars.
+Full histories are computed with NumPy; the engine keeps each ticker's
+indicator state so bars appended later are folded in one at a time instead of
+recomputing the whole history.
+"""
+
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDICATORS = ["sma:20", "sma:50", "ema:12", "ema:26", "rsi:14", "atr:14", "bbands:20:2"]
+
+INDICATOR_KINDS = ("sma", "ema", "rsi", "atr", "bbands")
+
+# Block length for the closed-form exponential smoothing; keeps decay powers in float range
+EWM_BLOCK = 256
+
+def parse_spec(spec: str) -> Tuple[str, int, float]:
+    """Parse 'kind:period[:width]' (e.g. rsi:14, bbands:20:2) into its parts"""
+    parts = spec.lower().split(":")
+    kind = parts[0]
+    if kind not in INDICATOR_KINDS:
+        raise ValueError(f"Unknown indicator: {spec}")
+    
+    try:
+        period = int(parts[1]) if len(parts) > 1 else 14
+        width = float(parts[2]) if len(parts) > 2 else 2.0
+    except ValueError:
+        raise ValueError(f"Invalid indicator parameters: {spec}")
+    
+    if period < 2:
+        raise ValueError(f"Indicator period must be at least 2: {spec}")
+    return kind, period, width
+
+def spec_name(spec: str) -> str:
+    """Output key for a spec, e.g. bbands:20:2 -> bbands_20_2"""
+    kind, period, width = parse_spec(spec)
+    if kind == "bbands":
+        return f"{kind}_{period}_{width:g}"
+    return f"{kind}_{period}"
+
+def ewm(values: np.ndarray, alpha: float, prev: Optional[float] = None) -> np.ndarray:
+    """
+    Exponential smoothing y[t] = (1 - alpha) * y[t-1] + alpha * x[t], vectorized.
+    Starts from prev, or from the first value when there is no prior state.
+    Each block uses the closed form y[t] = d^(t+1) * (prev + alpha * sum(x[i] / d^(i+1))).
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+    
+    start = 0
+    if prev is None:
+        out[0] = prev = values[0]
+        start = 1
+    
+    decay = 1.0 - alpha
+    for block in range(start, len(values), EWM_BLOCK):
+        x = values[block:block + EWM_BLOCK]
+        powers = decay ** np.arange(1, len(x) + 1)
+        y = powers * (prev + alpha * np.cumsum(x / powers))
+        out[block:block + len(x)] = y
+        prev = y[-1]
+    
+    return out
+
+def rolling_mean_std(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and population standard deviation via cumulative sums"""
+    n = len(values)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if n < period:
+        return mean, std
+    
+    # Center on the first value to keep the sum of squares well conditioned
+    centered = values - values[0]
+    csum = np.concatenate(([0.0], np.cumsum(centered)))
+    csq = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    
+    window_sum = csum[period:] - csum[:-period]
+    window_sq = csq[period:] - csq[:-period]
+    window_mean = window_sum / period
+    
+    mean[period - 1:] = window_mean + values[0]
+    std[period - 1:] = np.sqrt(np.maximum(window_sq / period - window_mean ** 2, 0.0))
+    return mean, std
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range; the first bar has no previous close and uses high - low"""
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    return np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+
+def rsi_from_averages(avg_gain, avg_loss):
+    """RSI from Wilder-smoothed average gain and loss"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+
+def compute_indicator(spec: str, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Compute one indicator over a full history; returns (series by name, state for updates)"""
+    kind, period, width = parse_spec(spec)
+    name = spec_name(spec)
+    
+    if kind == "sma":
+        mean, _ = rolling_mean_std(close, period)
+        return {name: mean}, {"window": deque(close[-period:], maxlen=period)}
+    
+    if kind == "bbands":
+        mean, std = rolling_mean_std(close, period)
+        series = {
+            f"{name}_middle": mean,
+            f"{name}_upper": mean + width * std,
+            f"{name}_lower": mean - width * std
+        }
+        return series, {"window": deque(close[-period:], maxlen=period)}
+    
+    if kind == "ema":
+        values = ewm(close, 2.0 / (period + 1))
+        return {name: values}, {"value": values[-1]}
+    
+    if kind == "rsi":
+        change = np.diff(close, prepend=close[0])
+        avg_gain = ewm(np.maximum(change, 0.0), 1.0 / period)
+        avg_loss = ewm(np.maximum(-change, 0.0), 1.0 / period)
+        values = rsi_from_averages(avg_gain, avg_loss)
+        values[0] = np.nan
+        return {name: values}, {"avg_gain": avg_gain[-1], "avg_loss": avg_loss[-1]}
+    
+    # atr
+    values = ewm(true_range(high, low, close), 1.0 / period)
+    return {name: values}, {"value": values[-1]}
+
+def update_indicator(spec: str, state: Dict[str, Any], high: float, low: float, close: float, prev_close: float) -> Dict[str, float]:
+    """Fold one new bar into an indicator's state in O(1); returns the new values"""
+    kind, period, width = parse_spec(spec)
+    name = spec_name(spec)
+    
+    if kind in ("sma", "bbands"):
+        window = state["window"]
+        window.append(close)
+        if len(window) < period:
+            mean = std = float("nan")
+        else:
+            values = np.fromiter(window, dtype=float, count=period)
+            mean, std = values.mean(), values.std()
+        if kind == "sma":
+            return {name: mean}
+        return {f"{name}_middle": mean, f"{name}_upper": mean + width * std, f"{name}_lower": mean - width * std}
+    
+    if kind == "ema":
+        alpha = 2.0 / (period + 1)
+        state["value"] = (1 - alpha) * state["value"] + alpha * close
+        return {name: state["value"]}
+    
+    if kind == "rsi":
+        alpha = 1.0 / period
+        change = close - prev_close
+        state["avg_gain"] = (1 - alpha) * state["avg_gain"] + alpha * max(change, 0.0)
+        state["avg_loss"] = (1 - alpha) * state["avg_loss"] + alpha * max(-change, 0.0)
+        return {name: float(rsi_from_averages(state["avg_gain"], state["avg_loss"]))}
+    
+    # atr
+    alpha = 1.0 / period
+    tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+    state["value"] = (1 - alpha) * state["value"] + alpha * tr
+    return {name: state["value"]}
+
+def clean(value: float) -> Optional[float]:
+    """Round for output; NaN (not enough history yet) becomes None"""
+    return None if value is None or np.isnan(value) else round(float(value), 6)
+
+class IndicatorEngine:
+    """Per-ticker indicator state keyed by (ticker, adjusted)"""
+    
+    def __init__(self, max_tickers: int = 5000):
+        self.max_tickers = max_tickers
+        self.states: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+        
+        # Counters for the metrics surface
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+    
+    def invalidate(self, ticker: str, since: Optional[str] = None, adjusted: Optional[bool] = None):
+        """Drop state that includes bars from `since` onward (None drops it outright)"""
+        for key in [k for k in self.states if k[0] == ticker.upper()]:
+            if adjusted is not None and key[1] != adjusted:
+                continue
+            if since is None or self.states[key]["last_date"] >= since:
+                del self.states[key]
+    
+    def peek(self, ticker: str, adjusted: bool, specs: List[str], version: Any) -> Optional[Dict[str, Any]]:
+        """Latest values if the state is current for this cache file version"""
+        state = self.states.get((ticker.upper(), adjusted))
+        if state is None or state["version"] != version or any(s not in state["specs"] for s in specs):
+            return None
+        
+        self.hits += 1
+        return self.latest(state, specs)
+    
+    def latest(self, state: Dict[str, Any], specs: List[str]) -> Dict[str, Any]:
+        values = {}
+        for spec in specs:
+            values.update({name: clean(v) for name, v in state["values"][spec].items()})
+        return {"date": state["last_date"], "close": clean(state["last_close"]), "indicators": values}
+    
+    def update(self, ticker: str, adjusted: bool, specs: List[str], bars: pd.DataFrame, version: Any) -> Dict[str, Any]:
+        """Bring state up to date with bars (sorted by date) and return the latest values"""
+        key = (ticker.upper(), adjusted)
+        state = self.states.get(key)
+        dates = bars['date'].to_numpy()
+        
+        can_extend = (
+            state is not None
+            and all(s in state["specs"] for s in specs)
+            and len(dates) > 0
+            and dates[-1] >= state["last_date"]
+        )
+        position = int(np.searchsorted(dates, state["last_date"])) if can_extend else -1
+        
+        if can_extend and position < len(dates) and dates[position] == state["last_date"]:
+            # Fold in only the bars appended since the state was built
+            high = bars['high'].to_numpy(dtype=float)
+            low = bars['low'].to_numpy(dtype=float)
+            close = bars['close'].to_numpy(dtype=float)
+            for i in range(position + 1, len(dates)):
+                for spec in state["specs"]:
+                    state["values"][spec] = update_indicator(
+                        spec, state["states"][spec], high[i], low[i], close[i], close[i - 1]
+                    )
+            if position + 1 < len(dates):
+                state["last_date"] = dates[-1]
+                state["last_close"] = close[-1]
+                self.incremental += 1
+            else:
+                self.hits += 1
+            state["version"] = version
+            return self.latest(state, specs)
+        
+        series, state = self.compute(bars, sorted(set(specs) | set(state["specs"] if state else [])))
+        state["version"] = version
+        self.states[key] = state
+        self.full += 1
+        
+        if len(self.states) > self.max_tickers:
+            self.states.pop(next(iter(self.states)))
+        
+        return self.latest(state, specs)
+    
+    def compute(self, bars: pd.DataFrame, specs: List[str]) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Compute full series for specs and the state needed to extend them"""
+        high = bars['high'].to_numpy(dtype=float)
+        low = bars['low'].to_numpy(dtype=float)
+        close = bars['close'].to_numpy(dtype=float)
+        
+        series: Dict[str, np.ndarray] = {}
+        state = {
+            "specs": set(specs),
+            "states": {},
+            "values": {},
+            "last_date": bars['date'].iloc[-1] if len(bars) else "",
+            "last_close": close[-1] if len(close) else float("nan")
+        }
+        
+        for spec in specs:
+            spec_series, spec_state = compute_indicator(spec, high, low, close)
+            series.update(spec_series)
+            state["states"][spec] = spec_state
+            state["values"][spec] = {name: values[-1] for name, values in spec_series.items()}
+        
+        return series, state
+    
+    def get_stats(self) -> dict:
+        """Get engine statistics"""
+        return {
+            "tickers": len(self.states),
+            "hits": self.hits,
+            "incremental_updates": self.incremental,
+            "full_computes": self.full
+        }
\ No newline at end of file
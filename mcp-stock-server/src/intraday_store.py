@@ -0,0 +1,235 @@
+"""
+Compact on-disk store for intraday (1m/5m/1h) bars.
+One Parquet file per ticker-day and interval. Timestamps are epoch seconds and
+prices are fixed-point integers, all delta-encoded (DELTA_BINARY_PACKED) and
+zstd-compressed, so a trading day of minute bars takes a few kilobytes.
+Past months can be compacted into one file per ticker-month ({YYYY-MM}.parquet),
+which keeps the file count down for long histories.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Supported intervals and their bar length in seconds
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600}
+
+# Prices are stored as integer ten-thousandths
+PRICE_SCALE = 10_000
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+INTRADAY_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'ticker', 'source']
+
+class IntradayStore:
+    """Stores intraday bars per ticker-day under {cache_dir}/intraday/{interval}/{TICKER}/"""
+    
+    def __init__(self, cache_dir: Path):
+        self.root = Path(cache_dir) / "intraday"
+        self.root.mkdir(parents=True, exist_ok=True)
+        
+        # Held while reading or replacing files, since compaction runs in a worker thread
+        self.lock = threading.RLock()
+        
+        # Counters for the metrics surface
+        self.bytes_read = 0
+        self.bytes_written = 0
+    
+    def get_day_path(self, ticker: str, interval: str, day: str) -> Path:
+        """Get the file path for one ticker-day"""
+        return self.root / interval / ticker.upper() / f"{day}.parquet"
+    
+    def encode(self, bars: pd.DataFrame, source: str) -> pa.Table:
+        """Convert standardized bars to the fixed-point columnar layout"""
+        columns = {'ts': bars['timestamp'].to_numpy(dtype=np.int64)}
+        for col in PRICE_COLUMNS:
+            columns[col] = np.round(bars[col].to_numpy(dtype=float) * PRICE_SCALE).astype(np.int64)
+        columns['volume'] = bars['volume'].fillna(0).to_numpy(dtype=np.int64)
+        
+        return pa.table(columns).replace_schema_metadata({'source': source})
+    
+    def decode(self, table: pa.Table, ticker: str) -> pd.DataFrame:
+        """Convert a stored table back to standardized bars"""
+        metadata = table.schema.metadata or {}
+        bars = pd.DataFrame({'timestamp': table.column('ts').to_numpy()})
+        for col in PRICE_COLUMNS:
+            bars[col] = table.column(col).to_numpy() / PRICE_SCALE
+        bars['volume'] = table.column('volume').to_numpy()
+        bars['ticker'] = ticker.upper()
+        
+        if b'days' in metadata:
+            # Month files keep the source of each day they cover
+            sources = json.loads(metadata[b'days'])
+            days = pd.to_datetime(bars['timestamp'], unit='s', utc=True).dt.strftime('%Y-%m-%d')
+            bars['source'] = days.map(sources).fillna('')
+        else:
+            bars['source'] = metadata.get(b'source', b'').decode()
+        return bars
+    
+    def month_days(self, ticker: str, interval: str, months: set) -> set:
+        """Days covered by compacted month files, read from their footers"""
+        days = set()
+        for month in months:
+            path = self.root / interval / ticker.upper() / f"{month}.parquet"
+            if path.exists():
+                metadata = pq.read_schema(path).metadata or {}
+                days.update(json.loads(metadata.get(b'days', b'{}')))
+        return days
+    
+    def pending_days(self, ticker: str, interval: str, start_date: str, end_date: str) -> List[str]:
+        """Weekdays in the range that still need fetching; today is always refetched"""
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        days = pd.bdate_range(start_date, min(end_date, today)).strftime('%Y-%m-%d')
+        
+        with self.lock:
+            compacted = self.month_days(ticker, interval, {day[:7] for day in days})
+            return [
+                day for day in days
+                if day >= today or not (day in compacted or self.get_day_path(ticker, interval, day).exists())
+            ]
+    
+    def load(self, ticker: str, interval: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Load stored bars for a date range (inclusive), oldest first"""
+        directory = self.root / interval / ticker.upper()
+        frames = []
+        
+        with self.lock:
+            for path in sorted(directory.glob("*.parquet")) if directory.exists() else []:
+                # Day files are named YYYY-MM-DD, compacted month files YYYY-MM
+                if not start_date[:len(path.stem)] <= path.stem <= end_date[:len(path.stem)]:
+                    continue
+                table = pq.read_table(path)
+                self.bytes_read += path.stat().st_size
+                if table.num_rows:
+                    frames.append(self.decode(table, ticker))
+        
+        if not frames:
+            return pd.DataFrame(columns=INTRADAY_COLUMNS)
+        
+        bars = pd.concat(frames, ignore_index=True)
+        if len(frames) > 1:
+            bars = bars.sort_values('timestamp').drop_duplicates(subset=['timestamp'], keep='last')
+        
+        # Month files cover whole months; trim to the requested days
+        days = pd.to_datetime(bars['timestamp'], unit='s', utc=True).dt.strftime('%Y-%m-%d')
+        bars = bars[(days >= start_date) & (days <= end_date)]
+        return bars.reset_index(drop=True)[INTRADAY_COLUMNS]
+    
+    def save(self, ticker: str, interval: str, bars: Optional[pd.DataFrame], days: List[str]):
+        """
+        Write fetched bars one file per UTC day.
+        Requested past days without bars (holidays) are stored empty so they are
+        not fetched again.
+        """
+        by_day: Dict[str, pd.DataFrame] = {}
+        if bars is not None and not bars.empty:
+            bars = bars.sort_values('timestamp').drop_duplicates(subset=['timestamp'], keep='last')
+            day_keys = pd.to_datetime(bars['timestamp'], unit='s', utc=True).dt.strftime('%Y-%m-%d')
+            by_day = {day: group for day, group in bars.groupby(day_keys.to_numpy())}
+        
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        empty = pd.DataFrame(columns=INTRADAY_COLUMNS)
+        
+        for day in sorted(set(days) | set(by_day)):
+            group = by_day.get(day)
+            if group is None and day >= today:
+                continue
+            
+            source = group['source'].iloc[0] if group is not None else ''
+            self.write_day(ticker, interval, day, group if group is not None else empty, source)
+    
+    def write_day(self, ticker: str, interval: str, day: str, bars: pd.DataFrame, source: str):
+        """Write a single ticker-day file"""
+        path = self.get_day_path(ticker, interval, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with self.lock:
+            self.write_table(self.encode(bars, source), path)
+    
+    def write_table(self, table: pa.Table, path: Path, compression_level: Optional[int] = None):
+        """Write a table atomically with delta encoding and zstd"""
+        tmp = path.with_suffix('.tmp')
+        pq.write_table(
+            table, tmp,
+            compression='zstd',
+            compression_level=compression_level,
+            use_dictionary=False,
+            column_encoding={name: 'DELTA_BINARY_PACKED' for name in table.column_names}
+        )
+        tmp.replace(path)
+        self.bytes_written += path.stat().st_size
+    
+    def compactable_months(self, ticker: str, interval: str) -> List[str]:
+        """Months before the current one that still have separate day files"""
+        directory = self.root / interval / ticker.upper()
+        current = datetime.now(timezone.utc).strftime('%Y-%m')
+        if not directory.exists():
+            return []
+        return sorted({path.stem[:7] for path in directory.glob("????-??-??.parquet") if path.stem[:7] < current})
+    
+    def compact_month(self, ticker: str, interval: str, month: str, compression_level: int = 9) -> int:
+        """
+        Merge a past month's day files (and any earlier month file) into one
+        {YYYY-MM}.parquet at a higher zstd level; returns the bytes saved.
+        """
+        directory = self.root / interval / ticker.upper()
+        month_path = directory / f"{month}.parquet"
+        
+        with self.lock:
+            day_paths = sorted(directory.glob(f"{month}-??.parquet"))
+            if not day_paths:
+                return 0
+            
+            tables, sources, before = [], {}, 0
+            for path in ([month_path] if month_path.exists() else []) + day_paths:
+                table = pq.read_table(path)
+                metadata = table.schema.metadata or {}
+                before += path.stat().st_size
+                
+                if path == month_path:
+                    sources.update(json.loads(metadata.get(b'days', b'{}')))
+                else:
+                    # Empty day files (holidays) are kept as covered days with no rows
+                    sources[path.stem] = metadata.get(b'source', b'').decode()
+                tables.append(table.replace_schema_metadata(None))
+            
+            merged = pa.concat_tables(tables).sort_by('ts')
+            self.write_table(merged.replace_schema_metadata({'days': json.dumps(sources)}), month_path, compression_level)
+            for path in day_paths:
+                path.unlink()
+            
+            return before - month_path.stat().st_size
+    
+    def clear(self, ticker: Optional[str] = None, interval: Optional[str] = None):
+        """Remove stored bars for one ticker (optionally one interval) or everything"""
+        pattern = f"{interval or '*'}/{ticker.upper()}/*.parquet" if ticker else "*/*/*.parquet"
+        with self.lock:
+            for path in self.root.glob(pattern):
+                path.unlink()
+    
+    def get_stats(self) -> dict:
+        """Get statistics about the intraday store"""
+        files = list(self.root.glob("*/*/*.parquet"))
+        return {
+            "files": len(files),
+            "total_bytes": sum(f.stat().st_size for f in files),
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written
+        }
+
+def to_records(bars: pd.DataFrame) -> List[dict]:
+    """Convert stored bars to JSON-friendly records with ISO UTC timestamps"""
+    records = bars.to_dict('records')
+    for record in records:
+        record['timestamp'] = datetime.fromtimestamp(int(record['timestamp']), tz=timezone.utc).isoformat()
+        record['volume'] = int(record['volume'])
+    return records
\ No newline at end of file
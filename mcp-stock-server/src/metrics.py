@@ -0,0 +1,280 @@
+"""
+Server metrics: per-tool latency histograms, per-source outcomes and in-flight counts.
+Snapshots can be returned through the get_server_stats tool or rendered in the
+Prometheus text exposition format to a file or a small HTTP endpoint.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class LatencyHistogram:
+    """Cumulative latency histogram plus a window of recent samples for percentiles"""
+    
+    def __init__(self, window: int = 2048):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+    
+    def observe(self, seconds: float):
+        """Record a single latency sample"""
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+        
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+    
+    def percentile(self, q: float) -> float:
+        """Get the q-th percentile (0-100) of recent samples"""
+        if not self.recent:
+            return 0.0
+        
+        samples = sorted(self.recent)
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+    
+    def snapshot(self) -> dict:
+        """Get a JSON-serializable view of the histogram"""
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+        
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "p99": round(self.percentile(99), 6),
+            "buckets": buckets
+        }
+
+class MetricsRegistry:
+    """Collects request and upstream metrics for one server process"""
+    
+    def __init__(self):
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.tool_calls: Dict[str, int] = {}
+        self.tool_errors: Dict[str, int] = {}
+        self.tool_latency: Dict[str, LatencyHistogram] = {}
+        self.source_outcomes: Dict[str, Dict[str, int]] = {}
+        self.source_latency: Dict[str, LatencyHistogram] = {}
+    
+    @asynccontextmanager
+    async def track_tool(self, tool_name: str):
+        """Time a tool call and count it as in flight while it runs"""
+        self.in_flight += 1
+        start = time.perf_counter()
+        outcome = {"error": False}
+        try:
+            yield outcome
+        except Exception:
+            outcome["error"] = True
+            raise
+        finally:
+            self.in_flight -= 1
+            self.tool_calls[tool_name] = self.tool_calls.get(tool_name, 0) + 1
+            if outcome["error"]:
+                self.tool_errors[tool_name] = self.tool_errors.get(tool_name, 0) + 1
+            self.tool_latency.setdefault(tool_name, LatencyHistogram()).observe(time.perf_counter() - start)
+    
+    def record_source(self, source: str, success: bool, seconds: float):
+        """Record the outcome and latency of one upstream fetch"""
+        outcomes = self.source_outcomes.setdefault(source, {"success": 0, "failure": 0})
+        outcomes["success" if success else "failure"] += 1
+        self.source_latency.setdefault(source, LatencyHistogram()).observe(seconds)
+    
+    def snapshot(self, cache_stats: Optional[dict] = None, rate_stats: Optional[dict] = None) -> dict:
+        """Get all metrics as a JSON-serializable dict"""
+        tools = {
+            name: {
+                "calls": self.tool_calls.get(name, 0),
+                "errors": self.tool_errors.get(name, 0),
+                "latency": histogram.snapshot()
+            }
+            for name, histogram in self.tool_latency.items()
+        }
+        
+        sources = {}
+        for name, outcomes in self.source_outcomes.items():
+            total = outcomes["success"] + outcomes["failure"]
+            sources[name] = {
+                **outcomes,
+                "success_rate": round(outcomes["success"] / total, 4) if total else 0.0,
+                "latency": self.source_latency[name].snapshot()
+            }
+        
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "tools": tools,
+            "sources": sources,
+            "cache": cache_stats or {},
+            "rate_limiter": rate_stats or {}
+        }
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+def _histogram_lines(name: str, labels: Dict[str, str], histogram: dict) -> List[str]:
+    lines = []
+    for bound, cumulative in histogram["buckets"]:
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': str(bound)})} {cumulative}")
+    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram['count']}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return lines
+
+def _quantile_lines(name: str, labels: Dict[str, str], histogram: dict) -> List[str]:
+    return [
+        f"{name}{_format_labels({**labels, 'quantile': str(int(q[1:]) / 100)})} {histogram[q]}"
+        for q in ("p50", "p95", "p99")
+    ]
+
+def render_prometheus(snapshots: List[Tuple[Dict[str, str], dict]]) -> str:
+    """Render (labels, snapshot) pairs in the Prometheus text exposition format"""
+    metrics: Dict[str, Tuple[str, str, List[str]]] = {}
+    
+    def add(name: str, kind: str, help_text: str, lines: List[str]):
+        metrics.setdefault(name, (kind, help_text, []))[2].extend(lines)
+    
+    for base_labels, snapshot in snapshots:
+        add("mcp_stock_in_flight_requests", "gauge", "Tool calls currently being served",
+            [f"mcp_stock_in_flight_requests{_format_labels(base_labels)} {snapshot['in_flight']}"])
+        
+        for tool, stats in snapshot["tools"].items():
+            labels = {**base_labels, "tool": tool}
+            add("mcp_stock_tool_calls_total", "counter", "Tool calls served",
+                [f"mcp_stock_tool_calls_total{_format_labels(labels)} {stats['calls']}"])
+            add("mcp_stock_tool_errors_total", "counter", "Tool calls that returned an error",
+                [f"mcp_stock_tool_errors_total{_format_labels(labels)} {stats['errors']}"])
+            add("mcp_stock_tool_latency_seconds", "histogram", "Tool call latency",
+                _histogram_lines("mcp_stock_tool_latency_seconds", labels, stats["latency"]))
+            add("mcp_stock_tool_latency_recent_seconds", "gauge", "Tool call latency percentiles over recent calls",
+                _quantile_lines("mcp_stock_tool_latency_recent_seconds", labels, stats["latency"]))
+        
+        for source, stats in snapshot["sources"].items():
+            labels = {**base_labels, "source": source}
+            add("mcp_stock_source_requests_total", "counter", "Upstream fetches by outcome", [
+                f"mcp_stock_source_requests_total{_format_labels({**labels, 'outcome': 'success'})} {stats['success']}",
+                f"mcp_stock_source_requests_total{_format_labels({**labels, 'outcome': 'failure'})} {stats['failure']}"
+            ])
+            add("mcp_stock_source_latency_seconds", "histogram", "Upstream fetch latency",
+                _histogram_lines("mcp_stock_source_latency_seconds", labels, stats["latency"]))
+            add("mcp_stock_source_latency_recent_seconds", "gauge", "Upstream fetch latency percentiles over recent calls",
+                _quantile_lines("mcp_stock_source_latency_recent_seconds", labels, stats["latency"]))
+        
+        for source, stats in snapshot["rate_limiter"].items():
+            labels = {**base_labels, "source": source}
+            add("mcp_stock_source_throttled_total", "counter", "Upstream responses that signalled throttling",
+                [f"mcp_stock_source_throttled_total{_format_labels(labels)} {stats.get('throttled', 0)}"])
+            add("mcp_stock_rate_limit_waits_total", "counter", "Calls delayed by the rate limiter",
+                [f"mcp_stock_rate_limit_waits_total{_format_labels(labels)} {stats.get('waits', 0)}"])
+            add("mcp_stock_rate_limit_wait_seconds_total", "counter", "Time spent waiting on the rate limiter",
+                [f"mcp_stock_rate_limit_wait_seconds_total{_format_labels(labels)} {stats.get('wait_seconds_total', 0)}"])
+            for name, waits in stats.get("by_priority", {}).items():
+                priority_labels = _format_labels({**labels, "priority": name})
+                add("mcp_stock_rate_limit_queued", "gauge", "Calls waiting for a rate limit slot",
+                    [f"mcp_stock_rate_limit_queued{priority_labels} {waits['queued']}"])
+                add("mcp_stock_rate_limit_priority_wait_seconds_total", "counter",
+                    "Time spent waiting on the rate limiter by priority class",
+                    [f"mcp_stock_rate_limit_priority_wait_seconds_total{priority_labels} {waits['wait_seconds_total']}"])
+        
+        cache = snapshot["cache"]
+        if cache:
+            for key, name, kind, help_text in (
+                ("hits", "mcp_stock_cache_hits_total", "counter", "Cache lookups served from disk"),
+                ("misses", "mcp_stock_cache_misses_total", "counter", "Cache lookups that missed"),
+                ("bytes_read", "mcp_stock_cache_read_bytes_total", "counter", "Bytes read from the cache"),
+                ("bytes_written", "mcp_stock_cache_written_bytes_total", "counter", "Bytes written to the cache"),
+                ("total_bytes", "mcp_stock_cache_size_bytes", "gauge", "Size of the cache on disk"),
+            ):
+                add(name, kind, help_text, [f"{name}{_format_labels(base_labels)} {cache.get(key, 0)}"])
+            
+            budget = cache.get("budget", {})
+            for key, name, kind, help_text in (
+                ("max_bytes", "mcp_stock_cache_budget_bytes", "gauge", "Disk budget for the cache (0 is unlimited)"),
+                ("evictions", "mcp_stock_cache_evictions_total", "counter", "Cache partitions evicted to stay within budget"),
+                ("evicted_bytes", "mcp_stock_cache_evicted_bytes_total", "counter", "Bytes freed by eviction"),
+            ):
+                add(name, kind, help_text, [f"{name}{_format_labels(base_labels)} {budget.get(key, 0)}"])
+            add("mcp_stock_cache_compacted_bytes_total", "counter", "Bytes saved by background compaction",
+                [f"mcp_stock_cache_compacted_bytes_total{_format_labels(base_labels)} {cache.get('compacted_bytes_saved', 0)}"])
+    
+    output = []
+    for name, (kind, help_text, lines) in metrics.items():
+        output.append(f"# HELP {name} {help_text}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(lines)
+    
+    return "\n".join(output) + "\n"
+
+async def write_prometheus_file(path: str, render: Callable[[], Awaitable[str]], interval: float = 15.0):
+    """Periodically write metrics to a file for node_exporter's textfile collector"""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    
+    while True:
+        try:
+            text = await render()
+            # Write atomically so scrapers never see a partial file
+            tmp = target.with_suffix(target.suffix + ".tmp")
+            tmp.write_text(text)
+            tmp.replace(target)
+        except Exception as e:
+            logger.warning(f"Error writing metrics file: {str(e)}")
+        
+        await asyncio.sleep(interval)
+
+async def serve_prometheus(port: int, render: Callable[[], Awaitable[str]], host: str = "127.0.0.1"):
+    """Serve metrics over plain HTTP at /metrics"""
+    
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            # Drain headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            
+            parts = request_line.decode(errors="replace").split()
+            if len(parts) >= 2 and parts[1].split("?")[0] in ("/metrics", "/"):
+                body = (await render()).encode()
+                status = "200 OK"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+            
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.warning(f"Error serving metrics: {str(e)}")
+        finally:
+            writer.close()
+    
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+    return server
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Date x ticker panels of closes or returns aligned to a trading calendar.
+Per-ticker close series are joined on date, re-indexed to the chosen calendar
+with the requested fill rule and returned column by column.
+"""
+
+import base64
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PANEL_FIELDS = ("close", "returns", "log_returns")
+PANEL_FILLS = ("none", "ffill", "asof")
+PANEL_CALENDARS = ("union", "intersection", "business")
+PANEL_ENCODINGS = ("json", "base64")
+
+# Calendar days fetched before start so the first row has a prior close
+PRIOR_DAYS = 10
+
+def fetch_start(start_date: str) -> str:
+    """Start of the range to load so a close before start_date is available"""
+    return (pd.Timestamp(start_date) - pd.Timedelta(days=PRIOR_DAYS)).strftime('%Y-%m-%d')
+
+def series_window(series: pd.Series, start_date: str, end_date: str) -> pd.Series:
+    """Trim a date-indexed series to a range, keeping the last value before it"""
+    series = series[series.index <= end_date]
+    before = series[series.index < start_date]
+    inside = series[series.index >= start_date]
+    return pd.concat([before.iloc[-1:], inside]) if len(before) else inside
+
+def build_calendar(frame: pd.DataFrame, series: Dict[str, pd.Series], tickers: List[str],
+                   calendar: str, start_date: str, end_date: str) -> List[str]:
+    """Dates of the panel rows for a calendar rule or a calendar ticker"""
+    if calendar == "business":
+        return list(pd.bdate_range(start_date, end_date).strftime('%Y-%m-%d'))
+    
+    if calendar == "union":
+        dates = frame.index
+    elif calendar == "intersection":
+        # Tickers that failed to fetch have no days to intersect with
+        fetched = [ticker for ticker in tickers if len(series.get(ticker, ()))]
+        dates = frame[fetched].dropna().index if fetched else []
+    else:
+        # A ticker's own trading days, e.g. SPY for the exchange calendar
+        dates = series[calendar].index
+    
+    return [d for d in dates if start_date <= d <= end_date]
+
+def build_panel(series: Dict[str, pd.Series], tickers: List[str], start_date: str, end_date: str,
+                calendar: str = "union", fill: str = "ffill", field: str = "close",
+                fill_limit: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Align close series (indexed by YYYY-MM-DD) into a dates x tickers matrix.
+    
+    fill rules: none leaves gaps as NaN, ffill carries the last calendar row
+    forward, asof takes the latest close on or before each date even when that
+    date is not on the calendar. Returns use the row before the range, so the
+    first row has a return too.
+    """
+    series = {ticker: series_window(s, start_date, end_date) for ticker, s in series.items()}
+    frame = pd.DataFrame({ticker: series.get(ticker, pd.Series(dtype=float)) for ticker in set(tickers) | set(series)})
+    frame = frame.sort_index()
+    
+    dates = build_calendar(frame, series, tickers, calendar, start_date, end_date)
+    prior = [d for d in frame.index if d < start_date][-1:]
+    rows = prior + dates
+    
+    if fill == "none":
+        aligned = frame.reindex(rows)
+    elif fill == "ffill":
+        aligned = frame.reindex(rows).ffill(limit=fill_limit)
+    else:
+        aligned = frame.reindex(frame.index.union(rows)).ffill(limit=fill_limit).reindex(rows)
+    
+    values = aligned[tickers].to_numpy(dtype=float)
+    if field == "returns":
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.vstack([np.full((1, len(tickers)), np.nan), values[1:] / values[:-1] - 1.0])
+    elif field == "log_returns":
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.vstack([np.full((1, len(tickers)), np.nan), np.diff(np.log(values), axis=0)])
+    
+    return dates, values[len(prior):]
+
+def encode_columns(tickers: List[str], values: np.ndarray, encoding: str = "json") -> Dict[str, Any]:
+    """
+    Encode a matrix column by column.
+    json gives lists with null for missing values; base64 gives little-endian
+    float64 bytes per column with NaN for missing values.
+    """
+    if encoding == "base64":
+        return {
+            ticker: base64.b64encode(np.ascontiguousarray(values[:, i], dtype='<f8').tobytes()).decode('ascii')
+            for i, ticker in enumerate(tickers)
+        }
+    
+    rounded = np.round(values, 6)
+    return {
+        ticker: [None if np.isnan(v) else float(v) for v in rounded[:, i]]
+        for i, ticker in enumerate(tickers)
+    }
+
+def panel_response(series: Dict[str, pd.Series], tickers: List[str], arguments: Dict[str, Any],
+                   errors: Dict[str, str]) -> Dict[str, Any]:
+    """Build a get_panel result from per-ticker close series"""
+    calendar = calendar_ticker(arguments) or arguments.get("calendar", "union")
+    fill = arguments.get("fill", "ffill")
+    field = arguments.get("field", "close")
+    encoding = arguments.get("encoding", "json")
+    
+    dates, values = build_panel(
+        series, tickers, arguments["start"], arguments["end"],
+        calendar=calendar, fill=fill, field=field, fill_limit=arguments.get("fill_limit")
+    )
+    
+    result = {
+        "success": True,
+        "field": field,
+        "calendar": calendar,
+        "fill": fill,
+        "encoding": "base64-float64-le" if encoding == "base64" else "json",
+        "dates": dates,
+        "tickers": tickers,
+        "columns": encode_columns(tickers, values, encoding),
+        "missing": {ticker: int(np.isnan(values[:, i]).sum()) for i, ticker in enumerate(tickers)}
+    }
+    if errors:
+        result["errors"] = errors
+    return result
+
+def validate_panel_arguments(arguments: Dict[str, Any]) -> Optional[str]:
+    """Return an error message for invalid get_panel arguments"""
+    if not [t for t in arguments.get("tickers", []) if t]:
+        return "At least one ticker is required"
+    if not arguments.get("start") or not arguments.get("end"):
+        return "Start and end dates are required"
+    if arguments.get("field", "close") not in PANEL_FIELDS:
+        return f"Unsupported field: {arguments.get('field')}"
+    if arguments.get("fill", "ffill") not in PANEL_FILLS:
+        return f"Unsupported fill: {arguments.get('fill')}"
+    if arguments.get("encoding", "json") not in PANEL_ENCODINGS:
+        return f"Unsupported encoding: {arguments.get('encoding')}"
+    
+    # Anything else is a calendar ticker, which like any ticker only has to be given
+    if not arguments.get("calendar", "union"):
+        return f"Unsupported calendar: {arguments.get('calendar')}"
+    return None
+
+def calendar_ticker(arguments: Dict[str, Any]) -> Optional[str]:
+    """The ticker whose trading days form the calendar, if one was given"""
+    calendar = arguments.get("calendar", "union")
+    return None if calendar in PANEL_CALENDARS else calendar.upper()
\ No newline at end of file
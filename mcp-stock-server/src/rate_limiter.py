@@ -1,64 +1,182 @@
 """
 Rate limiter to prevent API abuse and respect rate limits.
+Calls are scheduled by priority class: interactive (dashboard price lookups),
+pipeline (batch and analytics calls) and background (backfills). Each class may
+only fill part of a source's per-minute budget, so lower classes always leave
+headroom for higher ones, and queued calls are released highest class first.
+A background call waiting longer than AGING_SECONDS is queued alongside pipeline
+calls so it can't be starved indefinitely, but still only within the background
+share, and nothing is ever queued ahead of interactive calls.
 """
 
 import asyncio
+import itertools
 import time
-from typing import Dict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Highest first
+PRIORITIES = ("interactive", "pipeline", "background")
+
+# Fraction of each source's per-minute budget a class may fill
+BUDGET_SHARES = {"interactive": 1.0, "pipeline": 0.9, "background": 0.7}
+
+# A waiting call moves up one class after this long, but no higher than AGING_CEILING
+AGING_SECONDS = 30.0
+AGING_CEILING = "pipeline"
+
+# Priority of upstream calls made from the current task; tasks inherit it from their creator
+current_priority: ContextVar[str] = ContextVar("upstream_priority", default="pipeline")
+
+@contextmanager
+def priority_class(name: str):
+    """Run upstream calls made inside the block at the given priority class"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name}")
+    token = current_priority.set(name)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
 class RateLimiter:
     """Rate limiter for API calls to different data sources"""
     
-    def __init__(self):
+    def __init__(self, share: float = 1.0):
+        """
+        share is the fraction of each source's limit this process may use;
+        shard workers each get 1/N so together they stay within the limits
+        """
         # Rate limits per source (calls per minute)
-        self.limits = {
+        limits = {
             'stooq': 60,         # Conservative limit
             'alphavantage': 5,   # Free tier limit
             'yahoo': 30          # Conservative limit
         }
+        self.limits = {source: limit * share for source, limit in limits.items()}
         
         # Track last call times
         self.last_calls: Dict[str, float] = {}
         
         # Track call counts per minute
         self.call_counts: Dict[str, list] = {}
+        
+        # Calls waiting for a slot, and the condition they wait on, per source
+        self.queues: Dict[str, List[dict]] = {}
+        self.conditions: Dict[str, asyncio.Condition] = {}
+        self.sequence = itertools.count()
+        
+        # Track time spent waiting and upstream throttling signals
+        self.waits: Dict[str, int] = {}
+        self.wait_seconds: Dict[str, float] = {}
+        self.throttled: Dict[str, int] = {}
+        
+        # Waits per (source, priority class)
+        self.priority_waits: Dict[tuple, int] = {}
+        self.priority_wait_seconds: Dict[tuple, float] = {}
     
-    async def wait_if_needed(self, source: str):
-        """Wait if necessary to respect rate limits"""
-        current_time = time.time()
+    def window(self, source: str) -> float:
+        """
+        Seconds over which calls are counted: a minute, or long enough for one
+        call when the limit is under one a minute
+        """
+        return 60.0 / min(1.0, self.limits.get(source, 60))
+    
+    def prune(self, source: str, now: float):
+        """Drop calls that have left the window"""
+        window_start = now - self.window(source)
+        self.call_counts[source] = [t for t in self.call_counts[source] if t > window_start]
+    
+    @staticmethod
+    def effective_level(waiter: dict, now: float) -> int:
+        """Queue position level after aging (0 is highest); aging never reaches above AGING_CEILING"""
+        ceiling = min(waiter["level"], PRIORITIES.index(AGING_CEILING))
+        return max(ceiling, waiter["level"] - int((now - waiter["since"]) // AGING_SECONDS))
+    
+    def capacity(self, source: str, level: int) -> int:
+        """Calls per window the class at this level may use; at least one"""
+        limit = max(1.0, self.limits.get(source, 60))
+        return max(1, int(limit * BUDGET_SHARES[PRIORITIES[level]]))
+    
+    def can_proceed(self, source: str, waiter: dict, now: float) -> bool:
+        """
+        True if the waiter is first in line among the waiters whose own class
+        still has budget left. Aging only moves a call up the line; its share of
+        the budget stays that of the class it was made at.
+        """
+        used = len(self.call_counts[source])
+        ready = [w for w in self.queues[source] if used < self.capacity(source, w["level"])]
+        return bool(ready) and min(ready, key=lambda w: (self.effective_level(w, now), w["seq"])) is waiter
+    
+    def next_change(self, source: str, waiter: dict, now: float) -> float:
+        """Seconds until a slot frees up or the waiter is promoted"""
+        calls = self.call_counts[source]
+        until_slot = (min(calls) + self.window(source) - now) if calls else AGING_SECONDS
+        until_promotion = AGING_SECONDS - (now - waiter["since"]) % AGING_SECONDS
+        return max(0.01, min(until_slot, until_promotion))
+    
+    async def wait_if_needed(self, source: str, priority: Optional[str] = None):
+        """Wait for a slot in the source's budget, behind any higher-priority calls"""
+        level = PRIORITIES.index(priority or current_priority.get())
+        started = time.time()
         
         # Initialize if first call for this source
         if source not in self.call_counts:
             self.call_counts[source] = []
+            self.queues[source] = []
+            self.conditions[source] = asyncio.Condition()
         
-        # Clean old calls (older than 1 minute)
-        minute_ago = current_time - 60
-        self.call_counts[source] = [
-            call_time for call_time in self.call_counts[source] 
-            if call_time > minute_ago
-        ]
-        
-        # Check if we've hit the limit
-        limit = self.limits.get(source, 60)
+        waiter = {"level": level, "since": started, "seq": next(self.sequence)}
+        queue = self.queues[source]
+        condition = self.conditions[source]
+        waited = False
         
-        if len(self.call_counts[source]) >= limit:
-            # We've hit the limit, wait until the oldest call is > 1 minute old
-            oldest_call = min(self.call_counts[source])
-            wait_time = 60 - (current_time - oldest_call)
+        async with condition:
+            queue.append(waiter)
+            try:
+                while True:
+                    current_time = time.time()
+                    self.prune(source, current_time)
+                    if self.can_proceed(source, waiter, current_time):
+                        break
+                    
+                    if not waited:
+                        logger.info(f"Rate limit reached for {source}, queueing {PRIORITIES[level]} call")
+                        waited = True
+                    # asyncio.timeout rather than wait_for, which can swallow a cancellation
+                    # (e.g. of a backfill) that arrives just as the condition is notified
+                    try:
+                        async with asyncio.timeout(self.next_change(source, waiter, current_time)):
+                            await condition.wait()
+                    except TimeoutError:
+                        pass
+            finally:
+                queue.remove(waiter)
+                # The next waiter in line may now be able to go
+                condition.notify_all()
             
-            if wait_time > 0:
-                logger.info(f"Rate limit reached for {source}, waiting {wait_time:.1f} seconds")
-                await asyncio.sleep(wait_time)
-                current_time = time.time()
+            # Record this call
+            self.call_counts[source].append(current_time)
+            self.last_calls[source] = current_time
         
-        # Record this call
-        self.call_counts[source].append(current_time)
-        self.last_calls[source] = current_time
+        if waited:
+            wait_time = current_time - started
+            key = (source, PRIORITIES[level])
+            self.waits[source] = self.waits.get(source, 0) + 1
+            self.wait_seconds[source] = self.wait_seconds.get(source, 0.0) + wait_time
+            self.priority_waits[key] = self.priority_waits.get(key, 0) + 1
+            self.priority_wait_seconds[key] = self.priority_wait_seconds.get(key, 0.0) + wait_time
         
-        logger.debug(f"API call to {source} (count: {len(self.call_counts[source])}/{limit})")
+        logger.debug(f"API call to {source} (count: {len(self.call_counts[source])}/{self.limits.get(source, 60)})")
+    
+    def record_throttle(self, source: str):
+        """Record that a source rejected a call because of its own rate limit"""
+        self.throttled[source] = self.throttled.get(source, 0) + 1
+        logger.warning(f"{source} signalled throttling")
     
     def get_stats(self) -> dict:
         """Get statistics about API usage"""
@@ -69,12 +187,24 @@ class RateLimiter:
         for source in self.limits:
             calls = self.call_counts.get(source, [])
             recent_calls = [c for c in calls if c > minute_ago]
+            queue = self.queues.get(source, [])
             
             stats[source] = {
                 "limit_per_minute": self.limits[source],
                 "calls_last_minute": len(recent_calls),
                 "last_call": self.last_calls.get(source, 0),
-                "seconds_since_last_call": current_time - self.last_calls.get(source, 0)
+                "seconds_since_last_call": current_time - self.last_calls.get(source, 0),
+                "throttled": self.throttled.get(source, 0),
+                "waits": self.waits.get(source, 0),
+                "wait_seconds_total": round(self.wait_seconds.get(source, 0.0), 3),
+                "by_priority": {
+                    name: {
+                        "queued": sum(1 for w in queue if w["level"] == level),
+                        "waits": self.priority_waits.get((source, name), 0),
+                        "wait_seconds_total": round(self.priority_wait_seconds.get((source, name), 0.0), 3)
+                    }
+                    for level, name in enumerate(PRIORITIES)
+                }
             }
         
         return stats
\ No newline at end of file
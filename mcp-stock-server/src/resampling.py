@@ -0,0 +1,175 @@
+"""
+OHLCV resampling with a memo of aggregated bars per (ticker, frequency).
+Aggregates are kept over a ticker's whole cached history. When bars are
+appended or rewritten, only the buckets from the first changed bar onward are
+recomputed.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import DateOffset, Tick
+
+logger = logging.getLogger(__name__)
+
+# Friendly names accepted in place of pandas offset aliases
+FREQUENCY_ALIASES = {
+    "hourly": "1h",
+    "daily": "D",
+    "weekly": "W-FRI",
+    "monthly": "ME",
+    "quarterly": "QE",
+    "yearly": "YE"
+}
+
+AGGREGATIONS = {
+    'start': 'first',
+    'end': 'last',
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'bars': 'sum'
+}
+
+RESAMPLED_COLUMNS = list(AGGREGATIONS)
+
+def parse_frequency(frequency: str) -> DateOffset:
+    """
+    Turn a frequency name or pandas alias (e.g. weekly, ME, 4h) into an offset.
+    Calendar frequencies must be single periods so buckets don't depend on where
+    the data starts; intraday frequencies can be any multiple.
+    """
+    try:
+        offset = to_offset(FREQUENCY_ALIASES.get(frequency.lower(), frequency))
+    except (ValueError, TypeError):
+        raise ValueError(f"Unsupported frequency: {frequency}")
+    
+    if not isinstance(offset, Tick) and offset.n != 1:
+        raise ValueError(f"Multiples are only supported for intraday frequencies: {frequency}")
+    return offset
+
+def resample_ohlcv(bars: pd.DataFrame, time_col: str, offset: DateOffset) -> pd.DataFrame:
+    """Aggregate bars into OHLCV buckets: first/max/min/last/sum"""
+    if bars is None or bars.empty:
+        return pd.DataFrame(columns=RESAMPLED_COLUMNS)
+    
+    if time_col == 'timestamp':
+        index = pd.to_datetime(bars[time_col].to_numpy(), unit='s', utc=True)
+    else:
+        index = pd.to_datetime(bars[time_col].to_numpy())
+    
+    frame = pd.DataFrame({
+        'start': bars[time_col].to_numpy(),
+        'end': bars[time_col].to_numpy(),
+        'open': bars['open'].to_numpy(dtype=float),
+        'high': bars['high'].to_numpy(dtype=float),
+        'low': bars['low'].to_numpy(dtype=float),
+        'close': bars['close'].to_numpy(dtype=float),
+        'volume': bars['volume'].to_numpy(dtype=float),
+        'bars': 1
+    }, index=index)
+    
+    # A fixed origin keeps intraday buckets aligned however the input is sliced
+    options = {'origin': 'epoch'} if isinstance(offset, Tick) else {}
+    aggregated = frame.resample(offset, **options).agg(AGGREGATIONS)
+    
+    # Buckets with no bars (weekends, holidays, overnight) are dropped
+    aggregated = aggregated[aggregated['bars'] > 0]
+    return aggregated.reset_index(drop=True)
+
+class ResampleMemo:
+    """LRU memo of aggregated bars keyed by (ticker, interval, adjusted, frequency)"""
+    
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        
+        # Counters for the metrics surface
+        self.hits = 0
+        self.partial = 0
+        self.full = 0
+    
+    def invalidate(self, ticker: str, interval: str, since: Any = None, adjusted: Optional[bool] = None):
+        """
+        Mark memoized aggregates stale from the bar time `since` onward.
+        since=None drops them entirely; adjusted limits it to one price mode.
+        """
+        for key in list(self.entries):
+            if key[0] != ticker.upper() or key[1] != interval:
+                continue
+            if adjusted is not None and key[2] != adjusted:
+                continue
+            
+            if since is None:
+                del self.entries[key]
+            else:
+                entry = self.entries[key]
+                entry['dirty_from'] = since if entry['dirty_from'] is None else min(entry['dirty_from'], since)
+    
+    def get(self, ticker: str, interval: str, adjusted: bool, frequency: str,
+            bars: pd.DataFrame, time_col: str, offset: DateOffset) -> pd.DataFrame:
+        """Aggregated bars for the full history, recomputing only stale buckets"""
+        key = (ticker.upper(), interval, adjusted, frequency)
+        entry = self.entries.get(key)
+        last = bars[time_col].iloc[-1] if not bars.empty else None
+        
+        if entry is None:
+            aggregated = resample_ohlcv(bars, time_col, offset)
+            self.full += 1
+        else:
+            self.entries.move_to_end(key)
+            dirty_from = entry['dirty_from']
+            through = entry['through']
+            
+            if last is not None and through is not None and last > through:
+                # Bars appended after the last memoized one
+                appended = bars.loc[bars[time_col] > through, time_col].iloc[0]
+                dirty_from = appended if dirty_from is None else min(dirty_from, appended)
+            elif last != through:
+                # History shrank or was replaced; start over
+                dirty_from = bars[time_col].iloc[0] if last is not None else None
+                entry['aggregated'] = entry['aggregated'].iloc[0:0]
+            
+            if dirty_from is None:
+                self.hits += 1
+                return entry['aggregated']
+            
+            aggregated = self.recompute_tail(entry['aggregated'], bars, time_col, offset, dirty_from)
+            self.partial += 1
+        
+        self.entries[key] = {'aggregated': aggregated, 'through': last, 'dirty_from': None}
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        
+        return aggregated
+    
+    def recompute_tail(self, aggregated: pd.DataFrame, bars: pd.DataFrame, time_col: str,
+                       offset: DateOffset, dirty_from: Any) -> pd.DataFrame:
+        """Keep the buckets before dirty_from and re-aggregate everything after"""
+        kept = aggregated[aggregated['end'] < dirty_from]
+        
+        # The last kept bucket may still gain bars, so it is rebuilt as well
+        if not kept.empty:
+            restart = kept['start'].iloc[-1]
+            kept = kept.iloc[:-1]
+        else:
+            restart = bars[time_col].iloc[0] if not bars.empty else dirty_from
+        
+        tail = resample_ohlcv(bars[bars[time_col] >= restart], time_col, offset)
+        if kept.empty:
+            return tail
+        return pd.concat([kept, tail], ignore_index=True)
+    
+    def get_stats(self) -> dict:
+        """Get memo statistics"""
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "partial_recomputes": self.partial,
+            "full_computes": self.full
+        }
\ No newline at end of file
@@ -4,12 +4,15 @@ MCP Stock Prices Server
 Provides stock price data from multiple free sources with fallback logic.
 """
 
+import argparse
 import asyncio
 import json
 import logging
 import os
 import sys
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 import traceback
@@ -18,9 +21,10 @@ import traceback
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.data_sources import StooqAdapter, AlphaVantageAdapter, YahooFinanceAdapter
-from src.cache_manager import CacheManager
-from src.rate_limiter import RateLimiter
+# Data sources and the cache pull in pandas/aiohttp, so they are imported on first use
+from src.rate_limiter import RateLimiter, priority_class
+from src.backfill import BackfillJobs, validate_backfill_arguments
+from src.metrics import MetricsRegistry, render_prometheus, serve_prometheus, write_prometheus_file
 
 # Configure logging
 logging.basicConfig(
@@ -29,20 +33,284 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Tool definitions returned by tools/list
+TOOLS = [
+    {
+        "name": "get_prices",
+        "description": "Fetch historical stock price data",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "ticker": {"type": "string"},
+                "start": {"type": "string"},
+                "end": {"type": "string"},
+                "adjusted": {"type": "boolean", "default": True},
+                "interval": {"type": "string", "enum": ["1d", "1h", "5m", "1m"], "default": "1d"}
+            },
+            "required": ["ticker", "start", "end"]
+        }
+    },
+    {
+        "name": "get_prices_batch",
+        "description": "Fetch historical stock price data for several tickers at once",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tickers": {"type": "array", "items": {"type": "string"}},
+                "start": {"type": "string"},
+                "end": {"type": "string"},
+                "adjusted": {"type": "boolean", "default": True},
+                "interval": {"type": "string", "enum": ["1d", "1h", "5m", "1m"], "default": "1d"}
+            },
+            "required": ["tickers", "start", "end"]
+        }
+    },
+    {
+        "name": "get_resampled_prices",
+        "description": "Fetch stock prices aggregated to weekly, monthly or custom OHLCV bars",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "ticker": {"type": "string"},
+                "start": {"type": "string"},
+                "end": {"type": "string"},
+                "frequency": {"type": "string"},
+                "interval": {"type": "string", "enum": ["1d", "1h", "5m", "1m"], "default": "1d"},
+                "adjusted": {"type": "boolean", "default": True}
+            },
+            "required": ["ticker", "start", "end", "frequency"]
+        }
+    },
+    {
+        "name": "get_indicators",
+        "description": "Compute technical indicators (SMA, EMA, RSI, ATR, Bollinger Bands) for several tickers",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tickers": {"type": "array", "items": {"type": "string"}},
+                "indicators": {"type": "array", "items": {"type": "string"}},
+                "adjusted": {"type": "boolean", "default": True},
+                "lookback_days": {"type": "integer", "default": 400},
+                "series_start": {"type": "string"}
+            },
+            "required": ["tickers"]
+        }
+    },
+    {
+        "name": "get_panel",
+        "description": "Get a date x ticker matrix of closes or returns aligned to a trading calendar",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tickers": {"type": "array", "items": {"type": "string"}},
+                "start": {"type": "string"},
+                "end": {"type": "string"},
+                "field": {"type": "string", "enum": ["close", "returns", "log_returns"], "default": "close"},
+                "calendar": {"type": "string", "default": "union"},
+                "fill": {"type": "string", "enum": ["none", "ffill", "asof"], "default": "ffill"},
+                "fill_limit": {"type": "integer"},
+                "adjusted": {"type": "boolean", "default": True},
+                "encoding": {"type": "string", "enum": ["json", "base64"], "default": "json"}
+            },
+            "required": ["tickers", "start", "end"]
+        }
+    },
+    {
+        "name": "get_covariance",
+        "description": "Get correlation and covariance matrices of daily returns for several tickers",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tickers": {"type": "array", "items": {"type": "string"}},
+                "method": {"type": "string", "enum": ["rolling", "ewm"], "default": "rolling"},
+                "window": {"type": "integer", "default": 60},
+                "halflife": {"type": "number", "default": 30},
+                "min_periods": {"type": "integer", "default": 20},
+                "output": {"type": "string", "enum": ["correlation", "covariance", "both"], "default": "correlation"},
+                "adjusted": {"type": "boolean", "default": True},
+                "lookback_days": {"type": "integer", "default": 400}
+            },
+            "required": ["tickers"]
+        }
+    },
+    {
+        "name": "get_current_price",
+        "description": "Get current price for a stock ticker",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "ticker": {"type": "string"}
+            },
+            "required": ["ticker"]
+        }
+    },
+    {
+        "name": "start_backfill",
+        "description": "Start a resumable background job that loads daily history for many tickers into the cache",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tickers": {"type": "array", "items": {"type": "string"}},
+                "start": {"type": "string"},
+                "end": {"type": "string"}
+            },
+            "required": ["tickers", "start"]
+        }
+    },
+    {
+        "name": "get_job_status",
+        "description": "Get progress, ETA and failures of a backfill job, or of all jobs",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string"}
+            }
+        }
+    },
+    {
+        "name": "cancel_job",
+        "description": "Cancel a queued or running backfill job",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string"}
+            },
+            "required": ["job_id"]
+        }
+    },
+    {
+        "name": "get_server_stats",
+        "description": "Get server metrics: tool latency, cache and data source statistics",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "format": {"type": "string", "enum": ["json", "prometheus"], "default": "json"}
+            }
+        }
+    }
+]
+
+# Bar intervals accepted by get_prices; everything but 1d goes to the intraday store
+PRICE_INTERVALS = ("1d", "1h", "5m", "1m")
+
+# Tools that can be answered without loading the data stack
+LIGHTWEIGHT_TOOLS = {"get_server_stats", "start_backfill", "get_job_status", "cancel_job"}
+
+# Rate limiter priority class of each tool's upstream calls; others run as "pipeline"
+TOOL_PRIORITIES = {"get_current_price": "interactive"}
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "data" / "prices"
+
 class StockPricesServer:
-    def __init__(self):
-        self.cache_manager = CacheManager()
-        self.rate_limiter = RateLimiter()
+    def __init__(self, cache_dir: Optional[str] = None, cache_max_mb: float = 0, pinned: Optional[List[str]] = None,
+                 rate_share: float = 1.0):
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = int(cache_max_mb * 1024 * 1024)
+        self.pinned = pinned or []
+        self.rate_limiter = RateLimiter(rate_share)
+        self.metrics = MetricsRegistry()
+        
+        # Cache and adapters are created by load() on first use
+        self._cache_manager = None
+        self._data_sources = None
+        self._load_lock = threading.Lock()
         
-        # Initialize data sources in fallback order
-        self.data_sources = [
-            StooqAdapter(self.rate_limiter),
-            AlphaVantageAdapter(self.rate_limiter),
-            YahooFinanceAdapter(self.rate_limiter)
-        ]
+        # Backfill jobs run in the background at the lowest rate limiter priority
+        self.notify = None
+        self.backfills = BackfillJobs(
+            Path(cache_dir or DEFAULT_CACHE_DIR) / "jobs",
+            self.backfill_unit,
+            prepare=self.ensure_loaded,
+            notify=self.send_notification
+        )
         
         logger.info("Stock Prices MCP Server initialized")
 
+    def load(self):
+        """Import the data stack and create the cache manager and data sources"""
+        with self._load_lock:
+            if self._data_sources is not None:
+                return
+            
+            started = time.perf_counter()
+            from src.data_sources import StooqAdapter, AlphaVantageAdapter, YahooFinanceAdapter
+            from src.cache_manager import CacheManager
+            
+            self._cache_manager = CacheManager(self.cache_dir, self.cache_max_bytes, self.pinned)
+            
+            # Initialize data sources in fallback order
+            self._data_sources = [
+                StooqAdapter(self.rate_limiter),
+                AlphaVantageAdapter(self.rate_limiter),
+                YahooFinanceAdapter(self.rate_limiter)
+            ]
+            
+            logger.info(f"Data sources loaded in {time.perf_counter() - started:.2f}s")
+
+    async def ensure_loaded(self):
+        """Load the data stack in a worker thread so the event loop keeps serving"""
+        if self._data_sources is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+
+    def send_notification(self, message: Dict[str, Any]):
+        """Send a notification to the client, if this process talks to one"""
+        if self.notify is not None:
+            self.notify(message)
+
+    def resume_backfills(self):
+        """Restart backfill jobs left queued or running by a previous process"""
+        self.backfills.load()
+        self.backfills.start()
+
+    async def maintain_cache(self, interval: float):
+        """Periodically enforce the disk budget and compact the cache once it is loaded"""
+        while True:
+            await asyncio.sleep(interval)
+            if self._cache_manager is None:
+                continue
+            try:
+                await self._cache_manager.run_maintenance()
+            except Exception as e:
+                logger.error(f"Cache maintenance failed: {str(e)}")
+
+    @property
+    def cache_manager(self):
+        if self._cache_manager is None:
+            self.load()
+        return self._cache_manager
+
+    @property
+    def data_sources(self):
+        if self._data_sources is None:
+            self.load()
+        return self._data_sources
+
+    async def fetch_from_source(self, source, ticker: str, start_date: str, end_date: str, adjusted: bool):
+        """Fetch data from one source, recording its outcome and latency"""
+        start = time.perf_counter()
+        data = None
+        try:
+            data = await source.fetch_data(ticker, start_date, end_date, adjusted)
+            return data
+        finally:
+            # An empty frame is an answer without bars, not a failure
+            success = data is not None
+            self.metrics.record_source(source.name, success, time.perf_counter() - start)
+
+    def prices_response(self, ticker: str, data, cached: bool) -> Dict[str, Any]:
+        """Build a get_prices result from a standardized frame"""
+        # Convert to JSON format
+        records = data.to_dict('records')
+        
+        return {
+            "success": True,
+            "ticker": ticker,
+            "source": data.iloc[0]['source'] if len(data) > 0 else None,
+            "cached": cached,
+            "records_count": len(records),
+            "data": records
+        }
+
     async def handle_get_prices(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get_prices tool call"""
         try:
@@ -50,6 +318,7 @@ class StockPricesServer:
             start_date = arguments.get("start")
             end_date = arguments.get("end")
             adjusted = arguments.get("adjusted", True)
+            interval = arguments.get("interval", "1d")
             
             if not ticker:
                 return {"error": "Ticker symbol is required"}
@@ -57,39 +326,153 @@ class StockPricesServer:
             if not start_date or not end_date:
                 return {"error": "Start and end dates are required"}
             
-            logger.info(f"Fetching prices for {ticker} from {start_date} to {end_date}")
+            if interval not in PRICE_INTERVALS:
+                return {"error": f"Unsupported interval: {interval}"}
             
-            # Try each data source in order
-            for i, source in enumerate(self.data_sources):
-                try:
-                    data = await source.fetch_data(ticker, start_date, end_date, adjusted)
-                    if data is not None and not data.empty:
-                        # Cache the results
-                        await self.cache_manager.save_data(ticker, data)
-                        
-                        # Convert to JSON format
-                        records = data.to_dict('records')
-                        
-                        return {
-                            "success": True,
-                            "ticker": ticker,
-                            "source": data.iloc[0]['source'] if len(data) > 0 else source.__class__.__name__,
-                            "records_count": len(records),
-                            "data": records
-                        }
-                except Exception as e:
-                    logger.warning(f"Source {source.__class__.__name__} failed: {str(e)}")
-                    if i == len(self.data_sources) - 1:  # Last source
-                        raise
-                    continue
+            if interval != "1d":
+                return await self.get_intraday_prices(ticker, start_date, end_date, interval)
             
-            return {"error": "All data sources failed"}
+            loaded = await self.load_daily(ticker, start_date, end_date)
+            if loaded is None:
+                return {"error": "All data sources failed"}
+            
+            # Adjusted and raw views are both derived from the cached raw bars
+            bars, actions, cached = loaded
+            view = self.cache_manager.build_view(ticker, bars, actions, start_date, end_date, adjusted)
+            result = self.prices_response(ticker, view, cached=cached)
+            
+            if not adjusted:
+                from src.adjustments import already_adjusted
+                # Stooq bars can't be un-adjusted; say how many of the "raw" bars are
+                result["already_adjusted_rows"] = int(already_adjusted(view).sum())
+            return result
             
         except Exception as e:
             logger.error(f"Error in get_prices: {str(e)}")
             logger.error(traceback.format_exc())
             return {"error": f"Internal server error: {str(e)}"}
 
+    async def load_daily(self, ticker: str, start_date: str, end_date: str, allow_stale: bool = True):
+        """
+        Get a ticker's full raw bars and actions covering a range, fetching on a miss.
+        Returns (bars, actions, cached) or None if every source failed. With
+        allow_stale=False it is also None when any missing range couldn't be
+        fetched, rather than falling back to the bars already cached.
+        """
+        gaps = self.cache_manager.missing_ranges(ticker, start_date, end_date)
+        if not gaps:
+            cached = await self.cache_manager.get_cached_bars(ticker, start_date, end_date)
+            if cached is not None:
+                logger.info(f"Cache hit for {ticker}")
+                return cached[0], cached[1], True
+            gaps = [(start_date, min(end_date, datetime.now().strftime("%Y-%m-%d")))]
+        else:
+            # Counted as a miss even when only part of the range is fetched
+            self.cache_manager.misses += 1
+        
+        saved = None
+        failed = 0
+        pending = list(gaps)
+        restatements = self.cache_manager.restatements
+        while pending:
+            gap_start, gap_end = pending.pop(0)
+            logger.info(f"Fetching prices for {ticker} from {gap_start} to {gap_end}")
+            data = await self.fetch_daily(ticker, gap_start, gap_end)
+            if data is not None and not data.empty:
+                saved = await self.cache_manager.save_data(ticker, data, (gap_start, gap_end))
+            elif data is not None:
+                # Only a source answering without bars makes a gap empty; a failed fetch is retried
+                self.cache_manager.mark_empty_gap(ticker, gap_start, gap_end)
+            else:
+                failed += 1
+            
+            # A restated history dropped the older bars; refetch the rest of the range once
+            if restatements is not None and self.cache_manager.restatements != restatements:
+                restatements = None
+                pending = self.cache_manager.missing_ranges(ticker, start_date, end_date)
+        
+        if failed and not allow_stale:
+            logger.warning(f"Could not fetch {failed} missing ranges for {ticker}")
+            return None
+        
+        if saved is not None:
+            return saved[0], saved[1], False
+        
+        # Nothing new could be fetched; serve whatever is cached for the range
+        stale = self.cache_manager.read_bars(ticker)
+        if stale is not None and not stale[0].empty:
+            logger.warning(f"Serving cached bars for {ticker} without {len(gaps)} missing ranges")
+            return stale[0], stale[1], True
+        return None
+
+    async def fetch_daily(self, ticker: str, start_date: str, end_date: str):
+        """
+        Fetch raw bars plus corporate actions for a range, trying each source in order.
+        Returns an empty frame if sources answered but none had bars, None if every source failed.
+        """
+        answered = None
+        for i, source in enumerate(self.data_sources):
+            try:
+                data = await self.fetch_from_source(source, ticker, start_date, end_date, False)
+                if data is not None and not data.empty:
+                    return data
+                if data is not None:
+                    answered = data
+            except Exception as e:
+                logger.warning(f"Source {source.__class__.__name__} failed: {str(e)}")
+                if i == len(self.data_sources) - 1 and answered is None:  # Last source
+                    raise
+                continue
+        
+        return answered
+
+    async def load_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> List[str]:
+        """Fetch the days of a range missing from the intraday store; returns the days that were pending"""
+        pending = self.cache_manager.intraday.pending_days(ticker, interval, start_date, end_date)
+        
+        if pending:
+            logger.info(f"Fetching {interval} bars for {ticker} for {len(pending)} days")
+            
+            # Sources without intraday data are skipped rather than counted as failures
+            for source in [s for s in self.data_sources if s.supports_intraday]:
+                fetch_start = time.perf_counter()
+                data = None
+                try:
+                    data = await source.fetch_intraday(ticker, pending[0], pending[-1], interval)
+                except Exception as e:
+                    logger.warning(f"Source {source.__class__.__name__} failed: {str(e)}")
+                finally:
+                    success = data is not None and not data.empty
+                    self.metrics.record_source(source.name, success, time.perf_counter() - fetch_start)
+                
+                if data is not None and not data.empty:
+                    self.cache_manager.save_intraday(ticker, interval, data, pending)
+                    break
+        
+        return pending
+
+    async def get_intraday_prices(self, ticker: str, start_date: str, end_date: str, interval: str) -> Dict[str, Any]:
+        """Serve intraday bars from the store, fetching only the days it is missing"""
+        from src.intraday_store import to_records
+        
+        pending = await self.load_intraday(ticker, start_date, end_date, interval)
+        
+        bars = self.cache_manager.load_intraday(ticker, interval, start_date, end_date)
+        if bars.empty and pending:
+            return {"error": "All data sources failed"}
+        
+        records = to_records(bars)
+        
+        return {
+            "success": True,
+            "ticker": ticker,
+            "interval": interval,
+            "source": records[0]['source'] if records else None,
+            "cached": not pending,
+            "records_count": len(records),
+            "data": records
+        }
+
     async def handle_get_current_price(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get_current_price tool call"""
         try:
@@ -107,7 +490,7 @@ class StockPricesServer:
             # Try each data source in order
             for source in self.data_sources:
                 try:
-                    data = await source.fetch_data(ticker, start_date, end_date, True)
+                    data = await self.fetch_from_source(source, ticker, start_date, end_date, True)
                     if data is not None and not data.empty:
                         # Get the most recent record
                         latest = data.iloc[-1]
@@ -131,13 +514,500 @@ class StockPricesServer:
             logger.error(f"Error in get_current_price: {str(e)}")
             return {"error": f"Internal server error: {str(e)}"}
 
+    async def handle_get_prices_batch(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_prices_batch tool call"""
+        tickers = [t.upper() for t in arguments.get("tickers", []) if t]
+        
+        if not tickers:
+            return {"error": "At least one ticker is required"}
+        
+        # Fetch all tickers concurrently; the rate limiter paces each source
+        results = await asyncio.gather(*[
+            self.handle_get_prices({**arguments, "ticker": ticker})
+            for ticker in tickers
+        ])
+        
+        return {
+            "success": True,
+            "tickers_count": len(tickers),
+            "results": dict(zip(tickers, results))
+        }
+
+    async def handle_get_resampled_prices(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_resampled_prices tool call"""
+        from src.adjustments import add_changes, apply_adjustments
+        from src.resampling import parse_frequency
+        
+        try:
+            ticker = arguments.get("ticker", "").upper()
+            start_date = arguments.get("start")
+            end_date = arguments.get("end")
+            frequency = arguments.get("frequency", "")
+            interval = arguments.get("interval", "1d")
+            adjusted = arguments.get("adjusted", True)
+            
+            if not ticker:
+                return {"error": "Ticker symbol is required"}
+            
+            if not start_date or not end_date:
+                return {"error": "Start and end dates are required"}
+            
+            if interval not in PRICE_INTERVALS:
+                return {"error": f"Unsupported interval: {interval}"}
+            
+            try:
+                offset = parse_frequency(frequency)
+            except ValueError as e:
+                return {"error": str(e)}
+            
+            # Aggregates cover the whole cached history and are sliced afterwards
+            if interval == "1d":
+                loaded = await self.load_daily(ticker, start_date, end_date)
+                if loaded is None:
+                    return {"error": "All data sources failed"}
+                bars, actions, cached = loaded
+                series = apply_adjustments(bars, actions) if adjusted else bars.sort_values('date').reset_index(drop=True)
+                time_col, lower, upper = 'date', start_date, end_date
+            else:
+                # Intraday bars are as traded, so there is only one price mode
+                adjusted = False
+                pending = await self.load_intraday(ticker, start_date, end_date, interval)
+                cached = not pending
+                series = self.cache_manager.load_intraday(ticker, interval, "0000-00-00", "9999-99-99")
+                if series.empty:
+                    return {"error": "All data sources failed"}
+                time_col = 'timestamp'
+                lower = int(datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+                upper = int((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).replace(tzinfo=timezone.utc).timestamp()) - 1
+            
+            aggregated = self.cache_manager.resampled.get(ticker, interval, adjusted, offset.freqstr, series, time_col, offset)
+            
+            # Changes are taken against the previous bucket, including the one before the range
+            view = add_changes(aggregated.copy())
+            view = view[(view['end'] >= lower) & (view['start'] <= upper)]
+            
+            records = view.to_dict('records')
+            for record in records:
+                record['volume'] = int(record['volume'])
+                record['bars'] = int(record['bars'])
+                if time_col == 'timestamp':
+                    record['start'] = datetime.fromtimestamp(int(record['start']), tz=timezone.utc).isoformat()
+                    record['end'] = datetime.fromtimestamp(int(record['end']), tz=timezone.utc).isoformat()
+            
+            return {
+                "success": True,
+                "ticker": ticker,
+                "interval": interval,
+                "frequency": offset.freqstr,
+                "adjusted": adjusted,
+                "cached": cached,
+                "records_count": len(records),
+                "data": records
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in get_resampled_prices: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {"error": f"Internal server error: {str(e)}"}
+
+    async def indicators_for(self, ticker: str, specs: List[str], adjusted: bool,
+                             start_date: str, end_date: str, series_start: Optional[str]) -> Dict[str, Any]:
+        """Latest indicator values for one ticker, and the series from series_start if asked"""
+        import numpy as np
+        from src.adjustments import apply_adjustments
+        from src.indicators import clean
+        
+        engine = self.cache_manager.indicators
+        
+        # Unchanged cache file and state already built: answer without touching the bars
+        if not series_start:
+            latest = engine.peek(ticker, adjusted, specs, self.cache_manager.get_version(ticker))
+            if latest is not None:
+                return {"success": True, "ticker": ticker, "cached": True, **latest}
+        
+        loaded = await self.load_daily(ticker, start_date, end_date)
+        if loaded is None:
+            return {"error": "All data sources failed"}
+        
+        bars, actions, cached = loaded
+        if bars is None or bars.empty:
+            return {"error": "No price data"}
+        
+        series = apply_adjustments(bars, actions) if adjusted else bars.sort_values('date').reset_index(drop=True)
+        latest = engine.update(ticker, adjusted, specs, series, self.cache_manager.get_version(ticker))
+        result = {"success": True, "ticker": ticker, "cached": cached, **latest}
+        
+        if series_start:
+            full, _ = engine.compute(series, specs)
+            dates = series['date'].to_numpy()
+            first = int(np.searchsorted(dates, series_start))
+            result["series"] = [
+                {"date": dates[i], "close": clean(series['close'].iloc[i]),
+                 **{name: clean(values[i]) for name, values in full.items()}}
+                for i in range(first, len(dates))
+            ]
+        
+        return result
+
+    async def handle_get_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_indicators tool call"""
+        from src.indicators import DEFAULT_INDICATORS, parse_spec
+        
+        try:
+            tickers = [t.upper() for t in arguments.get("tickers", []) if t]
+            specs = arguments.get("indicators") or DEFAULT_INDICATORS
+            adjusted = arguments.get("adjusted", True)
+            lookback_days = int(arguments.get("lookback_days", 400))
+            series_start = arguments.get("series_start")
+            
+            if not tickers:
+                return {"error": "At least one ticker is required"}
+            
+            try:
+                for spec in specs:
+                    parse_spec(spec)
+            except ValueError as e:
+                return {"error": str(e)}
+            
+            # Enough history for the longest warm-up when nothing is cached yet
+            end_date = datetime.now().strftime("%Y-%m-%d")
+            start_date = (datetime.now() - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+            
+            results = await asyncio.gather(*[
+                self.indicators_for(ticker, specs, adjusted, start_date, end_date, series_start)
+                for ticker in tickers
+            ])
+            
+            return {
+                "success": True,
+                "tickers_count": len(tickers),
+                "results": dict(zip(tickers, results))
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in get_indicators: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {"error": f"Internal server error: {str(e)}"}
+
+    async def panel_series(self, ticker: str, start_date: str, end_date: str, adjusted: bool):
+        """Close series for one ticker indexed by date; returns (series, error)"""
+        import pandas as pd
+        from src.adjustments import apply_adjustments
+        from src.panel import fetch_start, series_window
+        
+        try:
+            loaded = await self.load_daily(ticker, fetch_start(start_date), end_date)
+        except Exception as e:
+            return None, str(e)
+        
+        if loaded is None or loaded[0] is None or loaded[0].empty:
+            return None, "All data sources failed"
+        
+        bars, actions, _ = loaded
+        bars = apply_adjustments(bars, actions) if adjusted else bars.sort_values('date')
+        series = pd.Series(bars['close'].to_numpy(dtype=float), index=bars['date'].to_numpy())
+        return series_window(series, start_date, end_date), None
+
+    async def handle_get_panel(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_panel tool call"""
+        from src.panel import calendar_ticker, panel_response, validate_panel_arguments
+        
+        try:
+            error = validate_panel_arguments(arguments)
+            if error:
+                return {"error": error}
+            
+            tickers = list(dict.fromkeys(t.upper() for t in arguments["tickers"] if t))
+            calendar = calendar_ticker(arguments)
+            fetch = tickers + ([calendar] if calendar and calendar not in tickers else [])
+            
+            loaded = await asyncio.gather(*[
+                self.panel_series(ticker, arguments["start"], arguments["end"], arguments.get("adjusted", True))
+                for ticker in fetch
+            ])
+            series = {ticker: s for ticker, (s, _) in zip(fetch, loaded) if s is not None}
+            errors = {ticker: e for ticker, (_, e) in zip(fetch, loaded) if e is not None}
+            
+            # Sharded mode aligns on the supervisor, which only needs each shard's raw series
+            if arguments.get("unaligned"):
+                return {
+                    "success": True,
+                    "series": {t: {"dates": list(s.index), "closes": s.tolist()} for t, s in series.items()},
+                    "errors": errors
+                }
+            
+            if calendar and calendar in errors:
+                return {"error": f"Calendar ticker {calendar} failed: {errors[calendar]}"}
+            
+            return panel_response(series, tickers, arguments, errors)
+            
+        except Exception as e:
+            logger.error(f"Error in get_panel: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {"error": f"Internal server error: {str(e)}"}
+
+    async def handle_get_covariance(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_covariance tool call"""
+        from src.covariance import (aligned_returns, covariance_params, covariance_response,
+                                    validate_covariance_arguments)
+        
+        try:
+            error = validate_covariance_arguments(arguments)
+            if error:
+                return {"error": error}
+            
+            tickers = list(dict.fromkeys(t.upper() for t in arguments["tickers"] if t))
+            adjusted = arguments.get("adjusted", True)
+            method, param = covariance_params(arguments)
+            engine = self.cache_manager.covariance
+            
+            # Unchanged cache files: answer from the running sums without reading any bars
+            key = engine.make_key(tickers, adjusted, method, param)
+            versions = {ticker: self.cache_manager.get_version(ticker) for ticker in key[0]}
+            state = engine.peek(key, versions)
+            if state is not None:
+                return covariance_response(state, list(key[0]), tickers, arguments, {})
+            
+            end_date = datetime.now().strftime("%Y-%m-%d")
+            start_date = (datetime.now() - timedelta(days=int(arguments.get("lookback_days", 400)))).strftime("%Y-%m-%d")
+            
+            loaded = await asyncio.gather(*[
+                self.panel_series(ticker, start_date, end_date, adjusted) for ticker in tickers
+            ])
+            series = {ticker: s for ticker, (s, _) in zip(tickers, loaded) if s is not None}
+            errors = {ticker: e for ticker, (_, e) in zip(tickers, loaded) if e is not None}
+            
+            # State is kept only for the tickers that loaded, so a failed one can't leave holes in it
+            key = engine.make_key(list(series), adjusted, method, param)
+            dates, returns = aligned_returns(series, list(key[0]))
+            versions = {ticker: self.cache_manager.get_version(ticker) for ticker in key[0]}
+            state = engine.update(key, dates, returns, versions)
+            
+            return covariance_response(state, list(key[0]), tickers, arguments, errors)
+            
+        except Exception as e:
+            logger.error(f"Error in get_covariance: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {"error": f"Internal server error: {str(e)}"}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get a snapshot of server, cache and rate limiter metrics"""
+        # Don't force the data stack to load just to report on it
+        cache_stats = self._cache_manager.get_cache_stats() if self._cache_manager else {"loaded": False}
+        
+        return self.metrics.snapshot(
+            cache_stats=cache_stats,
+            rate_stats=self.rate_limiter.get_stats()
+        )
+
+    async def render_prometheus(self) -> str:
+        """Render current metrics in the Prometheus text format"""
+        return render_prometheus([({}, self.get_stats())])
+
+    async def backfill_unit(self, ticker: str, start_date: str, end_date: str) -> Optional[str]:
+        """Load one backfill unit into the cache; returns None on success or an error message"""
+        # Cached bars from other years don't make this unit done; a failed fetch has to be retried
+        if await self.load_daily(ticker, start_date, end_date, allow_stale=False) is None:
+            return f"Could not fetch {ticker} from {start_date} to {end_date}"
+        return None
+
+    async def handle_start_backfill(self, arguments: Dict[str, Any], progress_token: Any = None) -> Dict[str, Any]:
+        """Handle start_backfill tool call"""
+        error = validate_backfill_arguments(arguments)
+        if error:
+            return {"error": error}
+        
+        tickers = list(dict.fromkeys(t.upper() for t in arguments["tickers"] if t))
+        end_date = arguments.get("end") or datetime.now().strftime("%Y-%m-%d")
+        status = self.backfills.submit(tickers, arguments["start"], end_date,
+                                       job_id=arguments.get("job_id"), progress_token=progress_token)
+        if "error" in status:
+            return status
+        return {"success": True, **status}
+
+    async def handle_get_job_status(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_job_status tool call"""
+        status = self.backfills.status(arguments.get("job_id"))
+        if "error" in status:
+            return status
+        return {"success": True, **status}
+
+    async def handle_cancel_job(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle cancel_job tool call"""
+        if not arguments.get("job_id"):
+            return {"error": "job_id is required"}
+        
+        status = self.backfills.cancel(arguments["job_id"])
+        if "error" in status:
+            return status
+        return {"success": True, **status}
+
+    async def handle_get_server_stats(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle get_server_stats tool call"""
+        if arguments.get("format") == "prometheus":
+            return {"success": True, "prometheus": await self.render_prometheus()}
+        
+        return {"success": True, **self.get_stats()}
+
+    async def handle_tool_call(self, tool_name: str, arguments: Dict[str, Any],
+                               progress_token: Any = None) -> Dict[str, Any]:
+        """Dispatch a tools/call request to its handler"""
+        async with self.metrics.track_tool(tool_name) as outcome:
+            if tool_name not in LIGHTWEIGHT_TOOLS:
+                await self.ensure_loaded()
+            
+            with priority_class(TOOL_PRIORITIES.get(tool_name, "pipeline")):
+                result = await self.dispatch(tool_name, arguments, progress_token)
+            
+            outcome["error"] = "error" in result
+            return result
+
+    async def dispatch(self, tool_name: str, arguments: Dict[str, Any], progress_token: Any = None) -> Dict[str, Any]:
+        """Run the handler for a tool"""
+        if tool_name == "get_prices":
+            result = await self.handle_get_prices(arguments)
+        elif tool_name == "get_prices_batch":
+            result = await self.handle_get_prices_batch(arguments)
+        elif tool_name == "get_resampled_prices":
+            result = await self.handle_get_resampled_prices(arguments)
+        elif tool_name == "get_indicators":
+            result = await self.handle_get_indicators(arguments)
+        elif tool_name == "get_covariance":
+            result = await self.handle_get_covariance(arguments)
+        elif tool_name == "get_panel":
+            result = await self.handle_get_panel(arguments)
+        elif tool_name == "get_current_price":
+            result = await self.handle_get_current_price(arguments)
+        elif tool_name == "start_backfill":
+            result = await self.handle_start_backfill(arguments, progress_token)
+        elif tool_name == "get_job_status":
+            result = await self.handle_get_job_status(arguments)
+        elif tool_name == "cancel_job":
+            result = await self.handle_cancel_job(arguments)
+        elif tool_name == "get_server_stats":
+            result = await self.handle_get_server_stats(arguments)
+        else:
+            result = {"error": f"Unknown tool: {tool_name}"}
+        
+        return result
+
+def write_message(message: Dict[str, Any]):
+    """Write a single JSON-RPC message to stdout"""
+    print(json.dumps(message))
+    sys.stdout.flush()
+
+def tool_response(request_id: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap a tool result in a tools/call response"""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "result": {
+            "content": [
+                {
+                    "type": "text",
+                    "text": json.dumps(result, indent=2)
+                }
+            ]
+        }
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="MCP Stock Prices Server")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MCP_STOCK_WORKERS", "0")),
+                        help="Run as a supervisor sharding tickers across N worker processes")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Parquet cache directory (defaults to data/prices)")
+    parser.add_argument("--cache-max-mb", type=float, default=float(os.environ.get("MCP_STOCK_CACHE_MAX_MB", "0")),
+                        help="Disk budget for the cache; least recently used tickers are evicted beyond it (0 = unlimited)")
+    parser.add_argument("--pin", nargs="*", default=[t for t in os.environ.get("MCP_STOCK_PINNED", "").split(",") if t],
+                        help="Tickers that are never evicted from the cache (e.g. the watchlist)")
+    parser.add_argument("--maintenance-interval", type=float, default=300.0,
+                        help="Seconds between cache eviction/compaction passes (0 disables)")
+    parser.add_argument("--metrics-file", default=os.environ.get("MCP_STOCK_METRICS_FILE"),
+                        help="Periodically write Prometheus text-format metrics to this file")
+    parser.add_argument("--metrics-port", type=int, default=int(os.environ.get("MCP_STOCK_METRICS_PORT", "0")),
+                        help="Serve Prometheus metrics over HTTP on this port")
+    parser.add_argument("--metrics-interval", type=float, default=15.0,
+                        help="Seconds between metrics file writes")
+    parser.add_argument("--prewarm", action="store_true",
+                        default=os.environ.get("MCP_STOCK_PREWARM", "").lower() in ("1", "true", "yes"),
+                        help="Load the data stack in the background right after startup")
+    parser.add_argument("--record", default=os.environ.get("MCP_STOCK_HTTP_RECORD"),
+                        help="Append raw upstream responses and their timings to this archive")
+    parser.add_argument("--replay", default=os.environ.get("MCP_STOCK_HTTP_REPLAY"),
+                        help="Serve upstream requests from a recorded archive instead of the network")
+    parser.add_argument("--replay-speed", type=float, default=float(os.environ.get("MCP_STOCK_REPLAY_SPEED", "1")),
+                        help="Replay at recorded timing divided by this factor (0 = no delay)")
+    parser.add_argument("--worker", action="store_true",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--rate-share", type=float, default=1.0,
+                        help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
 async def main():
     """Main MCP server loop"""
-    server = StockPricesServer()
+    args = parse_args()
+    background = []
+    
+    # The adapters read record/replay settings from the environment, which shard workers inherit
+    if args.replay:
+        os.environ["MCP_STOCK_HTTP_REPLAY"] = str(Path(args.replay).resolve())
+        os.environ["MCP_STOCK_REPLAY_SPEED"] = str(args.replay_speed)
+    elif args.record:
+        os.environ["MCP_STOCK_HTTP_RECORD"] = str(Path(args.record).resolve())
+    
+    if args.workers > 0 and not args.worker:
+        # Supervisor mode: this process only routes requests to shard workers
+        from src.sharding import ShardSupervisor
+        # Each shard gets an equal share of the disk budget
+        worker_args = ["--cache-max-mb", str(args.cache_max_mb / args.workers),
+                       "--maintenance-interval", str(args.maintenance_interval)]
+        if args.pin:
+            worker_args += ["--pin", *args.pin]
+        server = ShardSupervisor(args.workers, cache_dir=args.cache_dir, prewarm=args.prewarm, worker_args=worker_args)
+        await server.start()
+    else:
+        server = StockPricesServer(cache_dir=args.cache_dir, cache_max_mb=args.cache_max_mb, pinned=args.pin,
+                                   rate_share=args.rate_share)
+        if args.prewarm:
+            # initialize/tools/list are answered while this runs
+            background.append(asyncio.create_task(server.ensure_loaded()))
+        if args.maintenance_interval > 0:
+            background.append(asyncio.create_task(server.maintain_cache(args.maintenance_interval)))
+        server.resume_backfills()
+    
+    # Metrics exporters and progress notifications come from the front process only
+    if not args.worker:
+        server.notify = write_message
+        if args.metrics_file:
+            background.append(asyncio.create_task(
+                write_prometheus_file(args.metrics_file, server.render_prometheus, args.metrics_interval)
+            ))
+        if args.metrics_port:
+            metrics_server = await serve_prometheus(args.metrics_port, server.render_prometheus)
+            background.append(asyncio.create_task(metrics_server.serve_forever()))
     
     logger.info("Starting MCP Stock Prices Server...")
     logger.info("Waiting for requests on stdin...")
     
+    async def handle_call(request: Dict[str, Any]):
+        try:
+            tool_name = request["params"]["name"]
+            arguments = request["params"].get("arguments", {})
+            progress_token = (request["params"].get("_meta") or {}).get("progressToken")
+            result = await server.handle_tool_call(tool_name, arguments, progress_token)
+        except Exception as e:
+            logger.error(f"Error processing request: {e}")
+            logger.error(traceback.format_exc())
+            result = {"error": f"Internal server error: {str(e)}"}
+        
+        write_message(tool_response(request.get("id"), result))
+    
+    # Workers and the supervisor serve requests concurrently; responses carry their id
+    concurrent = args.worker or args.workers > 0
+    pending = set()
+    
     try:
         while True:
             try:
@@ -152,36 +1022,16 @@ async def main():
                 
                 # Handle different MCP message types
                 if request.get("method") == "tools/call":
-                    tool_name = request["params"]["name"]
-                    arguments = request["params"].get("arguments", {})
-                    
-                    if tool_name == "get_prices":
-                        result = await server.handle_get_prices(arguments)
-                    elif tool_name == "get_current_price":
-                        result = await server.handle_get_current_price(arguments)
+                    if concurrent:
+                        task = asyncio.create_task(handle_call(request))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
                     else:
-                        result = {"error": f"Unknown tool: {tool_name}"}
-                    
-                    # Send response
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": request.get("id"),
-                        "result": {
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": json.dumps(result, indent=2)
-                                }
-                            ]
-                        }
-                    }
-                    
-                    print(json.dumps(response))
-                    sys.stdout.flush()
+                        await handle_call(request)
                 
                 elif request.get("method") == "initialize":
                     # Handle initialization
-                    response = {
+                    write_message({
                         "jsonrpc": "2.0",
                         "id": request.get("id"),
                         "result": {
@@ -194,49 +1044,17 @@ async def main():
                                 "version": "1.0.0"
                             }
                         }
-                    }
-                    
-                    print(json.dumps(response))
-                    sys.stdout.flush()
+                    })
                 
                 elif request.get("method") == "tools/list":
                     # Return available tools
-                    response = {
+                    write_message({
                         "jsonrpc": "2.0",
                         "id": request.get("id"),
                         "result": {
-                            "tools": [
-                                {
-                                    "name": "get_prices",
-                                    "description": "Fetch historical stock price data",
-                                    "inputSchema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "ticker": {"type": "string"},
-                                            "start": {"type": "string"},
-                                            "end": {"type": "string"},
-                                            "adjusted": {"type": "boolean", "default": True}
-                                        },
-                                        "required": ["ticker", "start", "end"]
-                                    }
-                                },
-                                {
-                                    "name": "get_current_price",
-                                    "description": "Get current price for a stock ticker",
-                                    "inputSchema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "ticker": {"type": "string"}
-                                        },
-                                        "required": ["ticker"]
-                                    }
-                                }
-                            ]
+                            "tools": TOOLS
                         }
-                    }
-                    
-                    print(json.dumps(response))
-                    sys.stdout.flush()
+                    })
                 
             except json.JSONDecodeError as e:
                 logger.error(f"Invalid JSON received: {e}")
@@ -245,12 +1063,20 @@ async def main():
                 logger.error(f"Error processing request: {e}")
                 logger.error(traceback.format_exc())
                 continue
+        
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
                 
     except KeyboardInterrupt:
         logger.info("Server shutting down...")
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         logger.error(traceback.format_exc())
+    finally:
+        for task in background:
+            task.cancel()
+        if hasattr(server, "stop"):
+            await server.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,409 @@
+"""
+Sharded worker mode for the stock prices server.
+A supervisor process routes tool calls to N worker processes by consistent
+hashing of the ticker, so parsing, pandas transforms and JSON encoding for a
+universe-wide refresh are spread across cores. Each worker owns its own
+cache partition and an equal share of every upstream rate limit.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from src.backfill import PROGRESS_SECONDS, merge_statuses, progress_notification, validate_backfill_arguments
+from src.metrics import MetricsRegistry, render_prometheus
+
+logger = logging.getLogger(__name__)
+
+project_root = Path(__file__).parent.parent
+
+# Worker responses can carry years of bars, so allow long lines on the pipe
+STREAM_LIMIT = 64 * 1024 * 1024
+
+class ConsistentHashRing:
+    """Maps keys onto shard numbers using a hash ring with virtual nodes"""
+    
+    def __init__(self, shards: int, replicas: int = 64):
+        self.shards = shards
+        self._ring = sorted(
+            (self._hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self._keys = [h for h, _ in self._ring]
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+    
+    def get_shard(self, key: str) -> int:
+        """Get the shard that owns a key"""
+        index = bisect.bisect(self._keys, self._hash(key.upper())) % len(self._keys)
+        return self._ring[index][1]
+
+class ShardWorker:
+    """A worker process speaking the MCP JSON-lines protocol over pipes"""
+    
+    def __init__(self, shard: int, cache_dir: Path, prewarm: bool = False, extra_args: Optional[List[str]] = None):
+        self.shard = shard
+        self.cache_dir = cache_dir
+        self.prewarm = prewarm
+        self.extra_args = extra_args or []
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Spawn the worker process"""
+        args = ["-m", "src.server", "--worker", "--cache-dir", str(self.cache_dir)]
+        if self.prewarm:
+            args.append("--prewarm")
+        args += self.extra_args
+        
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, *args,
+            cwd=str(project_root),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT
+        )
+        self._reader_task = asyncio.create_task(self._read_responses())
+        logger.info(f"Started shard worker {self.shard} (pid {self.process.pid})")
+    
+    async def _read_responses(self):
+        """Resolve pending calls as responses arrive"""
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Shard {self.shard} sent invalid JSON")
+                continue
+            
+            future = self._pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        
+        # Worker exited; fail anything still waiting on it
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"Shard worker {self.shard} exited"))
+        self._pending.clear()
+    
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a tools/call request and wait for the decoded result"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        
+        request = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "tools/call",
+            "params": {"name": tool_name, "arguments": arguments}
+        }
+        self.process.stdin.write((json.dumps(request) + "\n").encode())
+        await self.process.stdin.drain()
+        
+        response = await future
+        return json.loads(response["result"]["content"][0]["text"])
+    
+    async def stop(self):
+        """Close the worker's stdin and wait for it to exit"""
+        if self.process is None:
+            return
+        
+        if self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        
+        if self._reader_task is not None:
+            await self._reader_task
+
+class ShardSupervisor:
+    """Routes tool calls to shard workers and aggregates batch responses"""
+    
+    def __init__(self, workers: int, cache_dir: Optional[str] = None, prewarm: bool = False,
+                 worker_args: Optional[List[str]] = None):
+        if cache_dir is None:
+            cache_dir = project_root / "data" / "prices"
+        
+        self.cache_dir = Path(cache_dir)
+        self.ring = ConsistentHashRing(workers)
+        self.metrics = MetricsRegistry()
+        # Workers rate limit independently, so each gets 1/N of every source's calls
+        worker_args = ["--rate-share", str(1 / workers), *(worker_args or [])]
+        self.workers = [
+            ShardWorker(shard, self.cache_dir / f"shard-{shard:02d}", prewarm=prewarm, extra_args=worker_args)
+            for shard in range(workers)
+        ]
+        
+        # Set by the main loop to send notifications to the client
+        self.notify = None
+        self.progress_tasks = set()
+    
+    async def start(self):
+        """Spawn all shard workers"""
+        await asyncio.gather(*[worker.start() for worker in self.workers])
+        logger.info(f"Supervisor routing across {len(self.workers)} shard workers")
+    
+    async def stop(self):
+        """Shut down all shard workers"""
+        for task in self.progress_tasks:
+            task.cancel()
+        await asyncio.gather(*[worker.stop() for worker in self.workers])
+    
+    def worker_for(self, ticker: str) -> ShardWorker:
+        """Get the worker that owns a ticker"""
+        return self.workers[self.ring.get_shard(ticker)]
+    
+    async def handle_tool_call(self, tool_name: str, arguments: Dict[str, Any],
+                               progress_token: Any = None) -> Dict[str, Any]:
+        """Route a tool call to the owning shard(s)"""
+        async with self.metrics.track_tool(tool_name) as outcome:
+            if tool_name == "start_backfill":
+                result = await self._handle_start_backfill(arguments, progress_token)
+            else:
+                result = await self._route(tool_name, arguments)
+            outcome["error"] = "error" in result
+            return result
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Collect the supervisor's own metrics plus every shard's"""
+        shard_stats = await asyncio.gather(*[
+            worker.call_tool("get_server_stats", {}) for worker in self.workers
+        ], return_exceptions=True)
+        
+        return {
+            "supervisor": self.metrics.snapshot(),
+            "shards": [
+                {"error": str(stats)} if isinstance(stats, Exception) else stats
+                for stats in shard_stats
+            ]
+        }
+    
+    async def render_prometheus(self) -> str:
+        """Render supervisor and shard metrics, labelled by role and shard"""
+        stats = await self.get_stats()
+        snapshots = [({"role": "supervisor"}, stats["supervisor"])]
+        for shard, shard_stats in enumerate(stats["shards"]):
+            if "error" not in shard_stats:
+                snapshots.append(({"role": "worker", "shard": f"{shard:02d}"}, shard_stats))
+        return render_prometheus(snapshots)
+    
+    async def _route(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        if tool_name == "get_server_stats":
+            if arguments.get("format") == "prometheus":
+                return {"success": True, "prometheus": await self.render_prometheus()}
+            return {"success": True, **(await self.get_stats())}
+        
+        if tool_name == "get_panel":
+            return await self._handle_panel(arguments)
+        
+        if tool_name == "get_covariance":
+            return await self._handle_covariance(arguments)
+        
+        if tool_name == "get_job_status":
+            return await self._job_status(arguments.get("job_id"))
+        
+        if tool_name == "cancel_job":
+            if not arguments.get("job_id"):
+                return {"error": "job_id is required"}
+            return self._merge_job_results(await self._broadcast("cancel_job", arguments), arguments["job_id"])
+        
+        if "tickers" in arguments:
+            return await self._handle_batch(tool_name, arguments)
+        
+        ticker = arguments.get("ticker", "")
+        if not ticker:
+            # Nothing to route on; any shard can answer (e.g. validation errors)
+            return await self.workers[0].call_tool(tool_name, arguments)
+        
+        return await self.worker_for(ticker).call_tool(tool_name, arguments)
+    
+    async def _collect_series(self, tickers: List[str], arguments: Dict[str, Any]):
+        """Raw close series for tickers from their shards; returns (series, errors)"""
+        import pandas as pd
+        
+        by_shard: Dict[int, List[str]] = {}
+        for ticker in tickers:
+            by_shard.setdefault(self.ring.get_shard(ticker), []).append(ticker)
+        
+        shard_results = await asyncio.gather(*[
+            self.workers[shard].call_tool("get_panel", {**arguments, "tickers": shard_tickers, "unaligned": True})
+            for shard, shard_tickers in by_shard.items()
+        ], return_exceptions=True)
+        
+        series, errors = {}, {}
+        for shard_tickers, result in zip(by_shard.values(), shard_results):
+            if isinstance(result, Exception) or "error" in result:
+                error = str(result) if isinstance(result, Exception) else result["error"]
+                errors.update({ticker: error for ticker in shard_tickers})
+                continue
+            errors.update(result.get("errors", {}))
+            for ticker, raw in result.get("series", {}).items():
+                series[ticker] = pd.Series(raw["closes"], index=raw["dates"], dtype=float)
+        
+        return series, errors
+    
+    async def _handle_panel(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect raw close series from each shard and align them here"""
+        from src.panel import calendar_ticker, panel_response, validate_panel_arguments
+        
+        error = validate_panel_arguments(arguments)
+        if error:
+            return {"error": error}
+        
+        tickers = list(dict.fromkeys(t.upper() for t in arguments["tickers"] if t))
+        calendar = calendar_ticker(arguments)
+        fetch = tickers + ([calendar] if calendar and calendar not in tickers else [])
+        series, errors = await self._collect_series(fetch, arguments)
+        
+        if calendar and calendar in errors:
+            return {"error": f"Calendar ticker {calendar} failed: {errors[calendar]}"}
+        
+        return panel_response(series, tickers, arguments, errors)
+    
+    async def _handle_covariance(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Collect return histories from each shard and compute the matrix here.
+        Shards don't share state, so the supervisor computes it in full each time.
+        """
+        from src.covariance import (CovarianceEngine, aligned_returns, covariance_params,
+                                    covariance_response, validate_covariance_arguments)
+        
+        error = validate_covariance_arguments(arguments)
+        if error:
+            return {"error": error}
+        
+        tickers = list(dict.fromkeys(t.upper() for t in arguments["tickers"] if t))
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        start_date = (datetime.now() - timedelta(days=int(arguments.get("lookback_days", 400)))).strftime("%Y-%m-%d")
+        series, errors = await self._collect_series(tickers, {
+            "start": start_date, "end": end_date, "adjusted": arguments.get("adjusted", True)
+        })
+        
+        method, param = covariance_params(arguments)
+        key = CovarianceEngine.make_key(list(series), arguments.get("adjusted", True), method, param)
+        dates, returns = aligned_returns(series, list(key[0]))
+        state = CovarianceEngine().build(key, dates, returns)
+        return covariance_response(state, list(key[0]), tickers, arguments, errors)
+    
+    async def _broadcast(self, tool_name: str, arguments: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Call a tool on every shard; failed shards are left out"""
+        results = await asyncio.gather(*[
+            worker.call_tool(tool_name, arguments) for worker in self.workers
+        ], return_exceptions=True)
+        return [r for r in results if not isinstance(r, Exception)]
+    
+    @staticmethod
+    def _merge_job_results(results: List[Dict[str, Any]], job_id: str) -> Dict[str, Any]:
+        """Merge one job's per-shard statuses; shards without a part of the job don't know it"""
+        statuses = [r for r in results if "error" not in r]
+        if not statuses:
+            return {"error": f"Unknown job: {job_id}"}
+        return {"success": True, **merge_statuses(statuses)}
+    
+    async def _handle_start_backfill(self, arguments: Dict[str, Any], progress_token: Any = None) -> Dict[str, Any]:
+        """Start one backfill job split across the shards that own its tickers, under a shared job id"""
+        error = validate_backfill_arguments(arguments)
+        if error:
+            return {"error": error}
+        
+        tickers = list(dict.fromkeys(t.upper() for t in arguments["tickers"] if t))
+        job_id = arguments.get("job_id") or uuid.uuid4().hex[:12]
+        
+        by_shard: Dict[int, List[str]] = {}
+        for ticker in tickers:
+            by_shard.setdefault(self.ring.get_shard(ticker), []).append(ticker)
+        
+        # Fix the end date here so every shard's part covers the same range
+        end_date = arguments.get("end") or datetime.now().strftime("%Y-%m-%d")
+        results = await asyncio.gather(*[
+            self.workers[shard].call_tool("start_backfill", {**arguments, "tickers": shard_tickers,
+                                                             "end": end_date, "job_id": job_id})
+            for shard, shard_tickers in by_shard.items()
+        ], return_exceptions=True)
+        
+        errors = [str(r) if isinstance(r, Exception) else r["error"] for r in results
+                  if isinstance(r, Exception) or "error" in r]
+        result = self._merge_job_results([r for r in results if not isinstance(r, Exception)], job_id)
+        if errors:
+            result["errors"] = errors
+        
+        # Workers don't talk to the client; report merged progress from here
+        if progress_token is not None and self.notify is not None and "error" not in result:
+            task = asyncio.create_task(self._report_progress(job_id, progress_token))
+            self.progress_tasks.add(task)
+            task.add_done_callback(self.progress_tasks.discard)
+        return result
+    
+    async def _job_status(self, job_id: Optional[str]) -> Dict[str, Any]:
+        """One job's status merged across shards, or every job's"""
+        if job_id:
+            return self._merge_job_results(await self._broadcast("get_job_status", {"job_id": job_id}), job_id)
+        
+        by_job: Dict[str, List[Dict[str, Any]]] = {}
+        for result in await self._broadcast("get_job_status", {}):
+            for status in result.get("jobs", []):
+                by_job.setdefault(status["job_id"], []).append(status)
+        
+        jobs = sorted((merge_statuses(statuses) for statuses in by_job.values()), key=lambda j: j["created"])
+        return {"success": True, "jobs": jobs}
+    
+    async def _report_progress(self, job_id: str, progress_token: Any):
+        """Poll a job's merged status and send progress notifications until it finishes"""
+        while True:
+            await asyncio.sleep(PROGRESS_SECONDS)
+            status = await self._job_status(job_id)
+            if "error" in status:
+                return
+            self.notify(progress_notification(progress_token, status))
+            if status["status"] not in ("queued", "running"):
+                return
+    
+    async def _handle_batch(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Split a batch call by shard and merge the per-shard results"""
+        tickers = [t.upper() for t in arguments.get("tickers", []) if t]
+        
+        if not tickers:
+            return {"error": "At least one ticker is required"}
+        
+        by_shard: Dict[int, List[str]] = {}
+        for ticker in tickers:
+            by_shard.setdefault(self.ring.get_shard(ticker), []).append(ticker)
+        
+        shard_results = await asyncio.gather(*[
+            self.workers[shard].call_tool(tool_name, {**arguments, "tickers": shard_tickers})
+            for shard, shard_tickers in by_shard.items()
+        ], return_exceptions=True)
+        
+        results = {}
+        for shard_tickers, result in zip(by_shard.values(), shard_results):
+            if isinstance(result, Exception) or "error" in result:
+                error = str(result) if isinstance(result, Exception) else result["error"]
+                results.update({ticker: {"error": error} for ticker in shard_tickers})
+            else:
+                results.update(result.get("results", {}))
+        
+        return {
+            "success": True,
+            "tickers_count": len(tickers),
+            "results": {ticker: results.get(ticker) for ticker in tickers}
+        }
\ No newline at end of file
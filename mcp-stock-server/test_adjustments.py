@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test that cached Stooq bars, already adjusted upstream, aren't adjusted again
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.adjustments import already_adjusted
+from src.cache_manager import CacheManager
+
+# 4:1 split on 2020-08-31. Yahoo served the days around it raw; Stooq later
+# filled the earlier days, already divided by 4
+YAHOO_CLOSES = {"2020-08-27": 504.0, "2020-08-28": 508.0, "2020-08-31": 128.0, "2020-09-01": 132.0}
+STOOQ_CLOSES = {"2020-08-24": 125.0, "2020-08-25": 126.0, "2020-08-26": 126.5}
+
+def bars(closes, source, splits=None):
+    splits = splits or {}
+    return pd.DataFrame({
+        "date": list(closes),
+        "open": list(closes.values()),
+        "high": list(closes.values()),
+        "low": list(closes.values()),
+        "close": list(closes.values()),
+        "volume": [1000] * len(closes),
+        "dividend": [0.0] * len(closes),
+        "split": [splits.get(day, 1.0) for day in closes],
+        "source": source
+    })
+
+def mixed_view(adjusted):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CacheManager(cache_dir)
+        asyncio.run(cache.save_data("TEST", bars(YAHOO_CLOSES, "Yahoo Finance", {"2020-08-31": 4.0})))
+        saved_bars, actions = asyncio.run(cache.save_data("TEST", bars(STOOQ_CLOSES, "Stooq")))
+        return cache.build_view("TEST", saved_bars, actions, "2020-08-24", "2020-09-01", adjusted)
+
+def test_split_skips_stooq_bars():
+    """A split from Yahoo adjusts the raw Yahoo bars before it but not the Stooq ones"""
+    view = mixed_view(adjusted=True)
+
+    assert list(view["close"]) == [125.0, 126.0, 126.5, 126.0, 127.0, 128.0, 132.0]
+    assert list(view["volume"]) == [1000, 1000, 1000, 4000, 4000, 1000, 1000]
+
+def test_raw_view_flags_stooq_bars():
+    """Raw views keep the bars as cached, with the Stooq ones flagged as adjusted"""
+    view = mixed_view(adjusted=False)
+
+    assert list(view["close"]) == [125.0, 126.0, 126.5, 504.0, 508.0, 128.0, 132.0]
+    assert list(already_adjusted(view)) == [True] * 3 + [False] * 4
+
+if __name__ == "__main__":
+    test_split_skips_stooq_bars()
+    test_raw_view_flags_stooq_bars()
+    print("✅ Adjustment tests passed")
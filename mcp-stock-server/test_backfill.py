@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the persisted backfill job queue: resume, retries and cancellation
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.backfill import MAX_ATTEMPTS, BackfillJobs
+
+class Units:
+    """run_unit that records its calls, failing or blocking on chosen tickers"""
+
+    def __init__(self, failing=(), blocking=()):
+        self.calls = []
+        self.failing = set(failing)
+        self.blocking = set(blocking)
+        self.release = asyncio.Event()
+
+    async def __call__(self, ticker, start_date, end_date):
+        self.calls.append((ticker, start_date, end_date))
+        if ticker in self.blocking:
+            await self.release.wait()
+        if ticker in self.failing:
+            return f"{ticker} failed"
+        return None
+
+async def until(condition, timeout=5.0):
+    """Wait for a condition to hold"""
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_restart_skips_done_units():
+    """A job left running by a previous process is resumed without reloading its done units"""
+    async def run(jobs_dir):
+        units = Units()
+        jobs = BackfillJobs(jobs_dir, units)
+        jobs.load()
+        jobs.start()
+        await jobs.runner
+        return units, jobs
+
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        job = {
+            "id": "resume", "status": "running", "tickers": ["AAPL"], "start": "2020-01-01", "end": "2023-06-30",
+            "created": time.time(), "finished": None,
+            "units": [["AAPL", "2020-01-01", "2020-12-31"], ["AAPL", "2021-01-01", "2021-12-31"],
+                      ["AAPL", "2022-01-01", "2022-12-31"], ["AAPL", "2023-01-01", "2023-06-30"]],
+            "done": [0, 2], "failed": {}
+        }
+        (Path(jobs_dir) / "resume.json").write_text(json.dumps(job))
+
+        units, jobs = asyncio.run(run(jobs_dir))
+        saved = json.loads((Path(jobs_dir) / "resume.json").read_text())
+
+    assert sorted(units.calls) == [("AAPL", "2021-01-01", "2021-12-31"), ("AAPL", "2023-01-01", "2023-06-30")]
+    assert saved["status"] == "completed"
+    assert sorted(saved["done"]) == [0, 1, 2, 3]
+    assert jobs.status("resume")["percent"] == 100.0
+
+def test_failing_unit_retried_then_failed():
+    """A unit is tried MAX_ATTEMPTS times before it is recorded as failed; the job still completes"""
+    async def run(jobs_dir):
+        units = Units(failing=["BAD"])
+        jobs = BackfillJobs(jobs_dir, units)
+        jobs.submit(["GOOD", "BAD"], "2024-01-01", "2024-03-31", job_id="retry")
+        await jobs.runner
+        return units, jobs.status("retry")
+
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        units, status = asyncio.run(run(jobs_dir))
+
+    assert units.calls.count(("BAD", "2024-01-01", "2024-03-31")) == MAX_ATTEMPTS
+    assert units.calls.count(("GOOD", "2024-01-01", "2024-03-31")) == 1
+    assert status["status"] == "completed"
+    assert (status["units_done"], status["units_failed"]) == (1, 1)
+    assert status["failures"] == {"BAD 2024-01-01..2024-03-31": "BAD failed"}
+
+def test_cancel_running_job_keeps_runner_serving():
+    """Cancelling the running job stops it, and the runner goes on to the next queued job"""
+    async def run(jobs_dir):
+        units = Units(blocking=["SLOW"])
+        jobs = BackfillJobs(jobs_dir, units)
+        jobs.submit(["SLOW"], "2024-01-01", "2024-12-31", job_id="first")
+        jobs.submit(["NEXT"], "2024-01-01", "2024-12-31", job_id="second")
+        await until(lambda: ("SLOW", "2024-01-01", "2024-12-31") in units.calls)
+
+        cancelled = jobs.cancel("first")
+        await asyncio.wait_for(jobs.runner, timeout=5.0)
+        return units, cancelled, jobs
+
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        units, cancelled, jobs = asyncio.run(run(jobs_dir))
+        saved = json.loads((Path(jobs_dir) / "first.json").read_text())
+
+    assert cancelled["status"] == "cancelled"
+    assert saved["status"] == "cancelled"
+    assert ("NEXT", "2024-01-01", "2024-12-31") in units.calls
+    assert jobs.status("second")["status"] == "completed"
+    assert jobs.current is None
+
+if __name__ == "__main__":
+    test_restart_skips_done_units()
+    test_failing_unit_retried_then_failed()
+    test_cancel_running_job_keeps_runner_serving()
+    print("✅ Backfill tests passed")
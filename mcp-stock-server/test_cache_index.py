@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the coverage manifest's interval arithmetic used for gap planning
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.cache_index import CacheIndex, merge_intervals, subtract_intervals
+
+ENTRY = {'first_date': '2024-01-01', 'last_date': '2024-12-31', 'rows': 1, 'actions': 0,
+         'bytes': 1, 'refreshed': 0.0, 'source': 'Stooq'}
+
+def test_merge_adjacent():
+    """Ranges where one ends the day before the next starts are joined"""
+    assert merge_intervals([('2024-01-11', '2024-01-20'), ('2024-01-01', '2024-01-10')]) == [('2024-01-01', '2024-01-20')]
+    assert merge_intervals([('2024-01-01', '2024-01-10'), ('2024-01-12', '2024-01-20')]) == [
+        ('2024-01-01', '2024-01-10'), ('2024-01-12', '2024-01-20')
+    ]
+
+def test_merge_overlapping_and_contained():
+    """Overlapping ranges join into one, and a range inside another disappears"""
+    assert merge_intervals([('2024-01-01', '2024-01-15'), ('2024-01-10', '2024-01-20')]) == [('2024-01-01', '2024-01-20')]
+    assert merge_intervals([('2024-01-01', '2024-01-31'), ('2024-01-10', '2024-01-20')]) == [('2024-01-01', '2024-01-31')]
+    assert merge_intervals([]) == []
+
+def test_subtract():
+    """Gaps are the uncovered days between, before and after covered ranges, clipped to the request"""
+    covered = [('2024-01-05', '2024-01-10'), ('2024-01-15', '2024-01-20')]
+
+    assert subtract_intervals('2024-01-01', '2024-01-31', covered) == [
+        ('2024-01-01', '2024-01-04'), ('2024-01-11', '2024-01-14'), ('2024-01-21', '2024-01-31')
+    ]
+    assert subtract_intervals('2024-01-06', '2024-01-09', covered) == []
+    assert subtract_intervals('2024-01-08', '2024-01-16', covered) == [('2024-01-11', '2024-01-14')]
+    assert subtract_intervals('2024-01-10', '2024-01-15', covered) == [('2024-01-11', '2024-01-14')]
+    assert subtract_intervals('2024-02-01', '2024-02-10', covered) == [('2024-02-01', '2024-02-10')]
+    assert subtract_intervals('2024-01-01', '2024-01-31', []) == [('2024-01-01', '2024-01-31')]
+
+def test_gaps_trusted_through():
+    """Coverage after trusted_through is dropped, and a range across it is cut off there"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        index = CacheIndex(Path(cache_dir))
+        index.put('TEST', dict(ENTRY), [('2024-01-01', '2024-03-31'), ('2024-05-01', '2024-05-31')])
+
+        assert index.gaps('test', '2024-01-01', '2024-05-31') == [('2024-04-01', '2024-04-30')]
+        assert index.gaps('TEST', '2024-01-01', '2024-05-31', trusted_through='2024-02-15') == [
+            ('2024-02-16', '2024-05-31')
+        ]
+        assert index.gaps('TEST', '2024-01-01', '2024-05-31', trusted_through='2024-05-10') == [
+            ('2024-04-01', '2024-04-30'), ('2024-05-11', '2024-05-31')
+        ]
+        assert index.gaps('TEST', '2024-01-01', '2024-05-31', trusted_through='2023-12-31') == [
+            ('2024-01-01', '2024-05-31')
+        ]
+        index.db.close()
+
+def test_put_merges_coverage():
+    """Fetched ranges are merged into the ticker's coverage and persisted"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        index = CacheIndex(Path(cache_dir))
+        index.put('TEST', dict(ENTRY), [('2024-01-01', '2024-01-10')])
+        index.put('TEST', dict(ENTRY), [('2024-01-11', '2024-01-20'), ('2024-02-01', '2024-02-05')])
+        index.db.close()
+
+        reopened = CacheIndex(Path(cache_dir))
+        assert reopened.coverage['TEST'] == [('2024-01-01', '2024-01-20'), ('2024-02-01', '2024-02-05')]
+        reopened.db.close()
+
+if __name__ == "__main__":
+    test_merge_adjacent()
+    test_merge_overlapping_and_contained()
+    test_subtract()
+    test_gaps_trusted_through()
+    test_put_merges_coverage()
+    print("✅ Cache index tests passed")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test get_panel calendars when a ticker failed and with punctuated calendar tickers
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.panel import build_panel, calendar_ticker, validate_panel_arguments
+
+SERIES = {
+    "AAPL": pd.Series([10.0, 11.0, 12.0], index=["2024-01-02", "2024-01-03", "2024-01-04"]),
+    "MSFT": pd.Series([20.0, 22.0], index=["2024-01-02", "2024-01-04"])
+}
+
+def test_intersection_skips_failed_ticker():
+    """A ticker without a series leaves the other tickers' common days as the rows"""
+    dates, values = build_panel(SERIES, ["AAPL", "MSFT", "FAIL"], "2024-01-01", "2024-01-05",
+                                calendar="intersection", fill="none")
+
+    assert dates == ["2024-01-02", "2024-01-04"]
+    assert values[:, 0].tolist() == [10.0, 12.0]
+    assert pd.isna(values[:, 2]).all()
+
+def test_intersection_without_any_series():
+    """With no series at all there are no rows, rather than an error"""
+    dates, values = build_panel({}, ["FAIL"], "2024-01-01", "2024-01-05", calendar="intersection")
+
+    assert dates == []
+    assert values.shape == (0, 1)
+
+def test_calendar_ticker_with_punctuation():
+    """Calendar tickers are accepted like any ticker, e.g. BRK-B or ^GSPC"""
+    for calendar in ("BRK-B", "^GSPC", "brk.b"):
+        arguments = {"tickers": ["AAPL"], "start": "2024-01-01", "end": "2024-01-05", "calendar": calendar}
+        assert validate_panel_arguments(arguments) is None
+        assert calendar_ticker(arguments) == calendar.upper()
+
+    arguments = {"tickers": ["AAPL"], "start": "2024-01-01", "end": "2024-01-05", "calendar": ""}
+    assert validate_panel_arguments(arguments) == "Unsupported calendar: "
+
+if __name__ == "__main__":
+    test_intersection_skips_failed_ticker()
+    test_intersection_without_any_series()
+    test_calendar_ticker_with_punctuation()
+    print("✅ Panel tests passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the rate limiter's priority scheduling: interactive headroom and aging
+"""
+
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.rate_limiter import AGING_SECONDS, PRIORITIES, RateLimiter
+
+NOW = 1_000_000.0
+
+def scheduler(calls, *waiters):
+    """
+    A limiter whose Alpha Vantage budget (5 a minute: interactive 5, pipeline 4,
+    background 3) has `calls` made in the last minute and `waiters` queued, each
+    (priority, seconds waited). Returns the limiter and the queued waiters.
+    """
+    limiter = RateLimiter()
+    seq = itertools.count()
+    queue = [{"level": PRIORITIES.index(priority), "since": NOW - waited, "seq": next(seq)}
+             for priority, waited in waiters]
+    limiter.call_counts["alphavantage"] = [NOW - 1.0] * calls
+    limiter.queues["alphavantage"] = queue
+    return limiter, queue
+
+def released(limiter, queue, now=NOW):
+    """Index of the waiter the scheduler lets go next, or None"""
+    going = [i for i, waiter in enumerate(queue) if limiter.can_proceed("alphavantage", waiter, now)]
+    assert len(going) <= 1
+    return going[0] if going else None
+
+def test_aged_background_keeps_interactive_headroom():
+    """A background call waiting minutes never takes the interactive share or goes ahead of it"""
+    limiter, queue = scheduler(3, ("background", 10 * AGING_SECONDS), ("interactive", 0.0))
+
+    assert limiter.effective_level(queue[0], NOW) == PRIORITIES.index("pipeline")
+    assert released(limiter, queue) == 1
+
+    limiter, queue = scheduler(2, ("background", 10 * AGING_SECONDS), ("interactive", 0.0))
+    assert released(limiter, queue) == 1
+
+def test_aged_background_only_uses_its_own_share():
+    """Once the background share is used, an aged background call waits even with nothing else queued"""
+    limiter, queue = scheduler(3, ("background", 10 * AGING_SECONDS))
+    assert released(limiter, queue) is None
+
+    limiter, queue = scheduler(2, ("background", 10 * AGING_SECONDS))
+    assert released(limiter, queue) == 0
+
+def test_aged_background_does_not_block_pipeline():
+    """A background call ahead in line but out of budget lets a pipeline call with budget go"""
+    limiter, queue = scheduler(3, ("background", 2 * AGING_SECONDS), ("pipeline", 0.0))
+    assert released(limiter, queue) == 1
+
+def test_background_is_not_starved():
+    """A background call that has waited AGING_SECONDS goes before pipeline calls queued after it"""
+    limiter, queue = scheduler(1, ("background", AGING_SECONDS / 2), ("pipeline", 0.0))
+    assert released(limiter, queue) == 1
+    assert released(limiter, queue, NOW + AGING_SECONDS / 2) == 0
+
+def test_pipeline_and_interactive_do_not_age():
+    limiter, queue = scheduler(0, ("pipeline", 10 * AGING_SECONDS), ("interactive", 0.0))
+
+    assert limiter.effective_level(queue[0], NOW) == PRIORITIES.index("pipeline")
+    assert limiter.effective_level(queue[1], NOW + 10 * AGING_SECONDS) == 0
+    assert released(limiter, queue) == 1
+
+def test_interactive_call_not_queued_behind_backfill():
+    """With the background share used up and a backfill call waiting, a price lookup goes straight through"""
+    async def run():
+        limiter = RateLimiter()
+        for _ in range(3):
+            await limiter.wait_if_needed("alphavantage", "background")
+
+        backfill = asyncio.create_task(limiter.wait_if_needed("alphavantage", "background"))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(limiter.wait_if_needed("alphavantage", "interactive"), timeout=1.0)
+        assert not backfill.done()
+
+        backfill.cancel()
+        try:
+            await backfill
+        except asyncio.CancelledError:
+            pass
+        return limiter.get_stats()["alphavantage"]
+
+    stats = asyncio.run(run())
+    assert stats["calls_last_minute"] == 4
+    assert stats["by_priority"]["interactive"]["waits"] == 0
+
+if __name__ == "__main__":
+    test_aged_background_keeps_interactive_headroom()
+    test_aged_background_only_uses_its_own_share()
+    test_aged_background_does_not_block_pipeline()
+    test_background_is_not_starved()
+    test_pipeline_and_interactive_do_not_age()
+    test_interactive_call_not_queued_behind_backfill()
+    print("✅ Rate limiter tests passed")
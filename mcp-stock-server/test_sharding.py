@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test that shard workers split the upstream rate limits between them
+"""
+
+import asyncio
+import math
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.rate_limiter import RateLimiter
+from src.sharding import ShardSupervisor
+
+async def worker_limits(workers):
+    """Each running shard's per-source limits, as reported by get_server_stats"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        supervisor = ShardSupervisor(workers, cache_dir=cache_dir)
+        await supervisor.start()
+        try:
+            stats = await supervisor.get_stats()
+        finally:
+            await supervisor.stop()
+
+    return [
+        {source: source_stats["limit_per_minute"] for source, source_stats in shard["rate_limiter"].items()}
+        for shard in stats["shards"]
+    ]
+
+def test_supervisor_splits_rate_limits():
+    """The workers' limits add up to a single server's"""
+    shards = asyncio.run(worker_limits(4))
+
+    assert len(shards) == 4
+    for source, limit in RateLimiter().limits.items():
+        assert math.isclose(sum(shard[source] for shard in shards), limit)
+
+def test_share_under_one_call_a_minute():
+    """A share under one call a minute gets one call per longer window"""
+    limiter = RateLimiter(1 / 16)
+
+    assert limiter.window("alphavantage") == 192.0
+    assert limiter.capacity("alphavantage", 2) == 1
+    assert limiter.window("stooq") == 60.0
+    assert limiter.capacity("stooq", 0) == 3
+
+if __name__ == "__main__":
+    test_supervisor_splits_rate_limits()
+    test_share_under_one_call_a_minute()
+    print("✅ Sharding tests passed")
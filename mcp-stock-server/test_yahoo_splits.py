@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test that raw Yahoo chart API bars are un-split with the ticker's full split history
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.data_sources import YahooFinanceAdapter
+from src.rate_limiter import RateLimiter
+
+# Raw closes around a 4:1 split on 2020-08-31
+RAW_CLOSES = {
+    "2020-08-26": 500.0,
+    "2020-08-27": 504.0,
+    "2020-08-28": 508.0,
+    "2020-08-31": 128.0,
+    "2020-09-01": 132.0
+}
+SPLIT_DATE = "2020-08-31"
+SPLIT_RATIO = 4.0
+
+def timestamp(day):
+    return int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+def chart_response(url):
+    """Chart API payload like Yahoo's: closes reflect every split to date, events only those requested"""
+    query = parse_qs(urlparse(url).query)
+    split_event = {str(timestamp(SPLIT_DATE)): {"date": timestamp(SPLIT_DATE), "numerator": SPLIT_RATIO, "denominator": 1}}
+
+    if query.get("range") == ["max"]:
+        result = {"timestamp": [timestamp(SPLIT_DATE)], "events": {"splits": split_event},
+                  "indicators": {"quote": [{"open": [0], "high": [0], "low": [0], "close": [0], "volume": [0]}]}}
+        return json.dumps({"chart": {"result": [result], "error": None}})
+
+    start, end = int(query["period1"][0]), int(query["period2"][0])
+    days = [d for d in RAW_CLOSES if start <= timestamp(d) < end]
+    ratios = [SPLIT_RATIO if d < SPLIT_DATE else 1.0 for d in days]
+    closes = [RAW_CLOSES[d] / r for d, r in zip(days, ratios)]
+    result = {
+        "timestamp": [timestamp(d) for d in days],
+        "indicators": {"quote": [{"open": closes, "high": closes, "low": closes, "close": closes,
+                                  "volume": [1000 * r for r in ratios]}]}
+    }
+    if start <= timestamp(SPLIT_DATE) < end:
+        result["events"] = {"splits": split_event}
+    return json.dumps({"chart": {"result": [result], "error": None}})
+
+def make_adapter():
+    adapter = YahooFinanceAdapter(RateLimiter())
+    adapter.base_url = "https://chart.test"
+
+    async def http_get(session, url):
+        return 200, chart_response(url)
+
+    adapter.http_get = http_get
+    return adapter
+
+def test_range_before_split_is_unsplit():
+    """A range ending before the split still gets the split taken out of its closes"""
+    df = asyncio.run(make_adapter().fetch_data("TEST", "2020-08-26", "2020-08-29", adjusted=False))
+
+    assert list(df["date"]) == ["2020-08-26", "2020-08-27", "2020-08-28"]
+    assert list(df["close"]) == [500.0, 504.0, 508.0]
+    assert list(df["volume"]) == [1000, 1000, 1000]
+
+def test_range_across_split_is_unsplit():
+    """Bars before an in-range split are un-split, bars from the split on are left alone"""
+    df = asyncio.run(make_adapter().fetch_data("TEST", "2020-08-26", "2020-09-02", adjusted=False))
+
+    assert list(df["close"]) == list(RAW_CLOSES.values())
+
+if __name__ == "__main__":
+    test_range_before_split_is_unsplit()
+    test_range_across_split_is_unsplit()
+    print("✅ Yahoo split tests passed")
@@ -4,75 +4,177 @@ Calculate BrightFlow Performance vs Benchmarks
 Compares BrightFlow against SPY, VFIAX, and SPDR S&P 500 ETF
 """
 
+import asyncio
 import json
+import sys
 import yfinance as yf
 import pandas as pd
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 import os
 
-def fetch_benchmark_data():
+from performance_series import (
+    append_points, load_published_performance, normalized_points, published_series, series_points
+)
+from risk_metrics import comparison_metrics
+from synthetic_paths import business_days, gbm_paths, make_rng, paths_to_points
+
+# Benchmark name -> ticker; SPDR is the same fund as SPY
+BENCHMARK_TICKERS = {
+    "spy": "SPY",           # SPDR S&P 500 ETF Trust
+    "vfiax": "VFIAX",       # Vanguard S&P 500 Index Fund
+    "spdr": "SPY"           # Using SPY as SPDR proxy (same fund)
+}
+
+# Checkout of the MCP stock server, whose Parquet cache and data source adapters are reused here
+MCP_STOCK_SERVER_DIR = Path(os.environ.get(
+    "MCP_STOCK_SERVER_DIR", Path(__file__).resolve().parent.parent / "mcp-stock-server"
+))
+
+def load_price_server():
     """
-    Fetch benchmark performance data from Yahoo Finance
+    Create the MCP stock server's StockPricesServer (cache + adapters) if its
+    checkout is available; returns None otherwise.
     """
+    if MCP_STOCK_SERVER_DIR.exists() and str(MCP_STOCK_SERVER_DIR) not in sys.path:
+        sys.path.insert(0, str(MCP_STOCK_SERVER_DIR))
     
-    print("📊 Fetching benchmark data...")
+    try:
+        from src.server import StockPricesServer
+    except ImportError:
+        return None
     
-    # Define benchmark tickers
-    tickers = {
-        "spy": "SPY",           # SPDR S&P 500 ETF Trust
-        "vfiax": "VFIAX",       # Vanguard S&P 500 Index Fund
-        "spdr": "SPY"           # Using SPY as SPDR proxy (same fund)
-    }
+    # Defaults to the server's own cache directory, so both share one cache
+    return StockPricesServer(cache_dir=os.environ.get("MCP_STOCK_CACHE_DIR"))
+
+async def fetch_closes_cached(server, tickers, start_date, end_date):
+    """
+    Adjusted closes for all tickers at once through the server's cache; only
+    ranges missing from the cache (usually the tail since the last run) are downloaded.
+    Returns (closes, errors) keyed by ticker.
+    """
+    await server.ensure_loaded()
+    results = await asyncio.gather(*[
+        server.panel_series(ticker, start_date, end_date, True) for ticker in tickers
+    ])
+    
+    closes, errors = {}, {}
+    for ticker, (series, error) in zip(tickers, results):
+        if error:
+            errors[ticker] = error
+        else:
+            # The series carries the last close before the range too
+            closes[ticker] = series[series.index >= start_date]
+    return closes, errors
+
+def fetch_closes_yfinance(tickers, start_date, end_date):
+    """Adjusted closes straight from Yahoo Finance, one thread per ticker; returns (closes, errors)"""
+    def history(ticker):
+        try:
+            # yfinance's end date is exclusive
+            end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+            hist = yf.Ticker(ticker).history(start=start_date, end=end)
+        except Exception as e:
+            return ticker, None, str(e)
+        closes = hist['Close']
+        closes.index = closes.index.strftime("%Y-%m-%d")
+        return ticker, closes, None
+    
+    closes, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=len(tickers)) as pool:
+        for ticker, series, error in pool.map(history, tickers):
+            if error:
+                errors[ticker] = error
+            else:
+                closes[ticker] = series
+    return closes, errors
+
+def fetch_benchmark_data(published=None):
+    """
+    Fetch benchmark performance data.
+    Each distinct ticker is fetched once, concurrently, through the MCP stock
+    server's cache when available and from Yahoo Finance otherwise.
+    Benchmarks with a published series only get the days after its last point,
+    continuing from its value, so only closes from that date on are fetched.
+    """
+    
+    print("📊 Fetching benchmark data...")
     
     # Date range: September 25, 2024 to current
     start_date = "2024-09-25"
     end_date = datetime.now().strftime("%Y-%m-%d")
     
+    # Last published point per benchmark; the others are built from start_date
+    published = published or {}
+    anchors = {name: published[name][-1] for name in BENCHMARK_TICKERS if published.get(name)}
+    if len(anchors) == len(BENCHMARK_TICKERS):
+        fetch_start = min(point["date"] for point in anchors.values())
+    else:
+        fetch_start = start_date
+    
+    tickers = sorted(set(BENCHMARK_TICKERS.values()))
+    
+    server = load_price_server()
+    try:
+        if server is not None:
+            print(f"  Loading {', '.join(tickers)} through the MCP stock server cache...")
+            closes, errors = asyncio.run(fetch_closes_cached(server, tickers, fetch_start, end_date))
+        else:
+            print(f"  Fetching {', '.join(tickers)} from Yahoo Finance...")
+            closes, errors = fetch_closes_yfinance(tickers, fetch_start, end_date)
+    except Exception as e:
+        closes, errors = {}, {ticker: str(e) for ticker in tickers}
+    
+    closes = {ticker: prices for ticker, prices in closes.items() if prices is not None and not prices.empty}
+    
+    # Normalize every fetched ticker to start at $1.00 in one pass (only needed for full series)
+    performance = normalized_points(pd.DataFrame(closes)) if len(anchors) < len(BENCHMARK_TICKERS) else {}
+    
     benchmark_data = {}
+    fallback = []
+    
+    for name, ticker in BENCHMARK_TICKERS.items():
+        if ticker in errors:
+            print(f"  ❌ Failed to fetch {ticker}: {errors[ticker]}")
+            if name in anchors:
+                # Keep the published series rather than appending synthetic days; the next run catches up
+                benchmark_data[name] = published[name]
+            else:
+                fallback.append(name)
+            continue
+        
+        if ticker not in closes:
+            print(f"  ⚠️  No data available for {ticker}")
+            if name in anchors:
+                benchmark_data[name] = published[name]
+            continue
+        
+        if name in anchors:
+            # Rebase on the last published point and append the days after it
+            anchor = anchors[name]
+            new_points = series_points(closes[ticker], base=anchor["value"], start_date=anchor["date"])
+            benchmark_data[name] = append_points(published[name], new_points)
+            print(f"  ✅ {name.upper()}: {len(benchmark_data[name]) - len(published[name])} new data points")
+        else:
+            benchmark_data[name] = performance[ticker]
+            print(f"  ✅ {name.upper()}: {len(benchmark_data[name])} data points")
     
-    for name, ticker in tickers.items():
-        try:
-            print(f"  Fetching {name.upper()} ({ticker})...")
-            
-            # Download data
-            stock = yf.Ticker(ticker)
-            hist = stock.history(start=start_date, end=end_date)
-            
-            if hist.empty:
-                print(f"  ⚠️  No data available for {ticker}")
-                continue
-            
-            # Calculate normalized performance (starting at $1.00)
-            prices = hist['Close']
-            start_price = prices.iloc[0]
-            normalized_prices = prices / start_price
-            
-            # Create performance array
-            performance = []
-            for date, price in normalized_prices.items():
-                performance.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "value": round(float(price), 6)
-                })
-            
-            benchmark_data[name] = performance
-            print(f"  ✅ {name.upper()}: {len(performance)} data points")
-            
-        except Exception as e:
-            print(f"  ❌ Failed to fetch {ticker}: {str(e)}")
-            # Create fallback data if API fails
-            benchmark_data[name] = create_fallback_data(start_date, end_date, name)
+    if fallback:
+        # Create fallback data if API fails
+        benchmark_data.update(create_fallback_data(start_date, end_date, fallback))
     
-    return benchmark_data
+    # Keep the benchmark order stable
+    return {name: benchmark_data[name] for name in BENCHMARK_TICKERS if name in benchmark_data}
 
-def create_fallback_data(start_date, end_date, benchmark_name):
+def create_fallback_data(start_date, end_date, benchmark_names):
     """
     Create fallback benchmark data if API fails
-    Uses reasonable market assumptions
+    Uses reasonable market assumptions; all benchmarks are simulated at once as
+    seeded geometric Brownian motion over business days
     """
     
-    print(f"  📉 Creating fallback data for {benchmark_name.upper()}")
+    print(f"  📉 Creating fallback data for {', '.join(name.upper() for name in benchmark_names)}")
     
     # Market assumptions for different benchmarks
     assumptions = {
@@ -81,36 +183,24 @@ def create_fallback_data(start_date, end_date, benchmark_name):
         "spdr": {"annual_return": 0.10, "volatility": 0.16}      # Same as SPY
     }
     
-    params = assumptions.get(benchmark_name, {"annual_return": 0.08, "volatility": 0.15})
+    params = [assumptions.get(name, {"annual_return": 0.08, "volatility": 0.15}) for name in benchmark_names]
     
     # Generate synthetic data
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    performance = []
-    current_date = start
-    current_value = 1.0
-    
-    daily_return = params["annual_return"] / 365
-    daily_vol = params["volatility"] / np.sqrt(365)
-    
-    while current_date <= end:
-        # Add some randomness
-        random_change = np.random.normal(0, daily_vol)
-        current_value *= (1 + daily_return + random_change)
-        
-        performance.append({
-            "date": current_date.strftime("%Y-%m-%d"),
-            "value": round(current_value, 6)
-        })
-        
-        current_date += timedelta(days=1)
+    dates = business_days(start_date, end_date)
+    values = gbm_paths(
+        len(dates),
+        [p["annual_return"] for p in params],
+        [p["volatility"] for p in params],
+        rng=make_rng(start_date)
+    )
     
-    return performance
+    return paths_to_points(dates, values, benchmark_names)
 
 def calculate_performance_metrics():
     """
-    Calculate performance metrics and combine with BrightFlow data
+    Calculate performance metrics and combine with BrightFlow data.
+    New days are appended to the last published series and the summary fields
+    recomputed; set BRIGHTFLOW_FULL_REFRESH=1 to rebuild everything.
     """
     
     print("📈 Calculating performance metrics...")
@@ -123,11 +213,19 @@ def calculate_performance_metrics():
         print("❌ BrightFlow predictions not found. Run generate_brightflow_predictions.py first")
         return None
     
+    published_data = load_published_performance()
+    published = published_series(published_data)
+    
     # Fetch benchmark data
-    benchmark_data = fetch_benchmark_data()
+    benchmark_data = fetch_benchmark_data(published)
     
-    # Get BrightFlow performance
+    # Get BrightFlow performance; incremental predictions only hold the new days
     brightflow_performance = brightflow_data["brightflow_performance"]
+    if brightflow_data.get("incremental_after"):
+        if not published.get("brightflow"):
+            print("❌ Predictions continue published data that could not be loaded. Rerun with BRIGHTFLOW_FULL_REFRESH=1")
+            return None
+        brightflow_performance = append_points(published["brightflow"], brightflow_performance)
     current_value = brightflow_data["current_value"]
     
     # Calculate daily change (vs yesterday)
@@ -141,10 +239,12 @@ def calculate_performance_metrics():
     # Prepare final performance data
     performance_data = {
         "lastUpdated": datetime.now(timezone.utc).isoformat(),
-        "startDate": "2024-09-25",
+        "startDate": (published_data or {}).get("startDate", "2024-09-25"),
         "currentValue": current_value,
         "dailyChange": round(daily_change, 6),
         "performance": {
+            # Published series this pipeline doesn't produce are carried over unchanged
+            **published,
             "brightflow": brightflow_performance
         }
     }
@@ -181,28 +281,30 @@ def calculate_performance_metrics():
 
 def calculate_comparison_metrics(brightflow_perf, benchmark_data):
     """
-    Calculate comparison metrics between BrightFlow and benchmarks
+    Calculate comparison metrics between BrightFlow and benchmarks: final-value
+    outperformance plus the risk metrics from risk_metrics.comparison_metrics
     """
     
-    metrics = {}
-    
     if not brightflow_perf:
-        return metrics
+        return {}
+    
+    metrics = comparison_metrics(brightflow_perf, benchmark_data)
     
-    brightflow_return = brightflow_perf[-1]["value"] - 1.0
+    brightflow_return = brightflow_perf[-1]["value"] / brightflow_perf[0]["value"] - 1.0
     
     for benchmark_name, benchmark_perf in benchmark_data.items():
         if not benchmark_perf:
             continue
             
-        benchmark_return = benchmark_perf[-1]["value"] - 1.0
+        benchmark_return = benchmark_perf[-1]["value"] / benchmark_perf[0]["value"] - 1.0
         outperformance = brightflow_return - benchmark_return
         
         metrics[f"vs_{benchmark_name}"] = {
             "brightflow_return": round(brightflow_return, 6),
             "benchmark_return": round(benchmark_return, 6), 
             "outperformance": round(outperformance, 6),
-            "outperformance_pct": round(outperformance * 100, 2)
+            "outperformance_pct": round(outperformance * 100, 2),
+            **metrics.get(f"vs_{benchmark_name}", {})
         }
     
     return metrics
@@ -10,58 +10,75 @@ import numpy as np
 from datetime import datetime, timedelta, timezone
 import os
 
+from performance_series import format_dates, load_published_performance, published_series, to_points
+from synthetic_paths import business_days, gbm_paths, make_rng
+from model_runner import UNIVERSE, ModelRunner, load_closes
+
 def generate_brightflow_predictions():
     """
     Generate BrightFlow predictions using your ML algorithms
     
     CUSTOMIZE THIS FUNCTION with your actual ML logic
+    
+    Only days after the last published BrightFlow point are generated, continuing
+    from its value; without published data the series starts over at 2024-09-25.
     """
     
     print("🤖 Generating BrightFlow predictions...")
     
-    # TODO: Replace this with your actual ML pipeline
-    # This is just a template showing the expected output format
-    
-    # Example: Load your trained model
-    # model = load_model('brightflow_model.pkl')
-    
-    # Example: Get latest market data
-    # market_data = fetch_latest_market_data()
-    
-    # Example: Generate predictions
-    # predictions = model.predict(market_data)
+    # Load the model once (BRIGHTFLOW_MODEL) and score the whole universe in batches
+    ticker_predictions = {}
+    model_version = None
+    try:
+        runner = ModelRunner()
+        model_version = runner.version
+        closes, errors = load_closes(UNIVERSE)
+        for ticker, error in errors.items():
+            print(f"  ⚠️  No prices for {ticker}: {error}")
+        ticker_predictions = runner.run(closes)
+        print(f"  Scored {len(ticker_predictions)} tickers with {runner.version} ({runner.workers} workers available)")
+    except Exception as e:
+        print(f"  ⚠️  Model stage skipped: {str(e)}")
     
     # For now, generate sample predictions
     current_date = datetime.now().date()
     
     # Generate sample BrightFlow performance (customize this logic)
-    brightflow_performance = []
     base_date = datetime(2024, 9, 25).date()
     current_value = 1.0
+    incremental_after = None
     
-    # Generate daily performance from start date to current date
-    date_iter = base_date
-    while date_iter <= current_date:
-        # TODO: Replace with your actual prediction algorithm
-        # This is just sample data showing the format
-        daily_change = np.random.normal(0.001, 0.02)  # Random walk for demo
-        current_value *= (1 + daily_change)
-        
-        brightflow_performance.append({
-            "date": date_iter.isoformat(),
-            "value": round(current_value, 4)
-        })
-        
-        date_iter += timedelta(days=1)
+    published = published_series(load_published_performance()).get("brightflow")
+    if published:
+        last_point = published[-1]
+        incremental_after = last_point["date"]
+        base_date = datetime.strptime(incremental_after, "%Y-%m-%d").date() + timedelta(days=1)
+        current_value = last_point["value"]
+        print(f"  Continuing after {incremental_after} (value {current_value:.4f})")
+    
+    # Generate performance for every business day from start date to current date
+    dates = business_days(base_date, current_date)
+    
+    # TODO: Replace with your actual prediction algorithm
+    # This is just sample data showing the format: a seeded random walk with
+    # about 0.1% mean daily change and 2% daily volatility
+    values = gbm_paths(len(dates), 0.252, 0.02 * np.sqrt(252), start_value=current_value, rng=make_rng(base_date))[:, 0]
+    
+    brightflow_performance = to_points(format_dates(dates), values, decimals=4)
+    if len(values):
+        current_value = float(values[-1])
     
     # Save predictions to output file
     os.makedirs("output", exist_ok=True)
     
     predictions_data = {
         "brightflow_performance": brightflow_performance,
+        # Last published date the points follow on from; None when they are the full series
+        "incremental_after": incremental_after,
         "current_value": round(current_value, 4),
+        "ticker_predictions": ticker_predictions,
         "prediction_confidence": 0.85,  # TODO: Calculate actual confidence
-        "model_version": "v1.0.0",  # TODO: Use your actual model version
+        "model_version": model_version,
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "features_used": [
             # TODO: List the features your model uses
@@ -75,7 +92,7 @@ def generate_brightflow_predictions():
     with open("output/brightflow_predictions.json", "w") as f:
         json.dump(predictions_data, f, indent=2)
     
-    print(f"✅ Generated {len(brightflow_performance)} prediction data points")
+    print(f"✅ Generated {len(brightflow_performance)} {'new ' if incremental_after else ''}prediction data points")
     print(f"📈 Current BrightFlow value: ${current_value:.4f}")
     
     return predictions_data
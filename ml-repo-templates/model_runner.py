@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+BrightFlow model runner.
+Loads a model once, builds the feature matrix for the whole ticker universe
+from one (dates x tickers) close array, and scores it in batches, optionally
+spread over a process pool (each worker loads the model once) so CPU-bound
+models use every core.
+
+A model is any object with predict(features) -> one score per row. Set
+BRIGHTFLOW_MODEL to a pickled model file or to "module:factory"; without it the
+sample MomentumModel is used.
+"""
+
+import asyncio
+import importlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+# Model to load: path to a pickle or "module:factory"
+MODEL_SPEC = os.environ.get("BRIGHTFLOW_MODEL", "")
+
+# Tickers scored each run
+UNIVERSE = [t for t in os.environ.get(
+    "BRIGHTFLOW_UNIVERSE", "AAPL,GOOGL,MSFT,TSLA,AMZN,NVDA,META,SPY"
+).split(",") if t]
+
+# Calendar days of closes loaded for the features (the longest lookback is 252 trading days)
+HISTORY_DAYS = 400
+
+# Feature columns, in matrix order
+FEATURES = ("return_5d", "return_20d", "return_60d", "volatility_20d", "trend_50d", "drawdown_252d")
+
+# Rows scored per predict() call
+BATCH_SIZE = 256
+
+# Below this many tickers scoring stays in-process; a pool isn't worth starting
+# for the sample model. Lower it for models slow enough to be worth spreading out
+MIN_POOL_ROWS = int(os.environ.get("BRIGHTFLOW_MIN_POOL_ROWS", "1024"))
+
+class MomentumModel:
+    """Sample model: momentum scaled by volatility. Replace with your trained model."""
+    
+    version = "momentum-v1"
+    
+    def predict(self, features):
+        momentum = 0.2 * features[:, 0] + 0.5 * features[:, 1] + 0.3 * features[:, 2]
+        return np.tanh(momentum / np.maximum(features[:, 3], 0.05) + features[:, 4])
+
+def load_model(spec=MODEL_SPEC):
+    """Load the model named by spec: a pickle file, "module:factory", or the sample model"""
+    if not spec:
+        return MomentumModel()
+    if ":" in spec and not os.path.exists(spec):
+        module_name, factory = spec.split(":", 1)
+        return getattr(importlib.import_module(module_name), factory)()
+    with open(spec, "rb") as f:
+        return pickle.load(f)
+
+def load_closes(tickers, end_date=None, history_days=HISTORY_DAYS):
+    """
+    (dates x tickers) adjusted closes for the universe, fetched in one go through
+    the MCP stock server's cache when available and from Yahoo Finance otherwise.
+    Returns (closes, errors).
+    """
+    from calculate_performance_vs_benchmarks import fetch_closes_cached, fetch_closes_yfinance, load_price_server
+    
+    end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+    start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=history_days)).strftime("%Y-%m-%d")
+    
+    server = load_price_server()
+    if server is not None:
+        closes, errors = asyncio.run(fetch_closes_cached(server, tickers, start_date, end_date))
+    else:
+        closes, errors = fetch_closes_yfinance(tickers, start_date, end_date)
+    
+    frame = pd.DataFrame({t: s for t, s in closes.items() if s is not None and not s.empty})
+    return frame.sort_index(), errors
+
+def build_features(closes):
+    """
+    Feature matrix (tickers x FEATURES) for every ticker at once from a
+    (dates x tickers) close frame. Tickers without enough history are dropped.
+    Returns (tickers, features).
+    """
+    values = closes.ffill().to_numpy(dtype=float)
+    if len(values) < 2:
+        return [], np.empty((0, len(FEATURES)))
+    
+    last = values[-1]
+    log_returns = np.diff(np.log(values), axis=0)
+    
+    def trailing_return(days):
+        return last / values[max(0, len(values) - 1 - days)] - 1
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        features = np.column_stack([
+            trailing_return(5),
+            trailing_return(20),
+            trailing_return(60),
+            np.nanstd(log_returns[-20:], axis=0, ddof=1) * np.sqrt(252),
+            last / np.nanmean(values[-50:], axis=0) - 1,
+            last / np.nanmax(values[-252:], axis=0) - 1
+        ])
+    
+    valid = np.isfinite(features).all(axis=1)
+    return [t for t, ok in zip(closes.columns, valid) if ok], features[valid]
+
+def predict_batches(model, features, batch_size=BATCH_SIZE):
+    """Scores for every row, calling the model on batch_size rows at a time"""
+    if len(features) == 0:
+        return np.empty(0)
+    return np.concatenate([
+        np.asarray(model.predict(features[i:i + batch_size]), dtype=float).reshape(-1)
+        for i in range(0, len(features), batch_size)
+    ])
+
+# Model loaded once per pool worker
+_worker_model = None
+
+def _init_worker(spec):
+    global _worker_model
+    _worker_model = load_model(spec)
+
+def _predict_chunk(args):
+    features, batch_size = args
+    return predict_batches(_worker_model, features, batch_size)
+
+class ModelRunner:
+    """Runs a model over the ticker universe, in-process or over a process pool"""
+    
+    def __init__(self, spec=MODEL_SPEC, batch_size=BATCH_SIZE, workers=None):
+        self.spec = spec
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.model = load_model(spec)
+    
+    @property
+    def version(self):
+        return getattr(self.model, "version", self.spec or "unknown")
+    
+    def predict(self, features):
+        """Scores for a feature matrix; large matrices are split across worker processes"""
+        if self.workers <= 1 or len(features) < MIN_POOL_ROWS:
+            return predict_batches(self.model, features, self.batch_size)
+        
+        chunks = np.array_split(features, self.workers)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.spec,)) as pool:
+            scores = pool.map(_predict_chunk, [(chunk, self.batch_size) for chunk in chunks])
+            return np.concatenate(list(scores))
+    
+    def run(self, closes):
+        """{ticker: score} for every ticker in a (dates x tickers) close frame"""
+        tickers, features = build_features(closes)
+        scores = self.predict(features)
+        return {ticker: round(float(score), 6) for ticker, score in zip(tickers, scores)}
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Performance series helpers shared by the BrightFlow pipeline scripts.
+Series are normalized, rounded and turned into [{"date", "value"}] payloads
+from NumPy arrays, one vectorized pass for a whole set of series, instead of
+looping over points in Python.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+import requests
+
+# Performance data from the last run; incremental runs append to it. A local path or a URL.
+PUBLISHED_PERFORMANCE = os.environ.get("BRIGHTFLOW_PUBLISHED_PERFORMANCE", "output/performance_data.json")
+
+def format_dates(index):
+    """YYYY-MM-DD strings for a date index (datetimes or date strings) as an array"""
+    if pd.api.types.is_datetime64_any_dtype(index):
+        return pd.DatetimeIndex(index).strftime("%Y-%m-%d").to_numpy(dtype=object)
+    return np.asarray([str(d)[:10] for d in index], dtype=object)
+
+def normalize(values, base=1.0):
+    """
+    Scale each column of a 2-D array (or a 1-D array) so its first valid value
+    equals base. Columns without any valid value come back all NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    flat = values.ndim == 1
+    if flat:
+        values = values[:, None]
+    
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=0)
+    baseline = np.where(valid.any(axis=0), values[first, np.arange(values.shape[1])], np.nan)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = values / baseline * base
+    return normalized[:, 0] if flat else normalized
+
+def to_points(dates, values, decimals=6):
+    """[{"date", "value"}] for the non-NaN values, rounded to decimals"""
+    dates = np.asarray(dates, dtype=object)
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    
+    # Round and convert to Python floats in bulk; only the dict construction is per point
+    rounded = np.round(values[valid], decimals).tolist()
+    return [{"date": date, "value": value} for date, value in zip(dates[valid].tolist(), rounded)]
+
+def normalized_points(frame, base=1.0, start_date=None, decimals=6):
+    """
+    Normalize every column of a date-indexed price frame to start at base from
+    start_date on, and emit one points list per column.
+    A ticker missing on some dates just has no points for them.
+    """
+    if frame.empty:
+        return {column: [] for column in frame.columns}
+    
+    frame = frame.sort_index()
+    dates = format_dates(frame.index)
+    values = frame.to_numpy(dtype=float)
+    
+    if start_date is not None:
+        keep = dates >= str(start_date)[:10]
+        dates, values = dates[keep], values[keep]
+    
+    normalized = normalize(values, base)
+    return {
+        column: to_points(dates, normalized[:, i], decimals)
+        for i, column in enumerate(frame.columns)
+    }
+
+def series_points(series, base=1.0, start_date=None, decimals=6):
+    """Normalized points for a single date-indexed price series"""
+    if series is None or len(series) == 0:
+        return []
+    return normalized_points(series.to_frame("value"), base, start_date, decimals)["value"]
+
+def load_published_performance(source=PUBLISHED_PERFORMANCE):
+    """
+    Last published performance data, or None when there is none or a full refresh
+    is requested with BRIGHTFLOW_FULL_REFRESH=1 (the series are then rebuilt from the start)
+    """
+    if os.environ.get("BRIGHTFLOW_FULL_REFRESH") == "1":
+        print("  Full refresh requested, ignoring published performance data")
+        return None
+    
+    try:
+        if source.startswith(("http://", "https://")):
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        with open(source, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError, requests.RequestException) as e:
+        print(f"  ⚠️  Published performance data unavailable ({str(e)}), rebuilding from the start")
+        return None
+
+def rebase_points(points, base=1.0, decimals=6):
+    """Points rescaled so the first one equals base"""
+    if not points:
+        return []
+    values = normalize([point["value"] for point in points], base)
+    return to_points([point["date"] for point in points], values, decimals)
+
+def published_series(data):
+    """
+    {name: points} from performance data in the pipeline ("performance": {...}) or
+    website (flat) layout, each rebased to start at 1.0 like the series this
+    pipeline builds (the website keeps BrightFlow in dollars and benchmarks at 100)
+    """
+    if not data:
+        return {}
+    series = data.get("performance", data)
+    return {name: rebase_points(points) for name, points in series.items() if isinstance(points, list)}
+
+def append_points(existing, new):
+    """existing points followed by the new points dated after the last existing one"""
+    if not existing:
+        return list(new)
+    last_date = existing[-1]["date"]
+    return existing + [point for point in new if point["date"] > last_date]
\ No newline at end of file
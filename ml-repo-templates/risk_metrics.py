@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Risk metrics for BrightFlow against its benchmarks.
+All series are aligned into one (dates x series) array and every statistic is
+computed for all columns at once. Rolling windows come from cumulative sums, so
+each window set costs O(n) whatever the window length.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Annual risk-free rate used by Sharpe, Sortino and alpha
+RISK_FREE_RATE = 0.0
+
+# Rolling windows in calendar days, converted to observations from the data's frequency
+ROLLING_WINDOWS = (30, 90, 365)
+
+def align(series):
+    """
+    (dates, values, names) for the dates every series has, values as a
+    (dates x series) array. Series on different calendars (e.g. daily BrightFlow
+    and business-day benchmarks) meet on their common dates.
+    """
+    columns = {}
+    for name, points in series.items():
+        column = pd.Series([p["value"] for p in points], index=[p["date"] for p in points], dtype=float)
+        columns[name] = column[~column.index.duplicated(keep="last")]
+    
+    frame = pd.DataFrame(columns).sort_index().dropna()
+    return pd.to_datetime(frame.index).values, frame.to_numpy(dtype=float), list(frame.columns)
+
+def periods_per_year(dates):
+    """Observations per year implied by the dates (365 for daily, ~252 for trading days)"""
+    years = (dates[-1] - dates[0]) / np.timedelta64(1, "D") / 365.25
+    return (len(dates) - 1) / years if years > 0 else 252.0
+
+def window_sums(x, window):
+    """Sums of x over every trailing window of rows, from a single cumulative sum"""
+    totals = np.cumsum(np.concatenate([np.zeros((1,) + x.shape[1:]), x]), axis=0)
+    return totals[window:] - totals[:-window]
+
+def safe_divide(numerator, denominator):
+    """Elementwise division with NaN where the result is undefined"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.asarray(numerator, dtype=float) / denominator
+    return np.where(np.isfinite(result), result, np.nan)
+
+def series_statistics(dates, values, returns, annual, rf_period):
+    """Return, volatility, Sharpe, Sortino and drawdown per column"""
+    excess = returns - rf_period
+    std = returns.std(axis=0, ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2, axis=0))
+    
+    peak = np.maximum.accumulate(values, axis=0)
+    drawdown = values / peak - 1
+    
+    # Row of the latest peak at every row; a drawdown lasts from it until the next new peak
+    rows = np.arange(len(values))[:, None]
+    peak_row = np.maximum.accumulate(np.where(values >= peak, rows, 0), axis=0)
+    days = (dates - dates[0]) / np.timedelta64(1, "D")
+    duration = days[:, None] - days[peak_row]
+    
+    growth = values[-1] / values[0]
+    return {
+        "total_return": growth - 1,
+        "annualized_return": growth ** (annual / len(returns)) - 1,
+        "volatility": std * np.sqrt(annual),
+        "sharpe_ratio": safe_divide(excess.mean(axis=0), std) * np.sqrt(annual),
+        "sortino_ratio": safe_divide(excess.mean(axis=0), downside) * np.sqrt(annual),
+        "max_drawdown": drawdown.min(axis=0),
+        "max_drawdown_duration_days": duration.max(axis=0)
+    }
+
+def relative_statistics(returns, annual, rf_period):
+    """Beta, alpha, correlation, tracking error and information ratio of column 0 against each other column"""
+    fund, benchmarks = returns[:, :1], returns[:, 1:]
+    fund_centered = fund - fund.mean(axis=0)
+    benchmarks_centered = benchmarks - benchmarks.mean(axis=0)
+    
+    covariance = (fund_centered * benchmarks_centered).sum(axis=0)
+    benchmark_variance = (benchmarks_centered ** 2).sum(axis=0)
+    beta = safe_divide(covariance, benchmark_variance)
+    
+    active = fund - benchmarks
+    tracking_error = active.std(axis=0, ddof=1) * np.sqrt(annual)
+    
+    return {
+        "beta": beta,
+        "alpha": ((fund.mean() - rf_period) - beta * (benchmarks.mean(axis=0) - rf_period)) * annual,
+        "correlation": safe_divide(covariance, np.sqrt(benchmark_variance * (fund_centered ** 2).sum())),
+        "tracking_error": tracking_error,
+        "information_ratio": safe_divide(active.mean(axis=0) * annual, tracking_error)
+    }
+
+def rolling_statistics(values, returns, window, annual, rf_period):
+    """
+    Statistics over every trailing window of observations, one row per window
+    end: return, volatility and Sharpe per column, and excess return, beta,
+    tracking error and information ratio of column 0 against each other column
+    """
+    count = window_sums(np.ones((len(returns), 1)), window)
+    sums = window_sums(returns, window)
+    squares = window_sums(returns ** 2, window)
+    mean = sums / count
+    variance = np.maximum(squares / count - mean ** 2, 0.0) * count / (count - 1)
+    
+    fund, benchmarks = returns[:, :1], returns[:, 1:]
+    cross = window_sums(fund * benchmarks, window) / count
+    covariance = cross - mean[:, :1] * mean[:, 1:]
+    
+    active = fund - benchmarks
+    active_mean = window_sums(active, window) / count
+    active_variance = np.maximum(window_sums(active ** 2, window) / count - active_mean ** 2, 0.0) * count / (count - 1)
+    tracking_error = np.sqrt(active_variance * annual)
+    
+    period_return = values[window:] / values[:-window] - 1
+    return {
+        "return": period_return,
+        "volatility": np.sqrt(variance * annual),
+        "sharpe_ratio": safe_divide(mean - rf_period, np.sqrt(variance)) * np.sqrt(annual),
+        "excess_return": period_return[:, :1] - period_return[:, 1:],
+        "beta": safe_divide(covariance * count / (count - 1), variance[:, 1:]),
+        "tracking_error": tracking_error,
+        "information_ratio": safe_divide(active_mean * annual, tracking_error)
+    }
+
+def rounded(value, decimals=6):
+    """JSON-safe rounded float; None for NaN or infinity"""
+    value = float(value)
+    return round(value, decimals) if np.isfinite(value) else None
+
+def comparison_metrics(fund_points, benchmarks, risk_free_rate=RISK_FREE_RATE, windows=ROLLING_WINDOWS):
+    """
+    Metrics for the fund ("brightflow") and for the fund against every benchmark
+    ("vs_<name>"), including the latest value of each rolling window.
+    Benchmarks are {name: points}; empty ones are skipped.
+    """
+    series = {"brightflow": fund_points, **{name: points for name, points in benchmarks.items() if points}}
+    if not fund_points or len(series) < 2:
+        return {}
+    
+    dates, values, names = align(series)
+    if len(dates) < 3:
+        return {}
+    
+    returns = values[1:] / values[:-1] - 1
+    annual = periods_per_year(dates)
+    rf_period = (1 + risk_free_rate) ** (1 / annual) - 1
+    
+    own = series_statistics(dates, values, returns, annual, rf_period)
+    relative = relative_statistics(returns, annual, rf_period)
+    
+    # Latest value of every rolling statistic, per window with enough history
+    rolling = {}
+    for days in windows:
+        window = max(2, int(round(days * annual / 365.25)))
+        if window <= len(returns):
+            latest = {key: stat[-1] for key, stat in rolling_statistics(values, returns, window, annual, rf_period).items()}
+            rolling[f"{days}d"] = latest
+    
+    metrics = {
+        "brightflow": {
+            **{key: rounded(stat[0]) for key, stat in own.items()},
+            "observations": len(dates),
+            "rolling": {
+                label: {key: rounded(latest[key][0]) for key in ("return", "volatility", "sharpe_ratio")}
+                for label, latest in rolling.items()
+            }
+        }
+    }
+    
+    for i, name in enumerate(names[1:]):
+        metrics[f"vs_{name}"] = {
+            **{key: rounded(stat[i]) for key, stat in relative.items()},
+            "benchmark": {key: rounded(stat[i + 1]) for key, stat in own.items()},
+            "rolling": {
+                label: {
+                    "benchmark_return": rounded(latest["return"][i + 1]),
+                    **{key: rounded(latest[key][i]) for key in ("excess_return", "beta", "tracking_error", "information_ratio")}
+                }
+                for label, latest in rolling.items()
+            }
+        }
+    
+    return metrics
\ No newline at end of file
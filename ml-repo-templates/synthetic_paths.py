@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic price paths over business days.
+Paths are drawn for all series at once, as geometric Brownian motion or by
+bootstrapping historical returns, and compounded with a single cumulative
+product, so fallback data for every benchmark or thousands of scenario paths
+is one array operation. The same seed and dates always give the same paths.
+"""
+
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+from performance_series import format_dates, to_points
+
+# Default seed; combined with the first date so each date range has its own reproducible draws
+DEFAULT_SEED = 20240925
+
+TRADING_DAYS_PER_YEAR = 252
+
+def business_days(start_date, end_date):
+    """Business-day index from start_date to end_date inclusive"""
+    return pd.bdate_range(start_date, end_date)
+
+def make_rng(start_date, seed=DEFAULT_SEED):
+    """Generator seeded by seed and start_date, so reruns over the same dates reproduce their paths"""
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date[:10], "%Y-%m-%d").date()
+    elif isinstance(start_date, datetime):
+        start_date = start_date.date()
+    elif not isinstance(start_date, date):
+        start_date = pd.Timestamp(start_date).date()
+    return np.random.default_rng([seed, start_date.toordinal()])
+
+def gbm_paths(steps, annual_return, volatility, paths=None, start_value=1.0, rng=None,
+              periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    (steps x paths) geometric Brownian motion values after each step, starting
+    from start_value. annual_return, volatility and start_value are scalars or
+    one per path; paths defaults to the number of parameters given.
+    """
+    rng = rng or np.random.default_rng(DEFAULT_SEED)
+    mu, sigma, start = (np.atleast_1d(np.asarray(x, dtype=float)) for x in (annual_return, volatility, start_value))
+    paths = paths or max(len(mu), len(sigma), len(start))
+    
+    dt = 1.0 / periods_per_year
+    shocks = rng.standard_normal((steps, paths))
+    log_returns = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shocks
+    return start * np.exp(np.cumsum(log_returns, axis=0))
+
+def bootstrap_paths(returns, steps, paths=1, start_value=1.0, rng=None):
+    """
+    (steps x paths) values from compounding per-period returns resampled with
+    replacement from a historical return sample
+    """
+    rng = rng or np.random.default_rng(DEFAULT_SEED)
+    returns = np.asarray(returns, dtype=float)
+    returns = returns[~np.isnan(returns)]
+    
+    sampled = returns[rng.integers(0, len(returns), size=(steps, paths))]
+    return np.atleast_1d(np.asarray(start_value, dtype=float)) * np.cumprod(1 + sampled, axis=0)
+
+def paths_to_points(dates, values, names, decimals=6):
+    """{name: [{"date", "value"}]} for the columns of a (dates x series) array"""
+    dates = format_dates(dates)
+    return {name: to_points(dates, values[:, i], decimals) for i, name in enumerate(names)}
\ No newline at end of file
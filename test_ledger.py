@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test that bulk_violations matches a recording Ledger replay on dust-reset chains
+"""
+
+import sys
+from pathlib import Path
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import ledger
+from ledger import MAX_RESET_PASSES, Ledger, bulk_violations, owned_shares, sufficient_cash, transaction_columns
+
+def alternating_dust(rows):
+    """BUY 1 / SELL 0.99995 pairs, each SELL leaving dust the ledger zeroes, among ordinary trades"""
+    transactions = []
+    for i in range(rows // 2):
+        transactions.append({"action": "BUY", "symbol": "DUST", "shares": 1.0, "price": 0.01})
+        transactions.append({"action": "SELL", "symbol": "DUST", "shares": 0.99995, "price": 0.01})
+        if i % 100 == 0:
+            transactions.append({"action": "BUY", "symbol": "AAPL", "shares": 0.5, "price": 1.0})
+            transactions.append({"action": "SELL", "symbol": "MSFT", "shares": 0.25, "price": 1.0})
+    return transactions
+
+def replay(transactions):
+    ledger = Ledger(rules=[sufficient_cash(), owned_shares()])
+    for txn in transactions:
+        ledger.apply(txn["action"], txn["symbol"], txn["shares"], txn["price"])
+    return ledger.violations, ledger.cash, ledger.positions()
+
+def summary(violations):
+    return [(v["index"], v["type"], v.get("cash", v.get("owned"))) for v in violations]
+
+def test_alternating_dust_matches_replay():
+    """A chain of dust resets settles in a bounded number of passes and exactly like the ledger"""
+    transactions = alternating_dust(40000)
+    calls = []
+    accumulate = ledger.segmented_accumulate
+
+    def counting(*args):
+        calls.append(args)
+        return accumulate(*args)
+
+    ledger.segmented_accumulate = counting
+    try:
+        violations, cash, positions = bulk_violations(transaction_columns(transactions))
+    finally:
+        ledger.segmented_accumulate = accumulate
+
+    expected_violations, expected_cash, expected_positions = replay(transactions)
+    assert summary(violations) == summary(expected_violations)
+    assert cash == expected_cash
+    assert positions == expected_positions
+    assert len(calls) <= MAX_RESET_PASSES + 2
+
+if __name__ == "__main__":
+    test_alternating_dust_matches_replay()
+    print("✅ Ledger tests passed")
@@ -11,121 +11,133 @@ import json
 import sys
 from pathlib import Path
 
-STARTING_CASH = 2100.00  # Our actual starting investment
-
-def validate_transactions(transactions_file):
+from ledger import STARTING_CASH, Ledger, TransactionStream, owned_shares, sufficient_cash
+
+def violation_error(violation):
+    """Error record for a rule violation recorded by the ledger"""
+    i = violation["index"]
+    details = f"  {violation['action']} {violation['shares']:.4f} {violation['symbol']} @ ${violation['price']:.2f}"
+    if violation["type"] == "ILLEGAL_BUY":
+        return {
+            "index": i,
+            "type": "ILLEGAL_BUY",
+            "message": f"Transaction {i}: Tried to buy ${violation['cost']:.2f} with only ${violation['cash']:.2f}",
+            "details": details,
+            "violation": "SPENT FICTIONAL MONEY - DIDN'T HAVE IT!"
+        }
+    return {
+        "index": i,
+        "type": "ILLEGAL_SELL",
+        "message": f"Transaction {i}: Tried to sell {violation['shares']:.4f} shares with only {violation['owned']:.4f} owned",
+        "details": details,
+        "violation": "SOLD FICTIONAL STOCK - DIDN'T OWN IT!"
+    }
+
+def print_error(error):
+    print(f"❌ {error['type']}: {error['message']}")
+    print(f"   {error['details']}")
+    print(f"   🚨 {error['violation']}\n")
+
+def print_warning(warning):
+    print(f"⚠️  {warning['type']}: {warning['message']}")
+    print(f"   {warning['details']}\n")
+
+def validate_transactions(transactions_file, stream=False):
     """
     Audit all transactions for violations of real money rules
+
+    With stream=True the file is parsed incrementally and violations and
+    warnings are reported as they are found, keeping only the ledger in memory.
     """
     if not Path(transactions_file).exists():
         print(f"❌ File not found: {transactions_file}")
         return False
 
-    with open(transactions_file) as f:
-        data = json.load(f)
-
-    transactions = data.get('transactions', [])
+    if stream:
+        transactions = TransactionStream(transactions_file)
+    else:
+        with open(transactions_file) as f:
+            data = json.load(f)
+        transactions = data.get('transactions', [])
 
     print("="*70)
     print("🔍 REAL MONEY VALIDATION")
     print("="*70)
     print(f"Starting cash: ${STARTING_CASH:.2f}")
-    print(f"Total transactions to audit: {len(transactions)}")
+    if stream:
+        print("Total transactions to audit: streaming, violations reported as found")
+    else:
+        print(f"Total transactions to audit: {len(transactions)}")
     print("="*70)
 
-    cash = STARTING_CASH
-    positions = {}
-    errors = []
+    violation_count = 0
+
+    def report(violation):
+        nonlocal violation_count
+        violation_count += 1
+        print_error(violation_error(violation))
+
+    # Allow for floating point errors; illegal transactions don't update cash/positions
+    ledger = Ledger(
+        STARTING_CASH,
+        rules=[sufficient_cash(0.01), owned_shares(0.0001)],
+        reject_violations=True,
+        on_violation=report if stream else None
+    )
     warnings = []
+    warning_count = 0
 
     for i, txn in enumerate(transactions):
-        symbol = txn.get("symbol")
-        shares = txn.get("shares", 0)
-        price = txn.get("price", 0)
-        action = txn.get("action", "").upper()
         reported_balance = txn.get("balance", 0)
-
-        if action == "BUY":
-            cost = shares * price
-
-            # Check if we had enough cash
-            if cash < cost - 0.01:  # Allow for floating point errors
-                errors.append({
-                    "index": i,
-                    "type": "ILLEGAL_BUY",
-                    "message": f"Transaction {i}: Tried to buy ${cost:.2f} with only ${cash:.2f}",
-                    "details": f"  {action} {shares:.4f} {symbol} @ ${price:.2f}",
-                    "violation": "SPENT FICTIONAL MONEY - DIDN'T HAVE IT!"
-                })
-                # Don't update cash/positions for illegal transaction
-                continue
-
-            # Execute buy
-            cash -= cost
-            positions[symbol] = positions.get(symbol, 0) + shares
-
-        elif action == "SELL":
-            owned = positions.get(symbol, 0)
-
-            # Check if we owned enough shares
-            if owned < shares - 0.0001:  # Allow for floating point errors
-                errors.append({
-                    "index": i,
-                    "type": "ILLEGAL_SELL",
-                    "message": f"Transaction {i}: Tried to sell {shares:.4f} shares with only {owned:.4f} owned",
-                    "details": f"  {action} {shares:.4f} {symbol} @ ${price:.2f}",
-                    "violation": "SOLD FICTIONAL STOCK - DIDN'T OWN IT!"
-                })
-                # Don't update cash/positions for illegal transaction
-                continue
-
-            # Execute sell
-            proceeds = shares * price
-            cash += proceeds
-            positions[symbol] -= shares
-
-            # Clean up zero positions
-            if positions[symbol] < 0.0001:
-                del positions[symbol]
+        if not ledger.apply_transaction(txn, use_amount=False):
+            continue
 
         # Validate reported balance vs actual
         # Note: We can't validate exact balance without current prices
         # But we can check if it's absurdly wrong
         if reported_balance > 1000000:  # More than $1 million
-            warnings.append({
+            warning = {
                 "index": i,
                 "type": "ABSURD_BALANCE",
                 "message": f"Transaction {i}: Reported balance ${reported_balance:.2f} is absurd",
                 "details": f"  Expected range: $0 - $100,000"
-            })
+            }
+            warning_count += 1
+            if stream:
+                print_warning(warning)
+            else:
+                warnings.append(warning)
+
+    errors = [violation_error(v) for v in ledger.violations]
+    error_count = violation_count + len(errors)
+    cash = ledger.cash
+    positions = ledger.positions()
 
     # Final validation
     print(f"\n📊 AUDIT RESULTS:")
-    print(f"   Transactions processed: {len(transactions)}")
+    print(f"   Transactions processed: {ledger.events}")
     print(f"   Final cash: ${cash:.2f}")
     print(f"   Final positions: {len(positions)} stocks")
     for symbol, shares in positions.items():
         print(f"      {symbol}: {shares:.4f} shares")
 
-    # Report errors
-    if errors:
+    # Report errors (streamed ones were reported as they were found)
+    if error_count:
         print(f"\n❌ VALIDATION FAILED!")
-        print(f"   Found {len(errors)} violations of real money rules:\n")
+        print(f"   Found {error_count} violations of real money rules{' (reported above)' if stream else ':'}\n")
         for error in errors:
-            print(f"❌ {error['type']}: {error['message']}")
-            print(f"   {error['details']}")
-            print(f"   🚨 {error['violation']}\n")
+            print_error(error)
 
     # Report warnings
-    if warnings:
+    if warning_count:
         print(f"\n⚠️  WARNINGS:")
-        print(f"   Found {len(warnings)} suspicious values:\n")
+        print(f"   Found {warning_count} suspicious values{' (reported above)' if stream else ':'}\n")
         for warning in warnings:
-            print(f"⚠️  {warning['type']}: {warning['message']}")
-            print(f"   {warning['details']}\n")
+            print_warning(warning)
 
-    # Validate reported current balance
-    reported_current = data.get('currentBalance', 0)
+    # Validate reported current balance (a streamed file's top-level fields are read by now)
+    fields = transactions.fields if stream else data
+    reported_current = fields.get('currentBalance', 0)
     if reported_current > 100000:
         print(f"❌ CRITICAL: Reported currentBalance ${reported_current:.2f} is ABSURD!")
         print(f"   Expected range: $1,000 - $100,000")
@@ -134,10 +146,11 @@ def validate_transactions(transactions_file):
             "type": "FICTIONAL_BALANCE",
             "message": "currentBalance exceeds realistic limits"
         })
+        error_count += 1
 
     print("="*70)
 
-    if errors:
+    if error_count:
         print("❌ VALIDATION FAILED - FICTIONAL MONEY DETECTED")
         print("="*70)
         print("\n🚨 THE ML TRADING SIMULATOR IS USING FICTIONAL MONEY!")
@@ -153,14 +166,15 @@ def validate_transactions(transactions_file):
         return True
 
 if __name__ == "__main__":
-    # Check if file path provided
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
+    # Check if file path provided; --stream validates incrementally
+    args = [arg for arg in sys.argv[1:] if arg != "--stream"]
+    if args:
+        file_path = args[0]
     else:
         file_path = "data/transactions.json"
 
     # Run validation
-    success = validate_transactions(file_path)
+    success = validate_transactions(file_path, stream="--stream" in sys.argv[1:])
 
     # Exit with appropriate code
     sys.exit(0 if success else 1)
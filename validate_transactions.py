@@ -6,96 +6,121 @@ Rules:
 1. Can't buy if you don't have enough cash
 2. Can't sell stocks you don't own
 3. Balance must equal cash + stock value
+
+Exits non-zero when any rule is broken, so the sandbox pull workflow stops.
 """
 import json
+import sys
 from pathlib import Path
 
-def validate_transactions(transactions_file):
+from ledger import STARTING_CASH, Ledger, TransactionStream, bulk_violations, owned_shares, sufficient_cash, transaction_columns
+
+def describe_violation(violation):
+    """Error report for a rule violation recorded by the ledger"""
+    i = violation["index"]
+    if violation["type"] == "ILLEGAL_BUY":
+        return (
+            f"❌ Transaction {i}: ILLEGAL BUY\n"
+            f"   Symbol: {violation['symbol']}\n"
+            f"   Shares: {violation['shares']:,.2f}\n"
+            f"   Price: ${violation['price']:.2f}\n"
+            f"   Cost: ${violation['cost']:,.2f}\n"
+            f"   Available cash: ${violation['cash']:,.2f}\n"
+            f"   Shortfall: ${violation['cost'] - violation['cash']:,.2f}\n"
+            f"   ⚠️  This is FICTIONAL MONEY - you didn't have it!"
+        )
+    return (
+        f"❌ Transaction {i}: ILLEGAL SELL\n"
+        f"   Symbol: {violation['symbol']}\n"
+        f"   Trying to sell: {violation['shares']:,.2f} shares\n"
+        f"   Actually owned: {violation['owned']:,.2f} shares\n"
+        f"   Shortfall: {violation['shares'] - violation['owned']:,.2f} shares\n"
+        f"   ⚠️  This is FICTIONAL STOCK - you didn't own it!"
+    )
+
+def validate_transactions(transactions_file, stream=False):
     """
     Audit all transactions to ensure we never:
     1. Spent money we didn't have
     2. Sold stocks we didn't own
     3. Made up balances
+
+    By default the whole history is checked at once with cumulative sums
+    (bulk_violations), or replayed through the ledger where NumPy and pandas
+    aren't installed. With stream=True the file is parsed incrementally and
+    replayed through the ledger, printing violations as they are found, so
+    memory stays flat whatever the size of the history.
     """
-    with open(transactions_file) as f:
-        data = json.load(f)
+    violation_count = 0
 
-    STARTING_CASH = 2100.00
-    cash = STARTING_CASH
-    positions = {}
+    def report(violation):
+        nonlocal violation_count
+        violation_count += 1
+        print(describe_violation(violation))
 
-    print(f"🔍 Auditing {len(data['transactions'])} transactions...")
+    if stream:
+        transactions = TransactionStream(transactions_file)
+        print("🔍 Auditing transactions (streaming)...")
+    else:
+        with open(transactions_file) as f:
+            data = json.load(f)
+        transactions = data['transactions']
+        print(f"🔍 Auditing {len(transactions)} transactions...")
     print(f"   Starting cash: ${STARTING_CASH:.2f}\n")
 
-    errors = []
-    warnings = []
-
-    for i, txn in enumerate(data['transactions']):
-        symbol = txn["symbol"]
-        shares = txn["shares"]
-        price = txn["price"]
-        action = txn["action"]
-        amount = txn["amount"]
-        reported_balance = txn.get("balance", 0)
+    def unrealistic_balance(i, reported_balance):
+        return (
+            f"⚠️  Transaction {i}: Unrealistic balance\n"
+            f"   Reported: ${reported_balance:,.2f}\n"
+            f"   Started with: ${STARTING_CASH:.2f}\n"
+            f"   This suggests fictional money"
+        )
 
-        if action == "BUY":
-            cost = shares * price
+    if stream:
+        # Violations are recorded but the trades still applied, so later ones are judged on the books as written
+        ledger = Ledger(STARTING_CASH, rules=[sufficient_cash(), owned_shares()], on_violation=report)
 
-            if cash < cost:
-                errors.append(
-                    f"❌ Transaction {i}: ILLEGAL BUY\n"
-                    f"   Symbol: {symbol}\n"
-                    f"   Shares: {shares:,.2f}\n"
-                    f"   Price: ${price:.2f}\n"
-                    f"   Cost: ${cost:,.2f}\n"
-                    f"   Available cash: ${cash:,.2f}\n"
-                    f"   Shortfall: ${cost - cash:,.2f}\n"
-                    f"   ⚠️  This is FICTIONAL MONEY - you didn't have it!"
-                )
+        for i, txn in enumerate(transactions):
+            reported_balance = txn.get("balance", 0)
+            ledger.apply(txn["action"], txn["symbol"], txn["shares"], txn["price"])
 
-            cash -= cost
-            positions[symbol] = positions.get(symbol, 0) + shares
+            # Check if balance is realistic (should be under $100k for $2.1k start)
+            if reported_balance > 100000:
+                print(unrealistic_balance(i, reported_balance))
 
-        elif action == "SELL":
-            owned = positions.get(symbol, 0)
-
-            if owned < shares:
-                errors.append(
-                    f"❌ Transaction {i}: ILLEGAL SELL\n"
-                    f"   Symbol: {symbol}\n"
-                    f"   Trying to sell: {shares:,.2f} shares\n"
-                    f"   Actually owned: {owned:,.2f} shares\n"
-                    f"   Shortfall: {shares - owned:,.2f} shares\n"
-                    f"   ⚠️  This is FICTIONAL STOCK - you didn't own it!"
-                )
-
-            proceeds = shares * price
-            cash += proceeds
-            positions[symbol] = max(0, positions.get(symbol, 0) - shares)
-
-            # Remove if sold all
-            if positions.get(symbol, 0) <= 0.0001:
-                positions.pop(symbol, None)
+        # Streamed violations were already printed as they were found
+        errors = []
+        error_count = violation_count
+        cash = ledger.cash
+        positions = ledger.positions()
+    else:
+        try:
+            violations, cash, positions = bulk_violations(transaction_columns(transactions), STARTING_CASH)
+        except ImportError:
+            # Plain python3 (the sandbox pull workflow) has no NumPy/pandas; replay instead
+            ledger = Ledger(STARTING_CASH, rules=[sufficient_cash(), owned_shares()])
+            for txn in transactions:
+                ledger.apply(txn["action"], txn["symbol"], txn["shares"], txn["price"])
+            violations, cash, positions = ledger.violations, ledger.cash, ledger.positions()
+        errors = [describe_violation(v) for v in violations]
+        error_count = len(errors)
 
-        # Check if balance is realistic (should be under $100k for $2.1k start)
-        if reported_balance > 100000:
-            warnings.append(
-                f"⚠️  Transaction {i}: Unrealistic balance\n"
-                f"   Reported: ${reported_balance:,.2f}\n"
-                f"   Started with: ${STARTING_CASH:.2f}\n"
-                f"   This suggests fictional money"
-            )
+        # Check if balances are realistic (should be under $100k for $2.1k start)
+        for i, txn in enumerate(transactions):
+            if txn.get("balance", 0) > 100000:
+                print(unrealistic_balance(i, txn["balance"]))
 
     print("\n" + "="*70)
-    if errors:
+    if error_count:
         print("❌ VALIDATION FAILED - FICTIONAL MONEY DETECTED!")
         print("="*70)
-        for error in errors[:10]:  # Show first 10 errors
-            print(error)
-        if len(errors) > 10:
-            print(f"\n... and {len(errors) - 10} more errors")
-        print("="*70)
-        print(f"\n🚨 Found {len(errors)} violations of real money rules!")
+        if not stream:
+            for error in errors[:10]:  # Show first 10 errors
+                print(error)
+            if len(errors) > 10:
+                print(f"\n... and {len(errors) - 10} more errors")
+            print("="*70)
+        print(f"\n🚨 Found {error_count} violations of real money rules!")
         return False
     else:
         print("✅ VALIDATION PASSED - All transactions use REAL money only!")
@@ -107,4 +132,5 @@ def validate_transactions(transactions_file):
         return True
 
 if __name__ == "__main__":
-    validate_transactions("data/transactions.json")
+    ok = validate_transactions("data/transactions.json", stream="--stream" in sys.argv[1:])
+    sys.exit(0 if ok else 1)